@@ -2,26 +2,31 @@ import sys
 import os
 import json
 import logging
-import pandas as pd
-import MetaTrader5 as mt5
+from collections import deque
 from datetime import datetime, timedelta
+from startup_timing import StartupTimer
+
+STARTUP_TIMER = StartupTimer()
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QLineEdit, QComboBox, QPushButton, QRadioButton, 
                              QDateEdit, QSpinBox, QMessageBox, QFileDialog, 
                              QProgressBar, QListWidget, QListWidgetItem, QFrame, 
                              QSplitter, QToolButton, QInputDialog, QDialog, 
                              QDialogButtonBox, QListWidget, QGridLayout, QMenuBar, 
-                             QMenu, QAction, QFontDialog, QColorDialog, QCheckBox)
-from PyQt5.QtCore import QDate, Qt, QThread, pyqtSignal, QLocale, QUrl
+                             QMenu, QAction, QActionGroup, QFontDialog, QColorDialog, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import QDate, Qt, QThread, QTimer, pyqtSignal, QLocale, QUrl
 from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QDesktopServices
-import pytz
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-from mplfinance.original_flavor import candlestick_ohlc
+from mt5_constants import TIMEFRAMES, TICKS, EXPORT_FORMATS, EXPORT_COLUMNS
+from exporters import DATASET_FORMATS
+from symbol_catalog import SymbolCatalog
+from mt5_session import MT5Session, MT5SessionError
+from metrics import MetricsRecorder
+
+# pandas, MetaTrader5 and matplotlib are imported on first use
+# (download, watchlist, chart) to keep time-to-first-window short.
+STARTUP_TIMER.mark('imports')
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +36,10 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+# Download progress and log messages reach the window at this rate (10 Hz),
+# however fast the download thread produces them
+UPDATE_INTERVAL_MS = 100
+
 class Translator:
     """Handles language translations for the application"""
     def __init__(self):
@@ -69,6 +78,7 @@ class Translator:
                 'no_columns': "Please select at least one column to export",
                 'download_starting': "Starting download...",
                 'download_complete': "Download completed successfully",
+                'progress_format': "%p%  |  {rate} bars/s  |  ETA {eta}",
                 'no_data_received': "Download complete but no data received",
                 'error_occurred': "Error occurred",
                 'mt5_connect_error': "Failed to connect to MT5. Please ensure MT5 is running.",
@@ -82,7 +92,8 @@ class Translator:
                 'select_symbols': "Select symbols to import:",
                 'watchlist_title': "Select Watchlist Symbols",
                 'tooltip_symbols': "Enter symbols separated by commas (e.g., XAUUSD,EURUSD)",
-                'tooltip_timeframes': "Select one or more timeframes for data download",
+                'tooltip_timeframes': "Select one or more timeframes for data download. "
+                                      "Ticks streams tick history straight to disk (compressed CSV or Parquet/Feather)",
                 'tooltip_export_format': "Choose the file format for exported data",
                 'tooltip_date_range': "Select a specific date range or days back",
                 'tooltip_output_path': "Specify the file path for exported data",
@@ -111,7 +122,60 @@ class Translator:
                 'up_color': "Up Candle Color:",
                 'down_color': "Down Candle Color:",
                 'show_grid': "Show Grid",
+                'chart_memory': "Chart memory budget (MB):",
+                'tooltip_chart_memory': "Downloaded series beyond this much memory are moved to a temporary file "
+                                        "and reloaded when selected",
                 'show_volume': "Show Volume Overlay",
+                'use_cache': "Use local bar cache (fetch only missing bars)",
+                'tooltip_use_cache': "Serve previously downloaded bars from disk and only request new ones from MT5",
+                'window_label': "Fetch window (days):",
+                'derive_timeframes': "Derive higher timeframes from the finest selected one",
+                'tooltip_derive_timeframes': "Download each symbol once at the finest selected timeframe and build "
+                                             "the others locally, aligned like MT5 bars (W1 from Sunday, MN1 from the 1st)",
+                'action_terminals': "MT5 Terminals...",
+                'terminals_prompt': "Terminal paths (terminal64.exe), one per line.\n"
+                                    "With two or more, downloads run in parallel, one terminal per process:",
+                'terminals_saved': "{} terminal(s) configured",
+                'action_refresh_symbols': "Refresh Symbol List",
+                'symbols_refreshed': "Symbol list updated: {} symbols",
+                'symbols_loading': "Loading the symbol list...",
+                'action_csv_output': "CSV Output",
+                'action_fast_csv': "Fast Engine (symbol's decimal digits)",
+                'action_csv_uncompressed': "Uncompressed",
+                'action_csv_gzip': "gzip (.csv.gz)",
+                'action_csv_zstd': "zstd (.csv.zst)",
+                'action_timestamps': "Export Timestamps",
+                'action_time_datetime': "Date and Time",
+                'action_time_epoch_s': "Epoch Seconds (int64)",
+                'action_time_epoch_ms': "Epoch Milliseconds (int64)",
+                'action_output_timezone': "Output Time Zone...",
+                'action_server_timezone': "Server Time Zone...",
+                'output_timezone_prompt': "Time zone of exported dates (UTC, server for the server clock, or a name such as Europe/London):",
+                'server_timezone_prompt': "Time zone of the trade server's clock (UTC keeps MT5 times as they are):",
+                'invalid_timezone': "Unknown time zone: {}",
+                'action_panel_export': "Panel Export",
+                'action_panel_off': "Off (one file per series)",
+                'action_panel_Close': "Close Prices",
+                'action_panel_OHLC': "OHLC",
+                'action_panel_Volume': "Volume",
+                'action_panel_ffill': "Forward Fill Missing Bars",
+                'action_panel_csv': "CSV",
+                'action_panel_parquet': "Parquet",
+                'action_panel_npz': "NumPy (.npz)",
+                'action_performance': "Performance...",
+                'performance_title': "Performance of the Last Run",
+                'perf_stage_totals': "Time per stage",
+                'perf_slowest': "Slowest series",
+                'perf_stage': "Stage",
+                'perf_spans': "Series",
+                'perf_seconds': "Seconds",
+                'perf_rows': "Rows",
+                'perf_rate': "Rows/s",
+                'perf_megabytes': "MB written",
+                'perf_series': "Series",
+                'perf_breakdown': "Breakdown",
+                'perf_no_data': "No timings recorded yet. Run a download first.",
+                'tooltip_window': "Request data from MT5 in windows of this many days (0 = whole range at once)",
             },
             'fa': {
                 'app_title': "دانلودگر داده‌های تاریخی متاتریدر ۵",
@@ -147,6 +211,7 @@ class Translator:
                 'no_columns': "لطفا حداقل یک ستون برای export انتخاب کنید",
                 'download_starting': "در حال شروع دانلود...",
                 'download_complete': "دانلود با موفقیت انجام شد",
+                'progress_format': "%p%  |  {rate} کندل در ثانیه  |  زمان باقی‌مانده {eta}",
                 'no_data_received': "دانلود کامل شد اما داده‌ای دریافت نشد",
                 'error_occurred': "خطا رخ داده است",
                 'mt5_connect_error': "اتصال به متاتریدر ۵ ناموفق بود. لطفا از اجرا بودن متاتریدر اطمینان حاصل کنید.",
@@ -160,7 +225,8 @@ class Translator:
                 'select_symbols': "نمادهای مورد نظر را انتخاب کنید:",
                 'watchlist_title': "انتخاب نمادهای واچ‌لیست",
                 'tooltip_symbols': "نمادها را با کاما جدا کنید (مثال: XAUUSD,EURUSD)",
-                'tooltip_timeframes': "یک یا چند تایم‌فریم برای دانلود انتخاب کنید",
+                'tooltip_timeframes': "یک یا چند تایم‌فریم برای دانلود انتخاب کنید. "
+                                      "گزینه Ticks تاریخچه تیک‌ها را مستقیماً روی دیسک ذخیره می‌کند (CSV فشرده یا Parquet/Feather)",
                 'tooltip_export_format': "فرمت فایل برای داده‌های خروجی را انتخاب کنید",
                 'tooltip_date_range': "بازه تاریخ مشخص یا تعداد روز قبل را انتخاب کنید",
                 'tooltip_output_path': "مسیر فایل خروجی را مشخص کنید",
@@ -189,7 +255,60 @@ class Translator:
                 'up_color': "رنگ کندل صعودی:",
                 'down_color': "رنگ کندل نزولی:",
                 'show_grid': "نمایش شبکه",
+                'chart_memory': "سقف حافظه نمودارها (مگابایت):",
+                'tooltip_chart_memory': "سری‌های دانلودشده بیش از این مقدار حافظه به فایل موقت منتقل شده و "
+                                        "هنگام انتخاب دوباره بارگیری می‌شوند",
                 'show_volume': "نمایش حجم معاملات",
+                'use_cache': "استفاده از کش محلی کندل‌ها (دریافت فقط کندل‌های جدید)",
+                'tooltip_use_cache': "کندل‌های دانلودشده قبلی از دیسک خوانده شده و فقط کندل‌های جدید از متاتریدر درخواست می‌شوند",
+                'window_label': "بازه دریافت (روز):",
+                'derive_timeframes': "ساخت تایم‌فریم‌های بالاتر از کوچک‌ترین تایم‌فریم انتخاب‌شده",
+                'tooltip_derive_timeframes': "هر نماد فقط یک بار در کوچک‌ترین تایم‌فریم انتخاب‌شده دانلود شده و بقیه "
+                                             "به صورت محلی و هم‌تراز با کندل‌های متاتریدر ساخته می‌شوند (W1 از یکشنبه، MN1 از روز اول ماه)",
+                'action_terminals': "ترمینال‌های متاتریدر...",
+                'terminals_prompt': "مسیر ترمینال‌ها (terminal64.exe)، هر خط یک مسیر.\n"
+                                    "با دو ترمینال یا بیشتر، دانلود به صورت موازی و هر ترمینال در یک پردازه انجام می‌شود:",
+                'terminals_saved': "{} ترمینال تنظیم شد",
+                'action_refresh_symbols': "به‌روزرسانی فهرست نمادها",
+                'symbols_refreshed': "فهرست نمادها به‌روز شد: {} نماد",
+                'symbols_loading': "در حال بارگذاری فهرست نمادها...",
+                'action_csv_output': "خروجی CSV",
+                'action_fast_csv': "موتور سریع (به تعداد ارقام اعشار نماد)",
+                'action_csv_uncompressed': "بدون فشرده‌سازی",
+                'action_csv_gzip': "gzip (.csv.gz)",
+                'action_csv_zstd': "zstd (.csv.zst)",
+                'action_timestamps': "مهر زمانی خروجی",
+                'action_time_datetime': "تاریخ و زمان",
+                'action_time_epoch_s': "ثانیه از Epoch (int64)",
+                'action_time_epoch_ms': "میلی‌ثانیه از Epoch (int64)",
+                'action_output_timezone': "منطقه زمانی خروجی...",
+                'action_server_timezone': "منطقه زمانی سرور...",
+                'output_timezone_prompt': "منطقه زمانی تاریخ‌های خروجی (UTC، server برای ساعت سرور، یا نامی مانند Europe/London):",
+                'server_timezone_prompt': "منطقه زمانی ساعت سرور معاملاتی (UTC زمان‌های MT5 را همان‌طور نگه می‌دارد):",
+                'invalid_timezone': "منطقه زمانی ناشناخته: {}",
+                'action_panel_export': "خروجی پنل",
+                'action_panel_off': "خاموش (یک فایل برای هر سری)",
+                'action_panel_Close': "قیمت‌های بسته شدن",
+                'action_panel_OHLC': "OHLC",
+                'action_panel_Volume': "حجم",
+                'action_panel_ffill': "پر کردن کندل‌های جاافتاده با مقدار قبلی",
+                'action_panel_csv': "CSV",
+                'action_panel_parquet': "Parquet",
+                'action_panel_npz': "NumPy (.npz)",
+                'action_performance': "کارایی...",
+                'performance_title': "کارایی آخرین اجرا",
+                'perf_stage_totals': "زمان هر مرحله",
+                'perf_slowest': "کندترین سری‌ها",
+                'perf_stage': "مرحله",
+                'perf_spans': "سری‌ها",
+                'perf_seconds': "ثانیه",
+                'perf_rows': "ردیف‌ها",
+                'perf_rate': "ردیف در ثانیه",
+                'perf_megabytes': "مگابایت نوشته‌شده",
+                'perf_series': "سری",
+                'perf_breakdown': "جزئیات",
+                'perf_no_data': "هنوز زمانی ثبت نشده است. ابتدا یک دانلود انجام دهید.",
+                'tooltip_window': "داده‌ها در بازه‌هایی به این تعداد روز از متاتریدر درخواست می‌شوند (۰ = کل بازه یکجا)",
             }
         }
         self.current_lang = 'en'
@@ -242,6 +361,16 @@ class ChartSettingsDialog(QDialog):
         self.volume_check = QCheckBox(self.translator.tr('show_volume'))
         layout.addWidget(self.volume_check)
         
+        # Chart memory budget
+        memory_layout = QHBoxLayout()
+        memory_layout.addWidget(QLabel(self.translator.tr('chart_memory')))
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(16, 65536)
+        self.memory_spin.setSingleStep(64)
+        self.memory_spin.setToolTip(self.translator.tr('tooltip_chart_memory'))
+        memory_layout.addWidget(self.memory_spin)
+        layout.addLayout(memory_layout)
+        
         # Buttons
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         button_box.accepted.connect(self.accept)
@@ -255,6 +384,7 @@ class ChartSettingsDialog(QDialog):
         self.down_color = QColor(parent.candle_colors['down'])
         self.grid_check.setChecked(parent.show_grid)
         self.volume_check.setChecked(parent.show_volume)
+        self.memory_spin.setValue(parent.chart_memory_mb)
         self.update_color_buttons()
         
     def select_up_color(self):
@@ -273,291 +403,120 @@ class ChartSettingsDialog(QDialog):
         self.up_color_btn.setStyleSheet(f"background-color: {self.up_color.name()}; border: 1px solid #616161;")
         self.down_color_btn.setStyleSheet(f"background-color: {self.down_color.name()}; border: 1px solid #616161;")
 
-class CandlestickChart(FigureCanvas):
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi, facecolor='#212121')
-        self.ax = self.fig.add_subplot(111)
-        super().__init__(self.fig)
-        self.setParent(parent)
-        self.dark_mode = True
-        self.translator = Translator()
-        
-    def plot_candles(self, data, symbol="", candle_colors=None, show_grid=True, show_volume=False):
-        """Plot candlestick chart from OHLC data with enhanced styling"""
-        self.fig.clear()
-        
-        if show_volume and 'Volume' in data.columns:
-            self.ax = self.fig.add_subplot(211)
-            self.ax_volume = self.fig.add_subplot(212, sharex=self.ax)
+class PerformanceDialog(QDialog):
+    """Per-stage totals and the slowest series of the last download run"""
+    def __init__(self, parent, metrics):
+        super().__init__(parent)
+        self.translator = parent.translator
+        tr = self.translator.tr
+        self.setWindowTitle(tr('performance_title'))
+        self.setMinimumSize(560, 460)
+        layout = QVBoxLayout()
+        spans = metrics.last_run()
+        if not spans:
+            layout.addWidget(QLabel(tr('perf_no_data')))
         else:
-            self.ax = self.fig.add_subplot(111)
-            self.ax_volume = None
-            
-        if data.empty:
-            self.ax.text(0.5, 0.5, self.translator.tr('no_data'), 
-                        ha='center', va='center', fontsize=12,
-                        color='#FFFFFF')
-            self.draw()
-            return
-        
-        # Convert dates to matplotlib format
-        dates = mdates.date2num(data['Date'])
-        
-        # Prepare OHLC data
-        ohlc = list(zip(dates, data['Open'], data['High'], data['Low'], data['Close']))
-        
-        # Plot candlesticks with user-defined colors
-        candle_colors = candle_colors or {'up': '#4CAF50', 'down': '#F44336'}
-        candlestick_ohlc(self.ax, ohlc, width=0.6, 
-                        colorup=candle_colors['up'], 
-                        colordown=candle_colors['down'], 
-                        alpha=0.9)
-        
-        # Plot volume if enabled
-        if self.ax_volume and 'Volume' in data.columns:
-            self.ax_volume.bar(dates, data['Volume'], color='#6200EA', alpha=0.6)
-            self.ax_volume.set_ylabel('Volume', color='#FFFFFF', fontsize=10)
-            self.ax_volume.tick_params(colors='#FFFFFF', labelsize=8)
-            self.ax_volume.set_facecolor('#212121')
-            for spine in self.ax_volume.spines.values():
-                spine.set_color('#FFFFFF')
-            self.fig.subplots_adjust(hspace=0)
-        
-        # Format x-axis with better date display
-        self.ax.xaxis_date()
-        self.fig.autofmt_xdate()
-        locator = mdates.AutoDateLocator()
-        formatter = mdates.ConciseDateFormatter(locator)
-        self.ax.xaxis.set_major_locator(locator)
-        self.ax.xaxis.set_major_formatter(formatter)
-        
-        # Flat chart styling
-        bg_color = '#212121'
-        text_color = '#FFFFFF'
-        grid_color = '#424242'
-        
-        self.ax.grid(show_grid, linestyle='--', alpha=0.7, color=grid_color)
-        self.ax.set_facecolor(bg_color)
-        self.fig.patch.set_facecolor(bg_color)
-        self.ax.tick_params(colors=text_color, labelsize=10)
-        self.ax.xaxis.label.set_color(text_color)
-        self.ax.yaxis.label.set_color(text_color)
-        self.ax.title.set_color(text_color)
-        
-        for spine in self.ax.spines.values():
-            spine.set_color(text_color)
-        
-        # Set title with symbol
-        title = f"{symbol} {self.translator.tr('price_chart')}" if symbol else self.translator.tr('price_chart')
-        self.ax.set_title(title, pad=20, fontsize=14, fontfamily='Roboto')
-        self.ax.set_ylabel('Price', labelpad=10, fontsize=12, fontfamily='Roboto')
-        
-        self.draw()
+            layout.addWidget(QLabel(tr('perf_stage_totals')))
+            rows = []
+            for stage, total in metrics.stage_totals(spans).items():
+                rate = total['rows'] / total['seconds'] if total['seconds'] > 0 else 0
+                rows.append([stage, f"{total['spans']}", f"{total['seconds']:.3f}", f"{total['rows']:,}",
+                             f"{rate:,.0f}", f"{total['bytes'] / 2**20:.1f}"])
+            layout.addWidget(self.make_table(
+                [tr('perf_stage'), tr('perf_spans'), tr('perf_seconds'), tr('perf_rows'), tr('perf_rate'),
+                 tr('perf_megabytes')], rows))
+            layout.addWidget(QLabel(tr('perf_slowest')))
+            rows = [[series, f"{seconds:.3f}",
+                     ", ".join(f"{stage} {part:.2f}s" for stage, part in sorted(
+                         stages.items(), key=lambda item: item[1], reverse=True))]
+                    for series, seconds, stages in metrics.slowest_series(spans=spans)]
+            layout.addWidget(self.make_table([tr('perf_series'), tr('perf_seconds'), tr('perf_breakdown')], rows))
+        button_box = QDialogButtonBox(QDialogButtonBox.Close)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        self.setLayout(layout)
+
+    def make_table(self, headers, rows):
+        table = QTableWidget(len(rows), len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column > 0 and value[:1].isdigit():
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, column, item)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
 
 class DataDownloadThread(QThread):
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(dict)  # Emits dict of dataframes with full OHLC data
+    """Runs a DownloadJob; log messages and progress are polled by the window, not signalled"""
+    finished = pyqtSignal(object)  # Emits the ChartStore of OHLC dataframes
     error = pyqtSignal(str)
-    log_message = pyqtSignal(str, str)  # message, level
 
-    def __init__(self, symbols, timeframes, start_dt, end_dt, output_file, export_format, selected_columns):
+    def __init__(self, symbols, timeframes, start_dt, end_dt, output_file, export_format, selected_columns,
+                 use_cache=False, cache_dir='bar_cache', window_days=30, excel_workers=None,
+                 terminal_paths=None, derive_timeframes=False, tick_window_hours=24, symbol_catalog=None,
+                 session=None, chart_store=None, csv_engine='pandas', csv_compression=None, metrics=None,
+                 time_output=None, panel_field=None, panel_ffill=False, panel_format='csv'):
         super().__init__()
-        self.symbols = symbols
-        self.timeframes = timeframes
-        self.start_dt = start_dt
-        self.end_dt = end_dt
-        self.output_file = output_file
-        self.export_format = export_format
-        self.selected_columns = selected_columns
-        self._is_running = True
+        from download_core import DownloadJob
+        self.messages = deque()  # (message, level) pairs waiting for the window
+        self.snapshot = None  # Latest progress snapshot
+        self.job = DownloadJob(
+            symbols, timeframes, start_dt, end_dt, output_file, export_format, selected_columns,
+            use_cache=use_cache, cache_dir=cache_dir, window_days=window_days, excel_workers=excel_workers,
+            terminal_paths=terminal_paths, derive_timeframes=derive_timeframes,
+            tick_window_hours=tick_window_hours, symbol_catalog=symbol_catalog,
+            session=session, chart_store=chart_store, csv_engine=csv_engine, csv_compression=csv_compression,
+            metrics=metrics, time_output=time_output, panel_field=panel_field, panel_ffill=panel_ffill,
+            panel_format=panel_format, log=self.queue_message, progress=self.set_progress, error=self.error.emit
+        )
+
+    def queue_message(self, message, level):
+        self.messages.append((message, level))
+
+    def set_progress(self, snapshot):
+        self.snapshot = snapshot
+
+    def take_updates(self):
+        """Drain the queued log messages; returns (messages, latest progress snapshot)"""
+        messages = []
+        while self.messages:
+            messages.append(self.messages.popleft())
+        return messages, self.snapshot
+
+    def run(self):
+        result_data = self.job.run()
+        if result_data is not None:
+            self.finished.emit(result_data)
+
+    def stop(self):
+        self.job.stop()
+
+class SymbolCatalogThread(QThread):
+    """Loads the symbol catalog and refreshes it from MT5 when stale (or when forced)"""
+    refreshed = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, catalog, session, force=False):
+        super().__init__()
+        self.catalog = catalog
+        self.session = session
+        self.force = force
 
     def run(self):
         try:
-            self.log_message.emit("Attempting to initialize MT5 connection...", "INFO")
-            if not mt5.initialize():
-                error_msg = f"Failed to initialize MT5 connection. Error: {mt5.last_error()}"
-                self.log_message.emit(error_msg, "ERROR")
-                self.error.emit(error_msg)
+            self.catalog.load()
+            if not self.force and not self.catalog.is_stale():
                 return
-
-            try:
-                self.log_message.emit("Getting available symbols...", "INFO")
-                available_symbols = [s.name for s in mt5.symbols_get()]
-                self.log_message.emit(f"Found {len(available_symbols)} available symbols", "INFO")
-                
-                result_data = {}  # Stores full OHLC data for charting
-                export_data = {}  # Stores data with user-selected columns for export
-                
-                tf_mapping = {
-                    'M1': mt5.TIMEFRAME_M1, 'M5': mt5.TIMEFRAME_M5, 'M15': mt5.TIMEFRAME_M15,
-                    'M30': mt5.TIMEFRAME_M30, 'H1': mt5.TIMEFRAME_H1, 'H4': mt5.TIMEFRAME_H4,
-                    'D1': mt5.TIMEFRAME_D1, 'W1': mt5.TIMEFRAME_W1, 'MN1': mt5.TIMEFRAME_MN1,
-                }
-
-                total_tasks = len(self.symbols) * len(self.timeframes)
-                completed_tasks = 0
-                self.log_message.emit(f"Starting download of {total_tasks} symbol/timeframe combinations", "INFO")
-                
-                for symbol in self.symbols:
-                    if not self._is_running:
-                        break
-                        
-                    exact_symbol = next((s for s in available_symbols if s.lower() == symbol.lower()), None)
-                    
-                    if not exact_symbol:
-                        msg = f"Symbol {symbol} not found (case mismatch)"
-                        self.log_message.emit(msg, "WARNING")
-                        completed_tasks += len(self.timeframes)
-                        self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                        continue
-
-                    for timeframe in self.timeframes:
-                        if not self._is_running:
-                            break
-                            
-                        try:
-                            self.log_message.emit(f"Downloading {exact_symbol} {timeframe} data...", "INFO")
-                            rates = mt5.copy_rates_range(
-                                exact_symbol, 
-                                tf_mapping[timeframe], 
-                                self.start_dt, 
-                                self.end_dt
-                            )
-
-                            if rates is None or len(rates) == 0:
-                                error_msg = f"No data returned for {exact_symbol} {timeframe}: {mt5.last_error()}"
-                                self.log_message.emit(error_msg, "WARNING")
-                                completed_tasks += 1
-                                self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                                continue
-
-                            # Create full OHLC dataframe for charting
-                            full_df = pd.DataFrame(rates)
-                            if full_df.empty:
-                                msg = f"Empty dataframe for symbol {exact_symbol} {timeframe}"
-                                self.log_message.emit(msg, "WARNING")
-                                completed_tasks += 1
-                                self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                                continue
-
-                            # Convert and rename columns
-                            full_df['time'] = pd.to_datetime(full_df['time'], unit='s')
-                            if full_df['time'].dt.tz is None:
-                                full_df['time'] = full_df['time'].dt.tz_localize('UTC')
-                                
-                            full_df = full_df.rename(columns={
-                                'time': 'Date', 'open': 'Open', 'high': 'High',
-                                'low': 'Low', 'close': 'Close', 'tick_volume': 'Volume',
-                                'spread': 'Spread', 'real_volume': 'RealVolume'
-                            })
-
-                            # Store full OHLC data for charting with timeframe in key
-                            result_data[f"{exact_symbol}_{timeframe}"] = full_df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
-                            
-                            # Create export dataframe with user-selected columns
-                            export_df = full_df.copy()
-                            available_cols = [col for col in self.selected_columns if col in export_df.columns]
-                            if not available_cols:
-                                msg = f"No valid columns selected for {exact_symbol} {timeframe}"
-                                self.log_message.emit(msg, "WARNING")
-                                completed_tasks += 1
-                                self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                                continue
-                            
-                            export_df = export_df[available_cols]
-                            
-                            # For Excel export, we'll handle all data together after the loop
-                            if self.export_format == "xlsx":
-                                export_data[f"{exact_symbol}_{timeframe}"] = export_df
-                            elif self.output_file:
-                                # Single symbol/timeframe or CSV export
-                                if len(self.symbols) == 1 and len(self.timeframes) == 1 and not os.path.isdir(self.output_file):
-                                    filename = self.output_file
-                                else:
-                                    base_dir = os.path.dirname(self.output_file) if self.output_file else "."
-                                    if not os.path.exists(base_dir):
-                                        os.makedirs(base_dir)
-                                    filename = os.path.join(
-                                        base_dir,
-                                        f"{exact_symbol}_{timeframe}_"
-                                        f"{self.start_dt.strftime('%Y%m%d')}_to_"
-                                        f"{self.end_dt.strftime('%Y%m%d')}.{self.export_format}"
-                                    )
-                                
-                                try:
-                                    if self.export_format == "xlsx":
-                                        if 'Date' in export_df.columns:
-                                            export_df['Date'] = export_df['Date'].dt.tz_localize(None)
-                                        export_df.to_excel(filename, index=False, engine='openpyxl')
-                                    else:
-                                        export_df.to_csv(filename, index=False)
-                                    self.log_message.emit(f"Successfully saved {len(export_df)} rows to {filename}", "INFO")
-                                except Exception as e:
-                                    error_msg = f"Failed to save file: {e}"
-                                    self.log_message.emit(error_msg, "ERROR")
-                                    completed_tasks += 1
-                                    self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                                    continue
-
-                            completed_tasks += 1
-                            progress = int((completed_tasks / total_tasks) * 100)
-                            self.progress.emit(progress)
-                            self.log_message.emit(f"Progress: {progress}%", "INFO")
-                            self.msleep(100)  # Small delay to allow UI updates
-
-                        except Exception as e:
-                            error_msg = f"Error processing {exact_symbol} {timeframe}: {str(e)}"
-                            self.log_message.emit(error_msg, "ERROR")
-                            completed_tasks += 1
-                            self.progress.emit(int((completed_tasks / total_tasks) * 100))
-                            continue
-
-                # Handle multi-symbol/multi-timeframe Excel export
-                if self._is_running and self.export_format == "xlsx" and len(export_data) > 0 and self.output_file:
-                    try:
-                        self.log_message.emit("Preparing Excel workbook...", "INFO")
-                        wb = Workbook()
-                        if len(wb.sheetnames) > 0:
-                            wb.remove(wb[wb.sheetnames[0]])
-                        
-                        for sheet_name, df in export_data.items():
-                            if 'Date' in df.columns:
-                                df['Date'] = df['Date'].dt.tz_localize(None)
-                            
-                            ws = wb.create_sheet(title=sheet_name[:31])  # Excel sheet name limit
-                            for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True)):
-                                for c_idx, value in enumerate(row):
-                                    ws.cell(row=r_idx+1, column=c_idx+1, value=value)
-                        
-                        wb.save(self.output_file)
-                        self.log_message.emit(f"Successfully saved {len(export_data)} sheets to {self.output_file}", "INFO")
-                    except Exception as e:
-                        error_msg = f"Failed to save Excel file: {str(e)}"
-                        self.log_message.emit(error_msg, "ERROR")
-                        self.error.emit(error_msg)
-
-                if self._is_running:
-                    self.log_message.emit("Download completed successfully", "INFO")
-                    self.finished.emit(result_data)
-                
-            except Exception as e:
-                error_msg = f"Error during download: {str(e)}"
-                self.log_message.emit(error_msg, "ERROR")
-                self.error.emit(error_msg)
-                
-            finally:
-                self.log_message.emit("Shutting down MT5 connection", "INFO")
-                mt5.shutdown()
-                
+            with self.session.acquire() as mt5:
+                self.refreshed.emit(self.catalog.refresh(mt5))
         except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-            self.log_message.emit(error_msg, "ERROR")
-            if mt5.initialize():
-                mt5.shutdown()
-            self.error.emit(error_msg)
-
-    def stop(self):
-        self._is_running = False
+            logging.error(f"Error refreshing symbol catalog: {e}")
+            self.error.emit(str(e))
 
 class MT5DataDownloader(QMainWindow):
     def __init__(self):
@@ -566,18 +525,39 @@ class MT5DataDownloader(QMainWindow):
         self.setWindowTitle(self.translator.tr('app_title'))
         self.setMinimumSize(1200, 700)
         self.dark_mode = True
-        self.chart_data = {}
+        self.chart_data = {}  # Replaced by a ChartStore on the first download
+        self.chart_memory_mb = 512
         self.current_chart_symbol = None
         self.download_thread = None
         self.current_font = QFont("Roboto", 12)
         self.candle_colors = {'up': '#4CAF50', 'down': '#F44336'}
         self.show_grid = True
         self.show_volume = False
+        self.use_cache = True
+        self.window_days = 30
+        self.terminal_paths = []
+        self.derive_timeframes = False
+        self.tick_window_hours = 24
+        self.csv_engine = 'pandas'
+        self.csv_compression = None
+        self.time_format = 'datetime'
+        self.output_timezone = 'UTC'
+        self.server_timezone = 'UTC'
+        self.panel_field = None
+        self.panel_ffill = False
+        self.panel_format = 'csv'
+        self.symbol_catalog = SymbolCatalog()
+        self.catalog_thread = None
+        self.catalog_waiters = []  # Actions run once the background catalog load is over
+        self.metrics = MetricsRecorder()  # Timing spans of downloads and charts, see mt5_metrics.jsonl
+        self.update_timer = QTimer(self)
+        self.update_timer.setInterval(UPDATE_INTERVAL_MS)
+        self.update_timer.timeout.connect(self.flush_download_updates)
         self.load_settings()
+        # One MT5 connection for the life of the app, shared by downloads and symbol lookups
+        self.mt5_session = MT5Session(self.terminal_paths[0] if self.terminal_paths else None)
         self.setup_ui()
         self.apply_dark_theme()
-        self.chart.dark_mode = self.dark_mode
-        self.chart.translator = self.translator
 
     def load_settings(self):
         """Load font, font size, and chart settings from settings.json"""
@@ -592,6 +572,20 @@ class MT5DataDownloader(QMainWindow):
                     self.candle_colors['down'] = settings.get('down_color', '#F44336')
                     self.show_grid = settings.get('show_grid', True)
                     self.show_volume = settings.get('show_volume', False)
+                    self.use_cache = settings.get('use_cache', True)
+                    self.window_days = settings.get('window_days', 30)
+                    self.terminal_paths = settings.get('terminal_paths', [])
+                    self.derive_timeframes = settings.get('derive_timeframes', False)
+                    self.tick_window_hours = settings.get('tick_window_hours', 24)
+                    self.chart_memory_mb = settings.get('chart_memory_mb', 512)
+                    self.csv_engine = settings.get('csv_engine', 'pandas')
+                    self.csv_compression = settings.get('csv_compression')
+                    self.time_format = settings.get('time_format', 'datetime')
+                    self.output_timezone = settings.get('output_timezone', 'UTC')
+                    self.server_timezone = settings.get('server_timezone', 'UTC')
+                    self.panel_field = settings.get('panel_field')
+                    self.panel_ffill = settings.get('panel_ffill', False)
+                    self.panel_format = settings.get('panel_format', 'csv')
                     logging.info(f"Loaded font: {font_name}, size: {font_size}, "
                                f"chart settings: {self.candle_colors}, grid: {self.show_grid}, volume: {self.show_volume}")
         except Exception as e:
@@ -607,7 +601,21 @@ class MT5DataDownloader(QMainWindow):
                 'up_color': self.candle_colors['up'],
                 'down_color': self.candle_colors['down'],
                 'show_grid': self.show_grid,
-                'show_volume': self.show_volume
+                'show_volume': self.show_volume,
+                'use_cache': self.use_cache,
+                'window_days': self.window_days,
+                'terminal_paths': self.terminal_paths,
+                'derive_timeframes': self.derive_timeframes,
+                'tick_window_hours': self.tick_window_hours,
+                'chart_memory_mb': self.chart_memory_mb,
+                'csv_engine': self.csv_engine,
+                'csv_compression': self.csv_compression,
+                'time_format': self.time_format,
+                'output_timezone': self.output_timezone,
+                'server_timezone': self.server_timezone,
+                'panel_field': self.panel_field,
+                'panel_ffill': self.panel_ffill,
+                'panel_format': self.panel_format
             }
             with open('settings.json', 'w') as f:
                 json.dump(settings, f, indent=4)
@@ -747,7 +755,7 @@ class MT5DataDownloader(QMainWindow):
         self.tf_list.setSelectionMode(QListWidget.MultiSelection)
         self.tf_list.setToolTip(self.translator.tr('tooltip_timeframes'))
         self.tf_list.setFont(self.current_font)
-        for tf in ["M1", "M5", "M15", "M30", "H1", "H4", "D1", "W1", "MN1"]:
+        for tf in TIMEFRAMES + [TICKS]:
             item = QListWidgetItem(tf)
             self.tf_list.addItem(item)
         for i in range(self.tf_list.count()):
@@ -765,7 +773,7 @@ class MT5DataDownloader(QMainWindow):
         self.format_combo = QComboBox()
         self.format_combo.setToolTip(self.translator.tr('tooltip_export_format'))
         self.format_combo.setFont(self.current_font)
-        self.format_combo.addItems(["xlsx", "csv"])
+        self.format_combo.addItems(EXPORT_FORMATS)
         controls_grid.addWidget(self.format_combo, row, 1)
         row += 1
         
@@ -825,6 +833,19 @@ class MT5DataDownloader(QMainWindow):
         controls_grid.addLayout(date_layout, row, 1)
         row += 1
         
+        # Fetch window
+        self.window_label = QLabel(self.translator.tr('window_label'))
+        self.window_label.setFont(self.current_font)
+        controls_grid.addWidget(self.window_label, row, 0)
+        self.window_spin = QSpinBox()
+        self.window_spin.setRange(0, 3650)
+        self.window_spin.setValue(self.window_days)
+        self.window_spin.setToolTip(self.translator.tr('tooltip_window'))
+        self.window_spin.setFont(self.current_font)
+        self.window_spin.valueChanged.connect(self.set_window_days)
+        controls_grid.addWidget(self.window_spin, row, 1)
+        row += 1
+        
         # Output file
         self.output_path_label = QLabel(self.translator.tr('output_path'))
         self.output_path_label.setFont(self.current_font)
@@ -851,7 +872,7 @@ class MT5DataDownloader(QMainWindow):
         self.column_list = QListWidget()
         self.column_list.setToolTip(self.translator.tr('tooltip_columns'))
         self.column_list.setFont(self.current_font)
-        for col in ["Date", "Open", "High", "Low", "Close", "Volume", "Spread", "RealVolume"]:
+        for col in EXPORT_COLUMNS:
             item = QListWidgetItem(col)
             item.setCheckState(Qt.Checked)
             self.column_list.addItem(item)
@@ -859,6 +880,24 @@ class MT5DataDownloader(QMainWindow):
         controls_grid.addWidget(self.column_list, row, 1)
         row += 1
         
+        # Local bar cache
+        self.use_cache_check = QCheckBox(self.translator.tr('use_cache'))
+        self.use_cache_check.setToolTip(self.translator.tr('tooltip_use_cache'))
+        self.use_cache_check.setFont(self.current_font)
+        self.use_cache_check.setChecked(self.use_cache)
+        self.use_cache_check.toggled.connect(self.toggle_cache)
+        controls_grid.addWidget(self.use_cache_check, row, 1)
+        row += 1
+        
+        # Derived timeframes
+        self.derive_check = QCheckBox(self.translator.tr('derive_timeframes'))
+        self.derive_check.setToolTip(self.translator.tr('tooltip_derive_timeframes'))
+        self.derive_check.setFont(self.current_font)
+        self.derive_check.setChecked(self.derive_timeframes)
+        self.derive_check.toggled.connect(self.toggle_derive)
+        controls_grid.addWidget(self.derive_check, row, 1)
+        row += 1
+        
         # Plot selector
         self.plot_label = QLabel(self.translator.tr('plot_label'))
         self.plot_label.setFont(self.current_font)
@@ -925,12 +964,17 @@ class MT5DataDownloader(QMainWindow):
         right_layout = QVBoxLayout()
         right_layout.setContentsMargins(20, 20, 20, 20)
         
-        self.chart = CandlestickChart(right_panel, width=8, height=6, dpi=100)
-        self.toolbar = NavigationToolbar(self.chart, right_panel)
-        right_layout.addWidget(self.toolbar)
-        right_layout.addWidget(self.chart)
+        # The matplotlib chart is created on first plot; until then a light
+        # placeholder keeps the panel's place in the layout
+        self.chart = None
+        self.toolbar = None
+        self.chart_placeholder = QLabel(self.translator.tr('no_data'))
+        self.chart_placeholder.setAlignment(Qt.AlignCenter)
+        self.chart_placeholder.setMinimumSize(800, 600)
+        right_layout.addWidget(self.chart_placeholder)
         
         right_panel.setLayout(right_layout)
+        self.right_panel = right_panel
         
         # Add panels to splitter
         main_splitter.addWidget(left_panel)
@@ -993,6 +1037,67 @@ class MT5DataDownloader(QMainWindow):
         chart_settings_action.triggered.connect(self.open_chart_settings)
         settings_menu.addAction(chart_settings_action)
         
+        terminals_action = QAction(self.translator.tr('action_terminals'), self)
+        terminals_action.triggered.connect(self.configure_terminals)
+        settings_menu.addAction(terminals_action)
+        
+        refresh_symbols_action = QAction(self.translator.tr('action_refresh_symbols'), self)
+        refresh_symbols_action.triggered.connect(lambda: self.refresh_symbol_catalog(force=True))
+        settings_menu.addAction(refresh_symbols_action)
+        
+        csv_menu = settings_menu.addMenu(self.translator.tr('action_csv_output'))
+        fast_csv_action = QAction(self.translator.tr('action_fast_csv'), self, checkable=True)
+        fast_csv_action.setChecked(self.csv_engine == 'fast')
+        fast_csv_action.triggered.connect(self.toggle_fast_csv)
+        csv_menu.addAction(fast_csv_action)
+        csv_menu.addSeparator()
+        compression_group = QActionGroup(self)
+        for compression, key in ((None, 'action_csv_uncompressed'), ('gzip', 'action_csv_gzip'),
+                                 ('zstd', 'action_csv_zstd')):
+            action = QAction(self.translator.tr(key), self, checkable=True)
+            action.setChecked(self.csv_compression == compression)
+            action.triggered.connect(lambda checked, c=compression: self.set_csv_compression(c))
+            compression_group.addAction(action)
+            csv_menu.addAction(action)
+        
+        time_menu = settings_menu.addMenu(self.translator.tr('action_timestamps'))
+        time_format_group = QActionGroup(self)
+        for time_format in ('datetime', 'epoch_s', 'epoch_ms'):
+            action = QAction(self.translator.tr(f'action_time_{time_format}'), self, checkable=True)
+            action.setChecked(self.time_format == time_format)
+            action.triggered.connect(lambda checked, f=time_format: self.set_time_format(f))
+            time_format_group.addAction(action)
+            time_menu.addAction(action)
+        time_menu.addSeparator()
+        output_timezone_action = QAction(self.translator.tr('action_output_timezone'), self)
+        output_timezone_action.triggered.connect(self.configure_output_timezone)
+        time_menu.addAction(output_timezone_action)
+        server_timezone_action = QAction(self.translator.tr('action_server_timezone'), self)
+        server_timezone_action.triggered.connect(self.configure_server_timezone)
+        time_menu.addAction(server_timezone_action)
+        
+        panel_menu = settings_menu.addMenu(self.translator.tr('action_panel_export'))
+        panel_field_group = QActionGroup(self)
+        for field in (None, 'Close', 'OHLC', 'Volume'):
+            action = QAction(self.translator.tr(f'action_panel_{field or "off"}'), self, checkable=True)
+            action.setChecked(self.panel_field == field)
+            action.triggered.connect(lambda checked, f=field: self.set_panel_field(f))
+            panel_field_group.addAction(action)
+            panel_menu.addAction(action)
+        panel_menu.addSeparator()
+        panel_ffill_action = QAction(self.translator.tr('action_panel_ffill'), self, checkable=True)
+        panel_ffill_action.setChecked(self.panel_ffill)
+        panel_ffill_action.triggered.connect(self.toggle_panel_ffill)
+        panel_menu.addAction(panel_ffill_action)
+        panel_menu.addSeparator()
+        panel_format_group = QActionGroup(self)
+        for panel_format in ('csv', 'parquet', 'npz'):
+            action = QAction(self.translator.tr(f'action_panel_{panel_format}'), self, checkable=True)
+            action.setChecked(self.panel_format == panel_format)
+            action.triggered.connect(lambda checked, f=panel_format: self.set_panel_format(f))
+            panel_format_group.addAction(action)
+            panel_menu.addAction(action)
+        
         toggle_language_action = QAction(self.translator.tr('action_toggle_language'), self)
         toggle_language_action.setShortcut('Ctrl+L')
         toggle_language_action.triggered.connect(self.toggle_language)
@@ -1010,6 +1115,10 @@ class MT5DataDownloader(QMainWindow):
         view_log_action.triggered.connect(self.view_log)
         help_menu.addAction(view_log_action)
 
+        performance_action = QAction(self.translator.tr('action_performance'), self)
+        performance_action.triggered.connect(self.show_performance)
+        help_menu.addAction(performance_action)
+
     def apply_dark_theme(self):
         """Apply flat dark theme to all UI elements"""
         palette = QPalette()
@@ -1119,7 +1228,9 @@ class MT5DataDownloader(QMainWindow):
                 background-color: #6200EA;
             }
         """ % (self.current_font.family(), self.current_font.pointSize())
-        self.toolbar.setStyleSheet(toolbar_style)
+        self.toolbar_style = toolbar_style
+        if self.toolbar is not None:
+            self.toolbar.setStyleSheet(toolbar_style)
         
         # Input styling
         input_style = """
@@ -1146,6 +1257,7 @@ class MT5DataDownloader(QMainWindow):
         self.format_combo.setStyleSheet(input_style)
         self.symbol_combo.setStyleSheet(input_style)
         self.days_spin.setStyleSheet(input_style)
+        self.window_spin.setStyleSheet(input_style)
         self.start_date.setStyleSheet(input_style)
         self.end_date.setStyleSheet(input_style)
         self.file_input.setStyleSheet(input_style)
@@ -1228,7 +1340,8 @@ class MT5DataDownloader(QMainWindow):
         self.progress_bar.setStyleSheet(progress_style)
         
         QApplication.setPalette(palette)
-        self.chart.dark_mode = self.dark_mode
+        if self.chart is not None:
+            self.chart.dark_mode = self.dark_mode
         if hasattr(self, 'current_chart_symbol') and self.current_chart_symbol:
             self.plot_data(self.chart_data[self.current_chart_symbol], self.current_chart_symbol)
 
@@ -1247,6 +1360,9 @@ class MT5DataDownloader(QMainWindow):
             self.candle_colors['down'] = dialog.down_color.name()
             self.show_grid = dialog.grid_check.isChecked()
             self.show_volume = dialog.volume_check.isChecked()
+            self.chart_memory_mb = dialog.memory_spin.value()
+            if hasattr(self.chart_data, 'set_budget'):
+                self.chart_data.set_budget(self.chart_memory_mb * 1024 * 1024)
             self.save_settings()
             if self.current_chart_symbol and self.current_chart_symbol in self.chart_data:
                 self.plot_data(self.chart_data[self.current_chart_symbol], self.current_chart_symbol)
@@ -1268,6 +1384,14 @@ class MT5DataDownloader(QMainWindow):
         else:
             QMessageBox.warning(self, "Error", "Log file not found.")
 
+    def show_performance(self):
+        """Show per-stage timings and the slowest series of the last run"""
+        try:
+            PerformanceDialog(self, self.metrics).exec_()
+        except Exception as e:
+            logging.error(f"Error showing performance: {str(e)}")
+            QMessageBox.warning(self, "Error", f"Failed to show performance: {str(e)}")
+
     def toggle_language(self):
         """Toggle between English and Farsi"""
         try:
@@ -1312,6 +1436,11 @@ class MT5DataDownloader(QMainWindow):
             self.output_path_label.setText(self.translator.tr('output_path'))
             self.columns_label.setText(self.translator.tr('columns_label'))
             self.plot_label.setText(self.translator.tr('plot_label'))
+            self.use_cache_check.setText(self.translator.tr('use_cache'))
+            self.derive_check.setText(self.translator.tr('derive_timeframes'))
+            self.window_label.setText(self.translator.tr('window_label'))
+            if self.chart is None:
+                self.chart_placeholder.setText(self.translator.tr('no_data'))
             
             # Update radio buttons
             self.range_radio.setText(self.translator.tr('specific_range'))
@@ -1337,6 +1466,9 @@ class MT5DataDownloader(QMainWindow):
             self.save_preset_btn.setToolTip(self.translator.tr('tooltip_save_preset'))
             self.watchlist_btn.setToolTip(self.translator.tr('tooltip_load_watchlist'))
             self.browse_btn.setToolTip(self.translator.tr('tooltip_browse'))
+            self.use_cache_check.setToolTip(self.translator.tr('tooltip_use_cache'))
+            self.derive_check.setToolTip(self.translator.tr('tooltip_derive_timeframes'))
+            self.window_spin.setToolTip(self.translator.tr('tooltip_window'))
             
             # RTL support for Farsi
             layout_direction = Qt.RightToLeft if self.translator.current_lang == 'fa' else Qt.LeftToRight
@@ -1409,14 +1541,16 @@ class MT5DataDownloader(QMainWindow):
                 )
 
     def load_watchlist_symbols(self):
-        """Load symbols from MT5 market watch"""
-        if not mt5.initialize():
+        """Load symbols from MT5 market watch (served from the symbol catalog while it is fresh)"""
+        if self.catalog_thread is not None and self.catalog_thread.isRunning():
+            self.after_catalog_load(self.load_watchlist_symbols)
+            return
+        if not self.ensure_symbol_catalog():
             QMessageBox.warning(self, "Error", self.translator.tr('mt5_connect_error'))
             return
         
         try:
-            symbols = mt5.symbols_get()
-            watchlist_symbols = [s.name for s in symbols if s.visible]
+            watchlist_symbols = self.symbol_catalog.watchlist()
             
             if not watchlist_symbols:
                 QMessageBox.information(self, "Info", self.translator.tr('no_watchlist'))
@@ -1457,24 +1591,22 @@ class MT5DataDownloader(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to load watchlist: {e}")
             logging.error(f"Error loading watchlist: {e}")
-        finally:
-            mt5.shutdown()
 
     def get_current_symbols(self):
         """Get list of currently entered symbols"""
         return [s.strip() for s in self.symbol_input.text().split(',') if s.strip()]
 
     def validate_symbols(self, symbols):
-        """Validate symbols against MT5's available symbols"""
-        if not mt5.initialize():
-            return False, self.translator.tr('mt5_connect_error')
-        
+        """Validate symbols against the symbol catalog"""
         try:
-            available_symbols = [s.name.lower() for s in mt5.symbols_get()]
-            invalid_symbols = [
-                s for s in symbols 
-                if s.lower() not in available_symbols
-            ]
+            if not self.ensure_symbol_catalog():
+                return False, self.translator.tr('mt5_connect_error')
+            invalid_symbols = self.symbol_catalog.invalid(symbols)
+            if invalid_symbols:
+                # Recently listed symbols are missing from an older catalog
+                if not self.ensure_symbol_catalog(force=True):
+                    return False, self.translator.tr('mt5_connect_error')
+                invalid_symbols = self.symbol_catalog.invalid(symbols)
             
             if invalid_symbols:
                 return False, f"Invalid symbols: {', '.join(invalid_symbols)}"
@@ -1482,8 +1614,54 @@ class MT5DataDownloader(QMainWindow):
             
         except Exception as e:
             return False, str(e)
-        finally:
-            mt5.shutdown()
+
+    def ensure_symbol_catalog(self, force=False):
+        """Make the symbol catalog usable, refreshing it from MT5 only when it is stale.
+
+        Returns False when a refresh was needed, MT5 could not be reached and
+        there is no cached copy to fall back on.
+        """
+        if self.catalog_thread is not None and self.catalog_thread.isRunning():
+            # The background load holds the connection; use what it has loaded so far
+            return len(self.symbol_catalog) > 0
+        if not force and not self.symbol_catalog.is_stale():
+            return True
+        if force and self.symbol_catalog.server in self.symbol_catalog.refreshed:
+            return True
+        try:
+            # A running download holds the connection; fall back to the catalog we have
+            with self.mt5_session.acquire(timeout=0.5) as mt5:
+                self.symbol_catalog.refresh(mt5)
+            return True
+        except MT5SessionError as e:
+            logging.warning(f"Symbol catalog not refreshed: {e}")
+            return len(self.symbol_catalog) > 0
+
+    def refresh_symbol_catalog(self, force=False):
+        """Load the symbol catalog in the background and refresh it from MT5 when stale"""
+        if self.catalog_thread is not None and self.catalog_thread.isRunning():
+            return
+        if self.download_thread is not None and self.download_thread.isRunning():
+            return  # The download refreshes the catalog over its own connection
+        self.catalog_thread = SymbolCatalogThread(self.symbol_catalog, self.mt5_session, force=force)
+        self.catalog_thread.refreshed.connect(
+            lambda count: self.statusBar().showMessage(self.translator.tr('symbols_refreshed').format(count), 3000)
+        )
+        self.catalog_thread.error.connect(lambda message: logging.warning(f"Symbol catalog not refreshed: {message}"))
+        self.catalog_thread.finished.connect(self.run_catalog_waiters)
+        self.catalog_thread.start()
+
+    def after_catalog_load(self, action):
+        """Run `action` when the background catalog load finishes, instead of blocking the window on it"""
+        if action not in self.catalog_waiters:
+            self.catalog_waiters.append(action)
+        self.statusBar().showMessage(self.translator.tr('symbols_loading'))
+
+    def run_catalog_waiters(self):
+        waiters, self.catalog_waiters = self.catalog_waiters, []
+        self.statusBar().clearMessage()
+        for action in waiters:
+            action()
 
     def toggle_theme(self):
         """Toggle between dark and light themes (dark only as per request)"""
@@ -1491,14 +1669,111 @@ class MT5DataDownloader(QMainWindow):
         self.apply_dark_theme()
         QMessageBox.information(self, "Theme", self.translator.tr('theme_message'))
 
+    def toggle_cache(self, checked):
+        """Enable or disable the local bar cache and persist the choice"""
+        self.use_cache = checked
+        self.save_settings()
+
+    def toggle_derive(self, checked):
+        """Enable or disable building higher timeframes locally and persist the choice"""
+        self.derive_timeframes = checked
+        self.save_settings()
+
+    def toggle_fast_csv(self, checked):
+        """Switch CSV export between the pandas and the fast vectorized writer and persist the choice"""
+        self.csv_engine = 'fast' if checked else 'pandas'
+        self.save_settings()
+
+    def set_csv_compression(self, compression):
+        """Store the CSV compression (None, 'gzip' or 'zstd') and persist the choice"""
+        self.csv_compression = compression
+        self.save_settings()
+
+    def set_time_format(self, time_format):
+        """Store how exported dates are written ('datetime', 'epoch_s' or 'epoch_ms') and persist the choice"""
+        self.time_format = time_format
+        self.save_settings()
+
+    def set_panel_field(self, field):
+        """Export one aligned panel per timeframe with `field` ('Close', 'OHLC', 'Volume'), or None for series files"""
+        self.panel_field = field
+        self.save_settings()
+
+    def toggle_panel_ffill(self, checked):
+        """Enable or disable forward-filling panel cells of symbols without a bar and persist the choice"""
+        self.panel_ffill = checked
+        self.save_settings()
+
+    def set_panel_format(self, panel_format):
+        """Store the panel file format ('csv', 'parquet' or 'npz') and persist the choice"""
+        self.panel_format = panel_format
+        self.save_settings()
+
+    def ask_timezone(self, title_key, prompt_key, current, choices, allow_server=False):
+        """Let the user pick or type a time zone; returns it, or None when cancelled or unknown"""
+        from frames import SERVER_TIME, check_timezone, zone_name
+        items = list(dict.fromkeys([current] + choices))
+        zone, ok = QInputDialog.getItem(self, self.translator.tr(title_key), self.translator.tr(prompt_key),
+                                        items, 0, True)
+        if not ok or not zone.strip():
+            return None
+        zone = zone_name(zone)
+        if not (allow_server and zone == SERVER_TIME):
+            try:
+                check_timezone(zone)
+            except ValueError:
+                QMessageBox.warning(self, "Warning", self.translator.tr('invalid_timezone').format(zone))
+                return None
+        return zone
+
+    def configure_output_timezone(self):
+        """Choose the time zone exported datetimes are written in"""
+        zone = self.ask_timezone('action_output_timezone', 'output_timezone_prompt', self.output_timezone,
+                                 ['UTC', 'server', 'Europe/London', 'America/New_York', 'Asia/Tehran', 'Asia/Tokyo'],
+                                 allow_server=True)
+        if zone:
+            self.output_timezone = zone
+            self.save_settings()
+
+    def configure_server_timezone(self):
+        """Set the time zone of the trade server's clock, used to convert MT5 times"""
+        zone = self.ask_timezone('action_server_timezone', 'server_timezone_prompt', self.server_timezone,
+                                 ['UTC', 'EET', 'Europe/Moscow', 'America/New_York'])
+        if zone:
+            self.server_timezone = zone
+            self.save_settings()
+
+    def set_window_days(self, days):
+        """Store the fetch window size used to split long date ranges"""
+        self.window_days = days
+        self.save_settings()
+
+    def configure_terminals(self):
+        """Edit the list of MT5 terminal installations used for downloads"""
+        text, ok = QInputDialog.getMultiLineText(
+            self, self.translator.tr('action_terminals'), self.translator.tr('terminals_prompt'),
+            "\n".join(self.terminal_paths)
+        )
+        if ok:
+            self.terminal_paths = [line.strip() for line in text.splitlines() if line.strip()]
+            self.mt5_session.configure(self.terminal_paths[0] if self.terminal_paths else None)
+            self.save_settings()
+            self.statusBar().showMessage(
+                self.translator.tr('terminals_saved').format(len(self.terminal_paths)), 3000
+            )
+
     def toggle_dates(self):
         self.date_widget.setVisible(self.range_radio.isChecked())
         self.days_widget.setVisible(self.days_radio.isChecked())
 
     def browse_file(self):
         fmt = self.format_combo.currentText()
-        filter_str = "Excel Files (*.xlsx)" if fmt == "xlsx" else "CSV Files (*.csv)"
-        file, _ = QFileDialog.getSaveFileName(self, self.translator.tr('browse_btn'), "", filter_str)
+        if fmt in DATASET_FORMATS:
+            # Parquet/Feather exports are written as a partitioned folder tree
+            file = QFileDialog.getExistingDirectory(self, self.translator.tr('browse_btn'))
+        else:
+            filter_str = "Excel Files (*.xlsx)" if fmt == "xlsx" else "CSV Files (*.csv)"
+            file, _ = QFileDialog.getSaveFileName(self, self.translator.tr('browse_btn'), "", filter_str)
         if file:
             self.file_input.setText(file)
 
@@ -1513,25 +1788,46 @@ class MT5DataDownloader(QMainWindow):
         self.current_chart_symbol = selected_symbol
         self.plot_data(data, selected_symbol)
 
+    def ensure_chart(self):
+        """Create the matplotlib chart and toolbar the first time they are needed"""
+        if self.chart is not None:
+            return self.chart
+        from candle_chart import CandlestickChart, NavigationToolbar
+        layout = self.right_panel.layout()
+        self.chart = CandlestickChart(self.translator, self.right_panel, width=8, height=6, dpi=100)
+        self.chart.dark_mode = self.dark_mode
+        self.toolbar = NavigationToolbar(self.chart, self.right_panel)
+        self.toolbar.setStyleSheet(self.toolbar_style)
+        layout.replaceWidget(self.chart_placeholder, self.chart)
+        self.chart_placeholder.deleteLater()
+        layout.insertWidget(0, self.toolbar)
+        return self.chart
+
     def plot_data(self, data, symbol=""):
         """Plot data for a specific symbol"""
         try:
+            import pandas as pd
+            self.ensure_chart()
             if data is None or data.empty:
                 QMessageBox.warning(self, "No Data", self.translator.tr('no_data'))
                 return
                 
-            plot_data = data.copy()
+            plot_data = data  # The chart only reads the columns; no copy needed
             
             if not pd.api.types.is_datetime64_any_dtype(plot_data['Date']):
-                plot_data['Date'] = pd.to_datetime(plot_data['Date'])
+                plot_data = plot_data.assign(Date=pd.to_datetime(plot_data['Date']))
             
-            self.chart.plot_candles(
-                plot_data, 
-                symbol, 
-                candle_colors=self.candle_colors,
-                show_grid=self.show_grid,
-                show_volume=self.show_volume
-            )
+            # Series keys are SYMBOL_TIMEFRAME; the span is recorded with the last download's
+            series_symbol, _, timeframe = symbol.rpartition('_')
+            with self.metrics.span('chart', series_symbol or symbol, timeframe if series_symbol else None) as timing:
+                self.chart.plot_candles(
+                    plot_data, 
+                    symbol, 
+                    candle_colors=self.candle_colors,
+                    show_grid=self.show_grid,
+                    show_volume=self.show_volume
+                )
+                timing.add(rows=len(plot_data))
             
         except Exception as e:
             QMessageBox.critical(self, "Plot Error", f"Failed to plot data: {str(e)}")
@@ -1569,23 +1865,46 @@ class MT5DataDownloader(QMainWindow):
             QMessageBox.warning(self, "Column Selection", self.translator.tr('no_columns'))
             return
 
+        from frames import TimeOutput
+        try:
+            time_output = TimeOutput(self.time_format, self.output_timezone, self.server_timezone)
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return
+
+        from chart_store import ChartStore
+        if isinstance(self.chart_data, ChartStore):
+            self.chart_data.clear()  # One store for the app, so memory stays within one budget
+        else:
+            self.chart_data = ChartStore(self.chart_memory_mb * 1024 * 1024)
+        self.symbol_combo.clear()
+        self.current_chart_symbol = None
+
         self.download_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.plot_btn.setEnabled(False)
         self.statusBar().showMessage(self.translator.tr('download_starting'))
         self.status_label.setText(self.translator.tr('download_starting'))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
         
         self.download_thread = DataDownloadThread(
             symbols, selected_timeframes, 
             datetime.combine(start, datetime.min.time()),
             datetime.combine(end, datetime.min.time()),
-            output_file, export_format, selected_columns
+            output_file, export_format, selected_columns,
+            use_cache=self.use_cache, window_days=self.window_days,
+            terminal_paths=self.terminal_paths, derive_timeframes=self.derive_timeframes,
+            tick_window_hours=self.tick_window_hours, symbol_catalog=self.symbol_catalog,
+            session=self.mt5_session, chart_store=self.chart_data,
+            csv_engine=self.csv_engine, csv_compression=self.csv_compression, metrics=self.metrics,
+            time_output=time_output, panel_field=self.panel_field, panel_ffill=self.panel_ffill,
+            panel_format=self.panel_format
         )
-        self.download_thread.progress.connect(self.progress_bar.setValue)
         self.download_thread.finished.connect(self.on_download_finished)
         self.download_thread.error.connect(self.download_error)
-        self.download_thread.log_message.connect(self.update_status)
         self.download_thread.start()
+        self.update_timer.start()
 
     def stop_download(self):
         if hasattr(self, 'download_thread') and isinstance(self.download_thread, QThread) and self.download_thread.isRunning():
@@ -1604,11 +1923,36 @@ class MT5DataDownloader(QMainWindow):
         }.get(level, "#B0BEC5")
         
         self.status_label.setText(f"<font color='{color}'>{message}</font>")
-        self.status_label.repaint()
+
+    def flush_download_updates(self):
+        """Apply the download thread's queued messages and latest progress (runs at UPDATE_INTERVAL_MS)"""
+        thread = self.download_thread
+        if thread is None:
+            self.update_timer.stop()
+            return
+        messages, snapshot = thread.take_updates()
+        if messages:
+            # Show the newest message, unless it would hide a warning or error from the same interval
+            message, level = next((m for m in reversed(messages) if m[1] != "INFO"), messages[-1])
+            self.update_status(message, level)
+        if snapshot is not None:
+            self.show_progress(snapshot)
+        if not thread.isRunning() and not thread.messages:
+            self.update_timer.stop()
+
+    def show_progress(self, snapshot):
+        """Show percent done, throughput and ETA on the progress bar"""
+        eta = snapshot['eta_seconds']
+        self.progress_bar.setValue(snapshot['percent'])
+        self.progress_bar.setFormat(self.translator.tr('progress_format').format(
+            rate=f"{snapshot['bars_per_second']:,.0f}",
+            eta=str(timedelta(seconds=int(eta))) if eta is not None else "--:--"
+        ))
 
     def on_download_finished(self, result_data):
         """Handle download completion"""
-        self.chart_data = result_data
+        self.flush_download_updates()
+        self.update_timer.stop()
         self.download_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setValue(100)
@@ -1629,6 +1973,8 @@ class MT5DataDownloader(QMainWindow):
             self.status_label.setText(self.translator.tr('no_data_received'))
 
     def download_error(self, error_msg):
+        self.flush_download_updates()
+        self.update_timer.stop()
         self.statusBar().showMessage(self.translator.tr('error_occurred'))
         self.status_label.setText(f"<font color='#F44336'>Error: {error_msg}</font>")
         self.download_btn.setEnabled(True)
@@ -1648,14 +1994,23 @@ class MT5DataDownloader(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.download_thread.stop()
                 self.download_thread.wait(1000)
+                self.release_resources()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.release_resources()
             event.accept()
 
+    def release_resources(self):
+        """Close the MT5 session and delete spilled chart files on exit"""
+        self.mt5_session.close()
+        if hasattr(self.chart_data, 'clear'):
+            self.chart_data.clear()
+
 def main():
     app = QApplication(sys.argv)
+    STARTUP_TIMER.mark('qapplication')
     app.setStyle('Fusion')
     
     app.setStyleSheet("""
@@ -1670,8 +2025,22 @@ def main():
     """)
     
     window = MT5DataDownloader()
+    STARTUP_TIMER.mark('window_built')
     window.show()
+    # Fires once the event loop has processed the first show/paint events
+    QTimer.singleShot(0, lambda: on_first_window(app))
+    QTimer.singleShot(0, window.refresh_symbol_catalog)
     sys.exit(app.exec_())
 
+def on_first_window(app):
+    """Record time-to-first-window and print the startup report if requested"""
+    STARTUP_TIMER.mark('first_window')
+    report = STARTUP_TIMER.report()
+    logging.info(report.replace('\n', ' | '))
+    if '--startup-report' in sys.argv:
+        print(report, flush=True)
+    if '--quit-after-show' in sys.argv:
+        app.quit()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,338 @@
+import os
+import re
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from mt5_fetch import iter_windows
+
+# Segments a series may have before the smallest neighbours are merged
+SEGMENT_LIMIT = 32
+# Bounds that take in every bar time
+FIRST_EPOCH, LAST_EPOCH = -2 ** 62, 2 ** 62
+
+
+def to_epoch(dt):
+    """Convert a naive (UTC) or aware datetime to integer epoch seconds"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def from_epoch(seconds):
+    """Convert epoch seconds to the naive UTC datetime MT5 expects"""
+    return datetime.fromtimestamp(int(seconds), timezone.utc).replace(tzinfo=None)
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or adjacent inclusive [start, end] epoch ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Return the parts of [start, end] not contained in the covered ranges"""
+    gaps = []
+    cursor = start
+    for c_start, c_end in merge_ranges(covered):
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append([cursor, c_start - 1])
+        cursor = max(cursor, c_end + 1)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append([cursor, end])
+    return gaps
+
+
+def merge_rates(existing, new):
+    """Merge two MT5 rate arrays by bar time; bars in `new` win on duplicates"""
+    if existing is None or len(existing) == 0:
+        combined = new
+    elif new is None or len(new) == 0:
+        return existing
+    else:
+        combined = np.concatenate([new, existing.astype(new.dtype, copy=False)])
+    # np.unique keeps the first occurrence, so fresh bars override cached ones
+    _, idx = np.unique(combined['time'], return_index=True)
+    return combined[idx]
+
+
+class BarCache:
+    """Persistent on-disk bar store keyed by (server, symbol, timeframe).
+
+    A small JSON file per series lists the epoch ranges already downloaded
+    and the segments holding its bars: NumPy structured arrays (the layout
+    ``copy_rates_range`` returns), one per fetch, that are written once and
+    never rewritten, so a top-up costs as much as the new bars and not the
+    whole history. Where segments overlap (a refreshed last bar) the later
+    one wins. Past `segment_limit` segments the smallest neighbouring pair
+    is merged. ``iter_rates`` only asks MT5 for the parts of a request that
+    are not covered yet.
+    """
+
+    def __init__(self, cache_dir='bar_cache', segment_limit=SEGMENT_LIMIT):
+        self.cache_dir = cache_dir
+        self.segment_limit = segment_limit
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _safe(name):
+        return re.sub(r'[^A-Za-z0-9._-]+', '_', str(name)) or '_'
+
+    def _paths(self, server, symbol, timeframe):
+        folder = os.path.join(self.cache_dir, self._safe(server), self._safe(symbol))
+        base = os.path.join(folder, self._safe(timeframe))
+        return folder, base + '.npy', base + '.json'
+
+    def _meta(self, server, symbol, timeframe):
+        """The series' ranges and segments (``[file, first, last, bars]`` in write order), or None"""
+        _, data_path, meta_path = self._paths(server, symbol, timeframe)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if 'segments' not in meta:
+                # One .npy per series, as older versions stored it
+                rates = np.load(data_path, mmap_mode='r', allow_pickle=False)
+                meta['segments'] = [segment_entry(os.path.basename(data_path), rates)] if len(rates) else []
+                meta['next'] = 1
+            meta['ranges'] = [list(r) for r in meta.get('ranges', [])]
+            return meta
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache for {symbol} {timeframe}: {e}")
+            return None
+
+    def _write_meta(self, server, symbol, timeframe, meta):
+        folder, _, meta_path = self._paths(server, symbol, timeframe)
+        os.makedirs(folder, exist_ok=True)
+        tmp_meta = meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump({'server': server, 'symbol': symbol, 'timeframe': timeframe,
+                       'ranges': merge_ranges(meta['ranges']), 'segments': meta['segments'],
+                       'next': meta['next'], 'bars': sum(segment[3] for segment in meta['segments'])}, f)
+        os.replace(tmp_meta, meta_path)
+
+    def _write_segment(self, folder, timeframe, number, rates):
+        name = f"{self._safe(timeframe)}.{number}.npy"
+        path = os.path.join(folder, name)
+        os.makedirs(folder, exist_ok=True)
+        np.save(path + '.tmp.npy', rates, allow_pickle=False)
+        os.replace(path + '.tmp.npy', path)
+        return segment_entry(name, rates)
+
+    @staticmethod
+    def _remove(folder, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError as e:
+                # A reader may still have it mapped (Windows); it is no longer listed, so it is only wasted space
+                logging.debug(f"Could not remove cache segment {name}: {e}")
+
+    @staticmethod
+    def _read(folder, segments, start, end):
+        """Bars with open time in [start, end] from `segments`, later segments winning; a copy, or None"""
+        parts = []
+        for name, first, last, _ in segments:
+            if last < start or first > end:
+                continue
+            rates = np.load(os.path.join(folder, name), mmap_mode='r', allow_pickle=False)
+            lo, hi = np.searchsorted(rates['time'], [start, end + 1])
+            if hi > lo:
+                parts.append(rates[lo:hi])
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return np.array(parts[0])
+        # Newest first, so np.unique's first occurrence is the bar of the latest segment
+        combined = np.concatenate(parts[::-1])
+        _, idx = np.unique(combined['time'], return_index=True)
+        return combined[idx]
+
+    def load(self, server, symbol, timeframe):
+        """Return (rates, covered_ranges) for a whole series, or (None, []) if not cached"""
+        meta = self._meta(server, symbol, timeframe)
+        if meta is None:
+            return None, []
+        folder = self._paths(server, symbol, timeframe)[0]
+        return self._read(folder, meta['segments'], FIRST_EPOCH, LAST_EPOCH), meta['ranges']
+
+    def append(self, server, symbol, timeframe, rates, ranges):
+        """Store freshly fetched bars as a new segment and mark `ranges` as covered"""
+        has_rates = rates is not None and len(rates) > 0
+        if not has_rates and not ranges:
+            return
+        folder = self._paths(server, symbol, timeframe)[0]
+        with self._lock:
+            meta = self._meta(server, symbol, timeframe) or {'ranges': [], 'segments': [], 'next': 1}
+            if has_rates:
+                meta['segments'].append(self._write_segment(folder, timeframe, meta['next'], rates))
+                meta['next'] += 1
+            meta['ranges'] = merge_ranges(meta['ranges'] + [list(r) for r in ranges])
+            self._write_meta(server, symbol, timeframe, meta)
+
+    def compact(self, server, symbol, timeframe):
+        """Merge neighbouring segments, smallest pair first, until at most `segment_limit` are left"""
+        folder = self._paths(server, symbol, timeframe)[0]
+        with self._lock:
+            meta = self._meta(server, symbol, timeframe)
+            if meta is None or len(meta['segments']) <= self.segment_limit:
+                return
+            merged = self._merge_segments(folder, timeframe, meta)
+            self._write_meta(server, symbol, timeframe, meta)
+            self._remove(folder, merged)
+
+    def _merge_segments(self, folder, timeframe, meta):
+        segments = meta['segments']
+        merged = []
+        while len(segments) > self.segment_limit:
+            i = min(range(len(segments) - 1), key=lambda k: segments[k][3] + segments[k + 1][3])
+            rates = self._read(folder, segments[i:i + 2], FIRST_EPOCH, LAST_EPOCH)
+            merged += [segments[i][0], segments[i + 1][0]]
+            segments[i:i + 2] = [self._write_segment(folder, timeframe, meta['next'], rates)]
+            meta['next'] += 1
+        return merged
+
+    def save(self, server, symbol, timeframe, rates, ranges):
+        """Replace a whole series with `rates` and its covered ranges"""
+        folder = self._paths(server, symbol, timeframe)[0]
+        with self._lock:
+            old = self._meta(server, symbol, timeframe)
+            meta = {'ranges': [list(r) for r in ranges], 'segments': [], 'next': old['next'] if old else 1}
+            if rates is not None and len(rates):
+                meta['segments'].append(self._write_segment(folder, timeframe, meta['next'], rates))
+                meta['next'] += 1
+            self._write_meta(server, symbol, timeframe, meta)
+            if old is not None:
+                self._remove(folder, [segment[0] for segment in old['segments']])
+
+    def clear(self, server=None, symbol=None, timeframe=None):
+        """Remove cached series matching the given keys (all of them by default)"""
+        import shutil
+        if server is None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        elif symbol is None:
+            shutil.rmtree(os.path.join(self.cache_dir, self._safe(server)), ignore_errors=True)
+        elif timeframe is None:
+            shutil.rmtree(self._paths(server, symbol, '_')[0], ignore_errors=True)
+        else:
+            folder = self._paths(server, symbol, timeframe)[0]
+            base = self._safe(timeframe)
+            if os.path.isdir(folder):
+                self._remove(folder, [name for name in os.listdir(folder) if name == base + '.json'
+                                      or (name.startswith(base + '.') and name.endswith('.npy'))])
+
+    def iter_rates(self, mt5_module, server, symbol, timeframe, tf_value, start_dt, end_dt, window=None,
+                   log=None, should_continue=None):
+        """Yield the bars of [start_dt, end_dt] in time order, fetching only uncovered gaps from MT5.
+
+        `mt5_module` is the MetaTrader5 module (or any stand-in exposing
+        ``copy_rates_range``). Covered parts are read from the segments and
+        gaps are requested from MT5, both `window` at a time (see
+        ``mt5_fetch.iter_windows``); every fetched window is stored as soon
+        as it arrives, so memory stays bounded by the window and a stopped
+        download keeps what it fetched. `should_continue()` is checked
+        before each window.
+
+        A window is only marked covered once a later bar is known, so a
+        still-forming last bar is refreshed on the next call, while a window
+        without bars (a weekend, a holiday) older than the last bar is not
+        asked for again. A gap MT5 fails to return is logged and left
+        uncovered.
+        """
+        start, end = to_epoch(start_dt), to_epoch(end_dt)
+        folder = self._paths(server, symbol, timeframe)[0]
+        # The lock only guards the cache files; MT5 is queried without it so other series are not held up
+        with self._lock:
+            meta = self._meta(server, symbol, timeframe)
+        segments = meta['segments'] if meta else []
+        latest = max((segment[2] for segment in segments), default=None)
+        pending = None  # Fetched range after the newest bar, covered once a later bar turns up
+        last_time = None
+        try:
+            for piece_start, piece_end, is_gap in split_covered(meta['ranges'] if meta else [], start, end):
+                if is_gap and log:
+                    log(f"Fetching {symbol} {timeframe} gap {from_epoch(piece_start)} - {from_epoch(piece_end)}")
+                for window_start, window_end in iter_windows(from_epoch(piece_start), from_epoch(piece_end), window):
+                    if should_continue is not None and not should_continue():
+                        return
+                    lo, hi = to_epoch(window_start), to_epoch(window_end)
+                    if not is_gap:
+                        try:
+                            rates = self._read(folder, segments, lo, hi)
+                        except FileNotFoundError:
+                            # Another download merged the segments meanwhile
+                            with self._lock:
+                                meta = self._meta(server, symbol, timeframe)
+                            segments = meta['segments'] if meta else []
+                            rates = self._read(folder, segments, lo, hi)
+                    else:
+                        rates = mt5_module.copy_rates_range(symbol, tf_value, window_start, window_end)
+                        if rates is None:
+                            error = getattr(mt5_module, 'last_error', lambda: None)()
+                            logging.warning(f"No {symbol} {timeframe} bars returned for {window_start} - {window_end} "
+                                            f"({error}); {window_start} - {from_epoch(piece_end)} is left out and "
+                                            f"will be requested again next time")
+                            break
+                        if len(rates):
+                            newest = int(rates['time'][-1])
+                            latest = newest if latest is None else max(latest, newest)
+                        ranges = []
+                        if pending is not None and (len(rates) or latest > hi):
+                            ranges.append(pending)
+                            pending = None
+                        if latest is not None and latest > hi:
+                            ranges.append([lo, hi])
+                        elif len(rates):
+                            if latest > lo:
+                                ranges.append([lo, latest - 1])
+                            pending = [latest, hi]
+                        else:
+                            pending = [pending[0] if pending else lo, hi]
+                        self.append(server, symbol, timeframe, rates, ranges)
+                    if rates is None or len(rates) == 0:
+                        continue
+                    if last_time is not None:
+                        rates = rates[rates['time'] > last_time]
+                        if len(rates) == 0:
+                            continue
+                    last_time = rates['time'][-1]
+                    yield rates
+                if is_gap and pending is not None and piece_end < end:
+                    # A covered range follows, so nothing in this gap can still be forming
+                    self.append(server, symbol, timeframe, None, [pending])
+                    pending = None
+        finally:
+            # Merged only now, so no segment this walk still reads is removed under it
+            self.compact(server, symbol, timeframe)
+
+
+def split_covered(covered, start, end):
+    """Cut [start, end] into consecutive ``(first, last, is_gap)`` pieces along the covered ranges"""
+    pieces = []
+    cursor = start
+    for gap_start, gap_end in missing_ranges(covered, start, end):
+        if gap_start > cursor:
+            pieces.append((cursor, gap_start - 1, False))
+        pieces.append((gap_start, gap_end, True))
+        cursor = gap_end + 1
+    if cursor <= end:
+        pieces.append((cursor, end, False))
+    return pieces
+
+
+def segment_entry(name, rates):
+    """Segment listing of the JSON file: ``[file, first bar time, last bar time, bars]``"""
+    return [name, int(rates['time'][0]), int(rates['time'][-1]), int(len(rates))]
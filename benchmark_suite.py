@@ -0,0 +1,365 @@
+"""Throughput and peak memory of every download stage, against a synthetic MT5.
+
+No terminal is needed: ``fake_mt5`` stands in for the MetaTrader5 package
+with generated rates of the requested size and optional latency and
+failures. Each stage is timed on its own (fetch, DataFrame conversion, CSV
+with both engines and with epoch-second dates, xlsx, charting), then the real ``DataDownloadThread``
+runs whole jobs into CSV and xlsx:
+
+    python benchmark_suite.py
+    python benchmark_suite.py --bars 1000000 --latency 0.05 --save-baseline
+    python benchmark_suite.py --compare benchmark_baseline.json --tolerance 0.2
+
+Results are bars per second (best of `--repeat` runs) and the peak memory
+traced by ``tracemalloc`` in one extra run, so Excel render processes are
+not included. ``--save-baseline`` stores them with the machine and library
+versions; ``--compare`` reports the change per stage and exits with 1 when
+a stage got slower or hungrier than the tolerance allows.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import fake_mt5
+
+BASELINE_FILE = 'benchmark_baseline.json'
+STAGES = ['fetch', 'convert', 'csv', 'csv_fast', 'csv_epoch', 'xlsx', 'chart', 'job_csv', 'job_xlsx']
+BENCHMARK_END = datetime(2024, 6, 28, 21, 0)  # A Friday evening, so the range ends on a full week
+WINDOW = timedelta(days=30)
+
+
+class BenchmarkContext:
+    """Inputs shared by the stages: the fake terminal, the series to move and a scratch folder"""
+
+    def __init__(self, mt5_module, symbols, timeframe, bars, columns, workdir):
+        from download_core import timeframe_constants
+        self.mt5 = mt5_module
+        self.symbols = symbols
+        self.timeframe = timeframe
+        self.tf_value = timeframe_constants(mt5_module)[timeframe]
+        self.columns = columns
+        self.workdir = workdir
+        self.runs = 0
+        # Weekends have no bars, so ask for 7/5 of the bar span
+        seconds = fake_mt5.TIMEFRAME_SECONDS.get(self.tf_value, 30 * 86400)
+        self.end_dt = BENCHMARK_END
+        self.start_dt = self.end_dt - timedelta(seconds=seconds * bars * 7 / 5)
+        self._rates = None
+        self._charts = None
+
+    def rates(self):
+        """{symbol: rates array}, fetched once and without the injected latency or failures"""
+        if self._rates is None:
+            from mt5_fetch import iter_series_rates
+            saved = dict(fake_mt5._config)
+            fake_mt5.configure(latency=0.0, bars_per_second=None, failure_rate=0.0)
+            try:
+                import numpy as np
+                self._rates = {}
+                for symbol in self.symbols:
+                    chunks = list(iter_series_rates(self.mt5, symbol, self.timeframe, self.tf_value,
+                                                    self.start_dt, self.end_dt, window=WINDOW))
+                    self._rates[symbol] = np.concatenate(chunks)
+            finally:
+                fake_mt5.configure(**saved)
+        return self._rates
+
+    def chunks(self):
+        """(symbol, rates window) in the order a job fetches them"""
+        from mt5_fetch import split_rates
+        for symbol, rates in self.rates().items():
+            for chunk in split_rates(rates, WINDOW):
+                yield symbol, chunk
+
+    def chart_frames(self):
+        if self._charts is None:
+            from conversion_benchmark import view_convert
+            self._charts = {symbol: view_convert(rates, self.columns)[0] for symbol, rates in self.rates().items()}
+        return self._charts
+
+    def total_bars(self):
+        return sum(len(rates) for rates in self.rates().values())
+
+    def fresh_dir(self):
+        """An empty folder for one run (jobs resume from what an earlier run left behind)"""
+        self.runs += 1
+        path = os.path.join(self.workdir, f"run_{self.runs}")
+        os.makedirs(path)
+        return path
+
+
+def stage_fetch(ctx):
+    from mt5_fetch import iter_series_rates
+    bars = 0
+    for symbol in ctx.symbols:
+        for chunk in iter_series_rates(ctx.mt5, symbol, ctx.timeframe, ctx.tf_value, ctx.start_dt, ctx.end_dt,
+                                       window=WINDOW):
+            bars += len(chunk)
+    return bars
+
+
+def stage_convert(ctx):
+    from conversion_benchmark import view_convert
+    bars = 0
+    for _, chunk in ctx.chunks():
+        chart, export = view_convert(chunk, ctx.columns)
+        bars += len(export)
+    return bars
+
+
+def write_csv(ctx, engine, time_output=None):
+    from csv_writer import open_csv_writer
+    folder = ctx.fresh_dir()
+    writers = {}
+    for symbol, chunk in ctx.chunks():
+        if symbol not in writers:
+            writers[symbol], _ = open_csv_writer(os.path.join(folder, f"{symbol}.csv"), engine, None, None)
+        writers[symbol].write(chunk_frame(chunk, ctx.columns, time_output))
+    for writer in writers.values():
+        writer.close()
+    shutil.rmtree(folder)
+    return ctx.total_bars()
+
+
+def chunk_frame(chunk, columns, time_output=None):
+    from frames import rates_to_frame, rate_columns
+    if time_output is None:
+        return rates_to_frame(chunk, columns)
+    import pandas as pd
+    return pd.DataFrame(rate_columns(chunk, columns, time_output), copy=False)
+
+
+def stage_csv(ctx):
+    return write_csv(ctx, 'pandas')
+
+
+def stage_csv_fast(ctx):
+    return write_csv(ctx, 'fast')
+
+
+def stage_csv_epoch(ctx):
+    from frames import TimeOutput
+    return write_csv(ctx, 'pandas', TimeOutput('epoch_s'))
+
+
+def stage_xlsx(ctx):
+    from xlsx_writer import XlsxStreamWriter
+    folder = ctx.fresh_dir()
+    workbook = XlsxStreamWriter(os.path.join(folder, "benchmark.xlsx"))
+    for symbol, chunk in ctx.chunks():
+        workbook.write(symbol, chunk_frame(chunk, ctx.columns))
+    workbook.close()
+    shutil.rmtree(folder)
+    return ctx.total_bars()
+
+
+_qt_app = []  # Keeps the QApplication alive
+
+
+def qt_application():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    if QApplication.instance() is None:
+        _qt_app.append(QApplication([sys.argv[0]]))
+    return QApplication.instance()
+
+
+def stage_chart(ctx):
+    qt_application()
+    from MT5_Downloader import Translator
+    from candle_chart import CandlestickChart
+    chart = CandlestickChart(Translator(), width=8, height=6, dpi=100)
+    bars = 0
+    for symbol, frame in ctx.chart_frames().items():
+        chart.plot_candles(frame, symbol, show_volume=True)
+        bars += len(frame)
+    chart.deleteLater()
+    return bars
+
+
+def run_job(ctx, export_format):
+    """One DataDownloadThread job, run synchronously; returns the bars fetched"""
+    from MT5_Downloader import DataDownloadThread
+    from chart_store import ChartStore
+    from mt5_session import MT5Session
+    from symbol_catalog import SymbolCatalog
+
+    folder = ctx.fresh_dir()
+    output = folder if export_format != 'xlsx' else os.path.join(folder, "benchmark.xlsx")
+    quiet = lambda message, level: None
+    errors = []
+    fake_mt5.reset_stats()
+    thread = DataDownloadThread(
+        ctx.symbols, [ctx.timeframe], ctx.start_dt, ctx.end_dt, output, export_format, ctx.columns,
+        symbol_catalog=SymbolCatalog(os.path.join(folder, 'symbol_catalog.json')),
+        session=MT5Session(log=quiet), chart_store=ChartStore(spill_dir=os.path.join(folder, 'charts')),
+    )
+    thread.error.connect(errors.append)
+    thread.run()
+    messages, _ = thread.take_updates()
+    errors += [message for message, level in messages if level == "ERROR"]
+    thread.job.session.close()
+    if thread.job.chart_store is not None:
+        thread.job.chart_store.clear()
+    shutil.rmtree(folder)
+    if errors:
+        raise RuntimeError(errors[0])
+    return fake_mt5.stats()['bars']
+
+
+def stage_job_csv(ctx):
+    return run_job(ctx, 'csv')
+
+
+def stage_job_xlsx(ctx):
+    return run_job(ctx, 'xlsx')
+
+
+STAGE_FUNCTIONS = {
+    'fetch': stage_fetch, 'convert': stage_convert, 'csv': stage_csv, 'csv_fast': stage_csv_fast,
+    'csv_epoch': stage_csv_epoch,
+    'xlsx': stage_xlsx, 'chart': stage_chart, 'job_csv': stage_job_csv, 'job_xlsx': stage_job_xlsx,
+}
+
+
+def measure(stage, ctx, repeat):
+    """Return {'bars', 'seconds', 'bars_per_sec', 'peak_mb'} for one stage"""
+    best = float('inf')
+    bars = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        bars = stage(ctx)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    stage(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'bars': bars,
+        'seconds': round(best, 4),
+        'bars_per_sec': round(bars / best) if best > 0 else 0,
+        'peak_mb': round(peak / 2 ** 20, 1),
+    }
+
+
+def machine_info():
+    import numpy as np
+    import pandas as pd
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every stage against `baseline`; returns the names of regressed stages"""
+    regressed = []
+    print(f"\nAgainst baseline of {baseline.get('created', '?')} (tolerance {tolerance:.0%}):")
+    if baseline.get('params') != results['params']:
+        print(f"  Note: the baseline was run with different parameters: {baseline.get('params')}")
+    for name, current in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before or 'bars_per_sec' not in current or 'bars_per_sec' not in before:
+            print(f"  {name:<9} no baseline")
+            continue
+        speed = current['bars_per_sec'] / before['bars_per_sec'] - 1 if before['bars_per_sec'] else 0.0
+        memory = current['peak_mb'] / before['peak_mb'] - 1 if before['peak_mb'] else 0.0
+        worse = speed < -tolerance or memory > tolerance
+        if worse:
+            regressed.append(name)
+        print(f"  {name:<9} speed {speed:+7.1%}   peak memory {memory:+7.1%}{'   REGRESSION' if worse else ''}")
+    return regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the download pipeline against a synthetic MT5")
+    parser.add_argument('--bars', type=int, default=250_000, help="Bars per symbol (default 250000)")
+    parser.add_argument('--symbols', default='EURUSD,XAUUSD', help="Comma-separated symbols of fake_mt5")
+    parser.add_argument('--timeframe', default='M1')
+    parser.add_argument('--columns', default='Date,Open,High,Low,Close,Volume', help="Export columns")
+    parser.add_argument('--stages', default=",".join(STAGES), help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best is kept")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to each MT5 call")
+    parser.add_argument('--bars-per-second', dest='bars_per_second', type=float,
+                        help="Transfer rate cap of the simulated terminal")
+    parser.add_argument('--failure-rate', dest='failure_rate', type=float, default=0.0,
+                        help="Probability that an MT5 call fails")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    parser.add_argument('--save-baseline', dest='save_baseline', nargs='?', const=BASELINE_FILE,
+                        help=f"Store the results as the baseline (default {BASELINE_FILE})")
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE,
+                        help=f"Compare with a stored baseline (default {BASELINE_FILE})")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Allowed slowdown or memory growth before a stage counts as regressed")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGE_FUNCTIONS]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    mt5_module = fake_mt5.install(latency=args.latency, bars_per_second=args.bars_per_second,
+                                  failure_rate=args.failure_rate)
+    mt5_module.initialize()
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+    columns = [c.strip() for c in args.columns.split(',') if c.strip()]
+    workdir = tempfile.mkdtemp(prefix='mt5_bench_')
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'params': {'bars': args.bars, 'symbols': symbols, 'timeframe': args.timeframe, 'columns': columns,
+                   'latency': args.latency, 'bars_per_second': args.bars_per_second,
+                   'failure_rate': args.failure_rate, 'repeat': args.repeat},
+        'stages': {},
+    }
+    try:
+        ctx = BenchmarkContext(mt5_module, symbols, args.timeframe.upper(), args.bars, columns, workdir)
+        print(f"{len(symbols)} x {ctx.total_bars() // max(1, len(symbols)):,} {ctx.timeframe} bars, "
+              f"latency {args.latency}s, failure rate {args.failure_rate}")
+        for name in stages:
+            try:
+                result = measure(STAGE_FUNCTIONS[name], ctx, max(1, args.repeat))
+            except ImportError as e:
+                result = {'skipped': f"missing dependency: {e}"}
+            except Exception as e:
+                result = {'error': str(e)}
+            results['stages'][name] = result
+            if 'bars_per_sec' in result:
+                print(f"  {name:<9} {result['bars']:>10,} bars {result['seconds']:9.3f} s "
+                      f"{result['bars_per_sec']:>12,} bars/s   peak {result['peak_mb']:8.1f} MB", flush=True)
+            else:
+                print(f"  {name:<9} {result.get('skipped') or 'failed: ' + result['error']}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=1)
+            print(f"Results written to {path}")
+    if baseline is not None and compare(results, baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# Chart widgets live in their own module so matplotlib is only imported when
+# the first chart is drawn, not at application startup.
+import numpy as np
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+import matplotlib.dates as mdates
+
+VOLUME_COLOR = '#6200EA'
+BOX_CODES = [Path.MOVETO, Path.LINETO, Path.LINETO, Path.LINETO, Path.CLOSEPOLY]
+WICK_CODES = [Path.MOVETO, Path.LINETO]
+
+
+def bar_width(x, fraction=0.6):
+    """Candle width in axis units: a fraction of the typical bar spacing"""
+    if len(x) < 2:
+        return fraction
+    spacing = np.diff(x)
+    spacing = spacing[spacing > 0]
+    return fraction * float(np.median(spacing)) if len(spacing) else fraction
+
+
+def date_numbers(dates):
+    """Vectorized matplotlib date numbers for a datetime Series (aware or naive)"""
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+    return mdates.date2num(dates.to_numpy(dtype='datetime64[ns]'))
+
+
+def decimate_ohlc(x, opens, highs, lows, closes, volumes, start, stop, step):
+    """OHLCV-aggregate bars [start, stop) into groups of `step` consecutive bars.
+
+    Groups are aligned to multiples of `step` in the full series, so the
+    same bars land in the same group while panning. Each group keeps its
+    first open, last close, extreme high/low and summed volume, and is
+    placed midway between its first and last bar.
+    """
+    start -= start % step
+    firsts = np.arange(start, stop, step)
+    lasts = np.minimum(firsts + step, stop) - 1
+    offsets = firsts - start
+    center = (x[firsts] + x[lasts]) / 2
+    high = np.maximum.reduceat(highs[start:stop], offsets)
+    low = np.minimum.reduceat(lows[start:stop], offsets)
+    volume = np.add.reduceat(volumes[start:stop], offsets) if volumes is not None else None
+    return center, opens[firsts], high, low, closes[lasts], volume
+
+
+def box_path(x, bottom, top, width):
+    """One compound path holding a rectangle per bar, centred on x from bottom to top"""
+    left = x - width / 2
+    right = x + width / 2
+    verts = np.empty((len(x), 5, 2))
+    verts[:, 0] = np.column_stack((left, bottom))
+    verts[:, 1] = np.column_stack((left, top))
+    verts[:, 2] = np.column_stack((right, top))
+    verts[:, 3] = np.column_stack((right, bottom))
+    verts[:, 4] = verts[:, 0]
+    codes = np.tile(BOX_CODES, len(x))
+    return Path(verts.reshape(-1, 2), codes)
+
+
+def wick_path(x, low, high):
+    """One compound path holding a vertical low-high segment per bar"""
+    verts = np.empty((len(x), 2, 2))
+    verts[:, 0] = np.column_stack((x, low))
+    verts[:, 1] = np.column_stack((x, high))
+    codes = np.tile(WICK_CODES, len(x))
+    return Path(verts.reshape(-1, 2), codes)
+
+
+class CandlestickChart(FigureCanvas):
+    def __init__(self, translator, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi, facecolor='#212121')
+        self.ax = self.fig.add_subplot(111)
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.dark_mode = True
+        self.translator = translator
+        self.ax_volume = None
+        self.series = None
+        self.lod_artists = []
+        self.lod_key = None
+        self.mpl_connect('resize_event', lambda event: self.render_visible())
+        
+    def plot_candles(self, data, symbol="", candle_colors=None, show_grid=True, show_volume=False):
+        """Plot candlestick chart from OHLC data with enhanced styling"""
+        self.fig.clear()
+        self.series = None
+        self.lod_artists = []
+        self.lod_key = None
+        
+        if show_volume and 'Volume' in data.columns:
+            self.ax = self.fig.add_subplot(211)
+            self.ax_volume = self.fig.add_subplot(212, sharex=self.ax)
+        else:
+            self.ax = self.fig.add_subplot(111)
+            self.ax_volume = None
+            
+        if data.empty:
+            self.ax.text(0.5, 0.5, self.translator.tr('no_data'), 
+                        ha='center', va='center', fontsize=12,
+                        color='#FFFFFF')
+            self.draw()
+            return
+        
+        # Convert dates to matplotlib format
+        dates = date_numbers(data['Date'])
+        opens = data['Open'].to_numpy(dtype=float)
+        highs = data['High'].to_numpy(dtype=float)
+        lows = data['Low'].to_numpy(dtype=float)
+        closes = data['Close'].to_numpy(dtype=float)
+        width = bar_width(dates)
+        
+        volumes = data['Volume'].to_numpy(dtype=float) if self.ax_volume else None
+        self.series = {
+            'x': dates, 'open': opens, 'high': highs, 'low': lows, 'close': closes, 'volume': volumes,
+            'width': width, 'colors': candle_colors or {'up': '#4CAF50', 'down': '#F44336'},
+        }
+        
+        # The paths are added without autoscaling; set the full view directly
+        self.ax.set_xlim(dates[0] - width, dates[-1] + width)
+        self.fit_prices(lows, highs)
+        
+        # Candles are drawn for the visible range at screen resolution and
+        # rebuilt whenever the toolbar zooms or pans
+        self.render_visible()
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.render_visible())
+        
+        # Plot volume if enabled
+        if self.ax_volume:
+            self.ax_volume.set_ylabel('Volume', color='#FFFFFF', fontsize=10)
+            self.ax_volume.tick_params(colors='#FFFFFF', labelsize=8)
+            self.ax_volume.set_facecolor('#212121')
+            for spine in self.ax_volume.spines.values():
+                spine.set_color('#FFFFFF')
+            self.fig.subplots_adjust(hspace=0)
+        
+        # Format x-axis with better date display. The x data are already
+        # matplotlib date numbers; xaxis_date() would add a per-path unit
+        # conversion to every draw.
+        self.fig.autofmt_xdate()
+        locator = mdates.AutoDateLocator()
+        formatter = mdates.ConciseDateFormatter(locator)
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(formatter)
+        
+        # Flat chart styling
+        bg_color = '#212121'
+        text_color = '#FFFFFF'
+        grid_color = '#424242'
+        
+        self.ax.grid(show_grid, linestyle='--', alpha=0.7, color=grid_color)
+        self.ax.set_facecolor(bg_color)
+        self.fig.patch.set_facecolor(bg_color)
+        self.ax.tick_params(colors=text_color, labelsize=10)
+        self.ax.xaxis.label.set_color(text_color)
+        self.ax.yaxis.label.set_color(text_color)
+        self.ax.title.set_color(text_color)
+        
+        for spine in self.ax.spines.values():
+            spine.set_color(text_color)
+        
+        # Set title with symbol
+        title = f"{symbol} {self.translator.tr('price_chart')}" if symbol else self.translator.tr('price_chart')
+        self.ax.set_title(title, pad=20, fontsize=14, fontfamily='Roboto')
+        self.ax.set_ylabel('Price', labelpad=10, fontsize=12, fontfamily='Roboto')
+        
+        self.draw()
+
+    def render_visible(self):
+        """Draw the bars in the current x range with at most one candle per pixel column.
+
+        When more bars are visible than the axes is wide in pixels, they are
+        OHLCV-aggregated into that many candles; once the view is zoomed in
+        far enough, the bars are drawn as they are. The price axis is fitted
+        to the bars drawn, so panning or zooming never leaves them off screen.
+        """
+        if self.series is None:
+            return
+        series = self.series
+        x = series['x']
+        x0, x1 = self.ax.get_xlim()
+        start, stop = np.searchsorted(x, [x0, x1])
+        start, stop = max(start - 1, 0), min(stop + 1, len(x))
+        columns = max(int(self.ax.bbox.width), 1)
+        step = max(1, -(-(stop - start) // columns))
+        key = (start - start % step, stop, step)
+        if key == self.lod_key or stop <= start:
+            return
+        self.lod_key = key
+
+        for artist in self.lod_artists:
+            artist.remove()
+        if step == 1:
+            bars = (x[start:stop], series['open'][start:stop], series['high'][start:stop],
+                    series['low'][start:stop], series['close'][start:stop],
+                    series['volume'][start:stop] if series['volume'] is not None else None)
+        else:
+            bars = decimate_ohlc(x, series['open'], series['high'], series['low'], series['close'],
+                                 series['volume'], start, stop, step)
+        width = series['width'] * step
+        center, opens, highs, lows, closes, volumes = bars
+        self.lod_artists = self.draw_candles(center, opens, highs, lows, closes, width, series['colors'])
+        self.fit_prices(lows, highs)
+        if self.ax_volume is not None and volumes is not None:
+            self.lod_artists.append(self.draw_volume(center, volumes, width))
+
+    def fit_prices(self, lows, highs):
+        """Set the price axis to the range of the given bars, with a 5% margin"""
+        low, high = float(np.nanmin(lows)), float(np.nanmax(highs))
+        pad = (high - low) * 0.05 or abs(high) * 0.001 or 1.0
+        self.ax.set_ylim(low - pad, high + pad)
+
+    def draw_candles(self, x, opens, highs, lows, closes, width, candle_colors):
+        """Draw all wicks and bodies as four compound paths (up/down x wick/body).
+
+        A single path per color is rasterized in one call however many bars
+        it holds. PathPatch is used rather than a PolyCollection or
+        LineCollection, which still draw every member as its own path.
+        Returns the artists so they can be replaced on the next zoom level.
+        """
+        artists = []
+        up = closes >= opens
+        for mask, color in ((up, candle_colors['up']), (~up, candle_colors['down'])):
+            if not mask.any():
+                continue
+            # add_artist skips add_patch's per-vertex data-limit walk
+            artists.append(self.ax.add_artist(PathPatch(
+                wick_path(x[mask], lows[mask], highs[mask]),
+                facecolor='none', edgecolor=color, linewidth=0.8, alpha=0.9
+            )))
+            artists.append(self.ax.add_artist(PathPatch(
+                box_path(x[mask], np.minimum(opens[mask], closes[mask]),
+                         np.maximum(opens[mask], closes[mask]), width),
+                facecolor=color, edgecolor='none', alpha=0.9
+            )))
+        return artists
+
+    def draw_volume(self, x, volumes, width):
+        """Draw the volume bars as a single compound path and fit the volume axis to them"""
+        artist = self.ax_volume.add_artist(PathPatch(
+            box_path(x, np.zeros_like(volumes), volumes, width),
+            facecolor=VOLUME_COLOR, edgecolor='none', alpha=0.6
+        ))
+        top = float(np.nanmax(volumes)) if len(volumes) else 1.0
+        self.ax_volume.set_ylim(0, top * 1.05 or 1.0)
+        return artist
@@ -0,0 +1,138 @@
+"""Memory-budgeted store for the chart series of a download.
+
+Works like a dict of DataFrames, but keeps only the most recently used
+series in RAM while their total size is within `budget_bytes`. Older
+series are spilled to an uncompressed ``.npz`` file per series (see
+``save_frame``) and reloaded on access, so memory stays flat however many
+series a job downloads. Stored series are treated as read-only: a series
+is written to disk at most once. The app takes the budget from Settings >
+Chart Settings.
+"""
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHART_BUDGET_MB = 512
+
+
+def save_frame(path, df):
+    """Write a DataFrame to an uncompressed .npz: columns as raw arrays, datetimes as int64 UTC nanoseconds"""
+    dates = [name for name in df.columns if df[name].dtype.kind == 'M']
+    arrays = {}
+    for number, name in enumerate(df.columns):
+        values = df[name].values
+        arrays[f"c{number}"] = values.astype('datetime64[ns]').view(np.int64) if name in dates else values
+    np.savez(path, __columns__=np.array([str(c) for c in df.columns]), __dates__=np.array(dates, dtype=str),
+             **arrays)
+
+
+def load_frame(path):
+    """Read a DataFrame written by ``save_frame``; datetimes come back tz-aware UTC"""
+    with np.load(path, allow_pickle=False) as data:
+        dates = set(str(name) for name in data['__dates__'])
+        frame = {}
+        for number, name in enumerate(data['__columns__']):
+            name = str(name)
+            values = data[f"c{number}"]
+            frame[name] = pd.to_datetime(values, utc=True) if name in dates else values
+    return pd.DataFrame(frame)
+
+
+class ChartStore:
+    """LRU mapping of series key -> chart DataFrame with disk spill"""
+
+    def __init__(self, budget_bytes=DEFAULT_CHART_BUDGET_MB * 1024 * 1024, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self.lock = threading.RLock()
+        self.memory = OrderedDict()  # key -> DataFrame, least recently used first
+        self.sizes = {}
+        self.rows = {}  # Row count of every stored series, in memory or spilled
+        self.spilled = {}  # key -> spill file path
+        self.files_written = 0
+
+    def _spill_path(self, key):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='mt5_chart_')
+        os.makedirs(self.spill_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in '-_.' else '_' for c in key)
+        self.files_written += 1
+        return os.path.join(self.spill_dir, f"{self.files_written}_{safe}.npz")
+
+    def memory_bytes(self):
+        return sum(self.sizes.values())
+
+    def _evict(self):
+        """Spill least recently used series until the budget holds (the newest always stays)"""
+        while len(self.memory) > 1 and self.memory_bytes() > self.budget_bytes:
+            key, df = self.memory.popitem(last=False)
+            self.sizes.pop(key)
+            if key not in self.spilled:
+                path = self._spill_path(key)
+                save_frame(path, df)
+                self.spilled[key] = path
+            logging.debug(f"Chart series {key} spilled to disk")
+
+    def _keep(self, key, df):
+        self.memory[key] = df
+        self.memory.move_to_end(key)
+        self.sizes[key] = int(df.memory_usage(index=True, deep=False).sum())
+        self._evict()
+
+    def __setitem__(self, key, df):
+        with self.lock:
+            path = self.spilled.pop(key, None)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            self.rows[key] = len(df)
+            self._keep(key, df)
+
+    def __getitem__(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            if key not in self.spilled:
+                raise KeyError(key)
+            df = load_frame(self.spilled[key])
+            self._keep(key, df)
+            return df
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(list(self.rows))
+
+    def keys(self):
+        return list(self.rows)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def row_counts(self):
+        """Rows per series without loading spilled ones"""
+        return dict(self.rows)
+
+    def set_budget(self, budget_bytes):
+        with self.lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every series and delete the spill files"""
+        with self.lock:
+            self.memory.clear()
+            self.sizes.clear()
+            self.rows.clear()
+            self.spilled.clear()
+            if self.spill_dir is not None and os.path.isdir(self.spill_dir):
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -0,0 +1,88 @@
+"""Time and peak memory of turning MT5 rates arrays into DataFrames.
+
+Compares the original conversion (``pd.DataFrame(rates)``, date conversion,
+rename and column subsets) with the view-based one in ``frames`` that
+``DownloadJob`` uses, on a synthetic rates array shaped like MT5's:
+
+    python conversion_benchmark.py
+    python conversion_benchmark.py --bars 5000000 --columns Date,Close
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from frames import RATE_COLUMN_NAMES, rate_columns
+from mt5_constants import CHART_COLUMNS, EXPORT_COLUMNS
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+
+def synthetic_rates(bars):
+    """M1-spaced rates with a random walk close"""
+    rates = np.zeros(bars, dtype=RATES_DTYPE)
+    rates['time'] = 1_600_000_000 + np.arange(bars, dtype=np.int64) * 60
+    close = 1.1 + np.cumsum(np.random.default_rng(0).normal(0, 1e-4, bars))
+    rates['open'] = np.roll(close, 1)
+    rates['close'] = close
+    rates['high'] = np.maximum(rates['open'], close) + 5e-5
+    rates['low'] = np.minimum(rates['open'], close) - 5e-5
+    rates['tick_volume'] = 100
+    rates['spread'] = 12
+    return rates
+
+
+def legacy_convert(rates, selected):
+    """The conversion DownloadJob used before ``frames``: a full copy, then copies per subset"""
+    full_df = pd.DataFrame(rates)
+    full_df['time'] = pd.to_datetime(full_df['time'], unit='s')
+    if full_df['time'].dt.tz is None:
+        full_df['time'] = full_df['time'].dt.tz_localize('UTC')
+    full_df = full_df.rename(columns=RATE_COLUMN_NAMES)
+    return full_df[CHART_COLUMNS], full_df[[col for col in selected if col in full_df.columns]]
+
+
+def view_convert(rates, selected):
+    """What ``DownloadJob.download_series`` does now: views of the needed columns only"""
+    columns = rate_columns(rates, list(dict.fromkeys(CHART_COLUMNS + selected)))
+    chart = pd.DataFrame({name: columns[name] for name in CHART_COLUMNS}, copy=False)
+    export = pd.DataFrame({name: columns[name] for name in selected if name in columns}, copy=False)
+    return chart, export
+
+
+def measure(convert, rates, selected, repeat):
+    """Return (best seconds, peak bytes allocated during one conversion)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        convert(rates, selected)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = convert(rates, selected)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MT5 rates -> DataFrame conversion")
+    parser.add_argument('--bars', type=int, default=1_000_000)
+    parser.add_argument('--columns', default=",".join(EXPORT_COLUMNS), help="Ticked export columns")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rates = synthetic_rates(args.bars)
+    selected = [c.strip() for c in args.columns.split(',') if c.strip()]
+    raw = rates.nbytes
+    print(f"{args.bars:,} bars, raw array {raw / 2**20:.1f} MB, columns: {','.join(selected)}")
+    for name, convert in (('legacy', legacy_convert), ('views', view_convert)):
+        seconds, peak = measure(convert, rates, selected, args.repeat)
+        print(f"  {name:<7} {seconds * 1000:8.1f} ms   peak +{peak / 2**20:7.1f} MB ({peak / raw:.2f}x raw)")
+
+
+if __name__ == "__main__":
+    main()
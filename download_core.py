@@ -0,0 +1,925 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+from bar_cache import BarCache, to_epoch, from_epoch
+from mt5_fetch import iter_series_rates, split_rates
+from exporters import DATASET_FORMATS, ARROW_COLUMN_TYPES, PartitionedDatasetWriter, dataset_root, series_filename
+from csv_writer import open_csv_writer
+from job_manifest import JobManifest, job_key
+from export_pipeline import ExportPipeline, PipelinedWriter, DEFAULT_EXPORT_WORKERS, DEFAULT_QUEUED_CHUNKS
+from xlsx_writer import XlsxStreamWriter
+from terminal_pool import TerminalPool
+from resample import derive_plan, RateAggregator, slice_rates, bucket_end
+from tick_data import TickTarget, stream_ticks
+from symbol_catalog import SymbolCatalog
+from mt5_session import MT5Session, MT5SessionError
+from progress import DownloadProgress
+from panel import PanelBuilder, PANEL_FORMATS, write_panel
+from gap_check import find_gaps
+from metrics import MetricsRecorder, TimedWriter, timed_chunks, path_bytes
+from mt5_constants import TIMEFRAMES, TICKS, EXPORT_FORMATS, EXPORT_COLUMNS, CHART_COLUMNS
+from frames import TimeOutput, RATE_COLUMN_NAMES, rate_columns, rates_to_frame  # noqa: F401 (re-exported)
+
+def timeframe_constants(mt5_module=mt5):
+    """Map timeframe names to the MT5 TIMEFRAME_* constants"""
+    return {tf: getattr(mt5_module, f"TIMEFRAME_{tf}") for tf in TIMEFRAMES}
+
+
+class _SheetWriter:
+    """Routes one series into its sheet(s) of an xlsx workbook"""
+
+    def __init__(self, workbook, name, owns_workbook=False):
+        self.workbook = workbook
+        self.name = name
+        self.owns_workbook = owns_workbook
+
+    def write(self, df):
+        self.workbook.write(self.name, df)
+
+    def close(self):
+        if self.owns_workbook:
+            self.workbook.close()
+
+    def abort(self):
+        if self.owns_workbook:
+            self.workbook.abort()
+
+
+class _SeriesFeed:
+    """Hands the windows of one worker's series to its export, running on a thread, as they arrive.
+
+    The export and the caller take turns: ``put`` returns once the window is
+    processed, so only one of them runs at a time and a single window is held.
+    """
+
+    def __init__(self, export):
+        self.windows = queue.Queue(maxsize=1)
+        self.idle = threading.Event()
+        self.done = False
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(export,), daemon=True)
+        self.thread.start()
+        self.idle.wait()
+
+    def _run(self, export):
+        try:
+            export(self.chunks())
+        finally:
+            self.done = True
+            self.idle.set()
+
+    def chunks(self):
+        while True:
+            self.idle.set()
+            rates = self.windows.get()
+            if isinstance(rates, Exception):
+                raise rates
+            if rates is None:
+                return
+            yield rates
+
+    def put(self, rates):
+        if self.done:
+            return  # The export gave up on the series (a failed write)
+        self.idle.clear()
+        self.windows.put(rates)
+        self.idle.wait()
+
+    def close(self, error=None):
+        """End the series; with `error` it fails instead of being saved"""
+        self.put(RuntimeError(error) if error else None)
+        self.thread.join()
+
+
+class DownloadJob:
+    """Fetch, convert and export pipeline shared by the GUI and the batch CLI.
+
+    The job knows nothing about Qt: it reports through plain callbacks,
+    ``log(message, level)``, ``progress(snapshot)`` and ``error(message)``.
+    Progress is weighted by bars (see ``progress``); the snapshot dict holds
+    ``percent``, ``bars``, ``bars_per_second`` and ``eta_seconds`` and is
+    reported at most every `progress_interval` seconds.
+    ``run()`` returns the chart data of every downloaded series (only its
+    bar count when there is no `chart_store`), or None when the job was
+    stopped or could not start.
+
+    With two or more `terminal_paths` the series are fetched in parallel,
+    one worker process per terminal (see ``terminal_pool``) that imports the
+    MT5 API as the module named `mt5_module`; a single path just selects
+    which terminal the in-process connection uses.
+
+    With `derive_timeframes` each symbol is fetched once at the finest
+    selected timeframe and the coarser ones are aggregated locally (see
+    ``resample``), instead of one MT5 request per timeframe.
+
+    The ``Ticks`` pseudo-timeframe streams tick history to disk in
+    `tick_window_hours` chunks (see ``tick_data``); ticks are not charted.
+
+    Requested symbols are resolved through `symbol_catalog` (a shared
+    ``SymbolCatalog``, or a private one on the default catalog file), which
+    only calls ``symbols_get()`` when its cached copy is stale.
+
+    Chart series go into `chart_store` (a dict, or a ``chart_store.ChartStore``
+    that spills to disk past its memory budget) when one is given.
+
+    CSV exports use `csv_engine` ('pandas', or 'fast' for ``csv_writer``'s
+    vectorized writer) with optional gzip/zstd `csv_compression`; the fast
+    engine writes `csv_precision` decimals, by default the symbol's digits.
+
+    Bar exports other than Excel are written by `export_workers` background
+    threads (see ``export_pipeline``) while the next series is fetched, with
+    at most `export_queue` chunks waiting; 0 workers writes inline.
+
+    With `resume` (the default) a job with an output path checkpoints every
+    saved series in a manifest next to its output (see ``job_manifest``);
+    running the same job again skips the series that are already saved.
+
+    With `check_gaps` every downloaded series is checked for missing,
+    duplicated and out-of-order bars (see ``gap_check``); the reports are
+    logged and kept in ``gap_reports``.
+
+    With `panel_field` ('Close', 'OHLC' or 'Volume') the bar series are not
+    exported one by one: each timeframe becomes one time-aligned panel of
+    all symbols (see ``panel``), written at the end as `panel_format`
+    ('csv', 'parquet' or 'npz'), forward-filled with `panel_ffill`. Panel
+    jobs are not resumable.
+
+    Exported dates follow `time_output` (a ``frames.TimeOutput``: datetimes
+    in a chosen zone or int64 epoch numbers); charts keep the MT5 times.
+
+    The in-process path runs on `session`, a shared ``MT5Session`` that stays
+    connected between jobs; without one the job opens a private session and
+    closes it when done.
+    """
+
+    def __init__(self, symbols, timeframes, start_dt, end_dt, output_file, export_format, selected_columns,
+                 use_cache=False, cache_dir='bar_cache', window_days=30, excel_workers=None,
+                 terminal_paths=None, mt5_module='MetaTrader5', derive_timeframes=False, tick_window_hours=24,
+                 symbol_catalog=None, session=None, chart_store=None, csv_engine='pandas', csv_compression=None,
+                 csv_precision=None, export_workers=DEFAULT_EXPORT_WORKERS, export_queue=DEFAULT_QUEUED_CHUNKS,
+                 resume=True, metrics=None, check_gaps=False, time_output=None, panel_field=None, panel_ffill=False,
+                 panel_format='csv', log=None, progress=None, error=None, progress_interval=0.1):
+        self.symbols = symbols
+        self.timeframes = timeframes
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.output_file = output_file
+        self.export_format = export_format
+        self.selected_columns = selected_columns
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.bar_cache = BarCache(cache_dir) if use_cache else None
+        self.window = timedelta(days=window_days) if window_days else None
+        self.excel_workers = excel_workers or min(4, os.cpu_count() or 1)
+        self.terminal_paths = [p for p in (terminal_paths or []) if p]
+        self.mt5_module = mt5_module
+        bar_timeframes = [tf for tf in timeframes if tf != TICKS]
+        if derive_timeframes:
+            self.plan = derive_plan(bar_timeframes)
+        else:
+            self.plan = {timeframe: [] for timeframe in bar_timeframes}
+        if TICKS in timeframes:
+            self.plan[TICKS] = []
+        self.tick_window = timedelta(hours=tick_window_hours or 24)
+        self.symbol_catalog = symbol_catalog if symbol_catalog is not None else SymbolCatalog()
+        self.session = session
+        self.chart_store = chart_store
+        self.csv_engine = csv_engine
+        self.csv_compression = csv_compression
+        self.csv_precision = csv_precision
+        self.export_workers = export_workers or 0
+        self.export_queue = export_queue
+        self.pipeline = None
+        self.resume = resume
+        self.manifest = None
+        self.metrics = metrics if metrics is not None else MetricsRecorder(path=None)
+        self.check_gaps = check_gaps
+        self.gap_reports = {}
+        self.time_output = time_output or TimeOutput()
+        self.panel_field = panel_field
+        self.panel_ffill = panel_ffill
+        self.panel_format = panel_format
+        self.panels = {}
+        self.progress_interval = progress_interval
+        self.tracker = None
+        self._last_report = None
+        self.log = log or (lambda message, level: logging.log(logging.getLevelName(level), message))
+        self.progress = progress or (lambda snapshot: None)
+        self.error = error or (lambda message: logging.error(message))
+        self._is_running = True
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def stop(self):
+        self._is_running = False
+
+    def start_progress(self, plan):
+        """Register every symbol/timeframe task of `plan` with a fresh progress tracker"""
+        self.tracker = DownloadProgress(self.start_dt, self.end_dt)
+        self._last_report = None
+        for symbol in self.symbols:
+            for timeframe in plan:
+                self.tracker.add((symbol, timeframe), timeframe)
+
+    def report_progress(self, force=False):
+        """Send a progress snapshot unless one went out less than `progress_interval` ago"""
+        now = time.perf_counter()
+        if not force and self._last_report is not None and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        self.progress(self.tracker.snapshot())
+
+    def finish_task(self, key):
+        self.tracker.finish(key)
+        self.report_progress()
+
+    def count_bars(self, key, chunks):
+        """Pass rate chunks through, advancing the task's progress as they arrive"""
+        for rates in chunks:
+            self.tracker.advance(key, len(rates))
+            self.report_progress()
+            yield rates
+
+    def iter_rates(self, symbol, timeframe, tf_value, server, end_dt=None):
+        """Yield bars one fetch window at a time, via the local bar cache when enabled"""
+        return iter_series_rates(
+            mt5, symbol, timeframe, tf_value, self.start_dt, end_dt or self.end_dt, self.window,
+            bar_cache=self.bar_cache, server=server, should_continue=lambda: self._is_running,
+            log=lambda msg: self.log(msg, "INFO")
+        )
+
+    def dataset_root(self):
+        """Root folder of a partitioned Parquet/Feather dataset"""
+        return dataset_root(self.output_file)
+
+    def export_filename(self, symbol, timeframe):
+        """Resolve the output file for a single symbol/timeframe export"""
+        single = len(self.symbols) == 1 and len(self.timeframes) == 1
+        return series_filename(self.output_file, symbol, timeframe, self.start_dt, self.end_dt,
+                               self.export_format, single)
+
+    def float_precision(self, symbol):
+        """Decimals the fast CSV engine writes for `symbol`: the chosen precision or the symbol's digits"""
+        if self.csv_precision is not None:
+            return self.csv_precision
+        info = self.symbol_catalog.info(symbol)
+        return info.get('digits') if info else None
+
+    def open_series_writer(self, symbol, timeframe):
+        """Return (writer, target) for streaming one series to the chosen format.
+
+        `target` names the file or folder for log messages; it is None for a
+        sheet of the shared multi-sheet workbook, which is reported on close.
+        """
+        series_key = f"{symbol}_{timeframe}"
+        if self.export_format == "xlsx":
+            # An output folder gets one workbook per series, a file one sheet per series
+            if os.path.isdir(self.output_file):
+                filename = self.export_filename(symbol, timeframe)
+                workbook = XlsxStreamWriter(filename, rollover='workbooks', executor=self._excel_pool)
+                return _SheetWriter(workbook, series_key, owns_workbook=True), filename
+            if self._excel_writer is None:
+                self._excel_writer = XlsxStreamWriter(self.output_file, executor=self._excel_pool)
+            return _SheetWriter(self._excel_writer, series_key), None
+        if self.export_format in DATASET_FORMATS:
+            column_types = {**ARROW_COLUMN_TYPES, 'Date': self.time_output.arrow_type()}
+            writer = PartitionedDatasetWriter(self.dataset_root(), symbol, timeframe, self.export_format,
+                                              column_types=column_types, epoch_unit=self.time_output.epoch_unit)
+            return writer, writer.series_dir()
+        return open_csv_writer(self.export_filename(symbol, timeframe), self.csv_engine, self.csv_compression,
+                               self.float_precision(symbol))
+
+    def download_series(self, symbol, timeframe, chunks, last_error=None):
+        """Stream one symbol/timeframe to its export; returns its chart data or None.
+
+        `chunks` yields the series' rate arrays in time order; `last_error()`
+        explains an empty series. Without a chart store nothing is kept for
+        charting and the number of bars is returned instead.
+        """
+        chart_parts = [] if self.chart_store is not None else None
+        bars = 0
+        writer = None
+        target = None
+        rows = 0
+        save_failed = False
+        # Series of the shared workbook are only written at the end, so they are staged for resuming
+        stage = self.manifest.open_stage(symbol, timeframe) \
+            if self.manifest is not None and self.shared_workbook() else None
+        checkpoint = True
+
+        # Only the charted and ticked columns are built, as views into each rates array
+        wanted = list(dict.fromkeys(CHART_COLUMNS + list(self.selected_columns)))
+        convert_span = self.metrics.open_span('convert', symbol, timeframe)
+        gap_times = [] if self.check_gaps else None
+        panel = self.panel_builder(timeframe)
+        # Export dates are converted once here; Excel gets them without a zone, as it has none
+        excel = self.export_format == "xlsx" and self.time_output.epoch_unit is None
+        convert_dates = excel or not self.time_output.is_default
+        try:
+            for rates in chunks:
+                if gap_times is not None:
+                    gap_times.append(rates['time'].copy())
+                with convert_span.measure():
+                    columns = rate_columns(rates, wanted)
+                    if chart_parts is not None:
+                        chart_parts.append(pd.DataFrame({name: columns[name] for name in CHART_COLUMNS}, copy=False))
+
+                    # Create export dataframe with user-selected columns
+                    available_cols = [col for col in self.selected_columns if col in columns]
+                    export_df = None
+                    if available_cols and panel is None:
+                        export_columns = {name: columns[name] for name in available_cols}
+                        if 'Date' in export_columns and convert_dates:
+                            export_columns['Date'] = self.time_output.convert(rates['time'], naive=excel)
+                        export_df = pd.DataFrame(export_columns, copy=False)
+                convert_span.add(rows=len(rates))
+                bars += len(rates)
+                if panel is not None:
+                    panel.add(symbol, rates)
+                    continue
+                if export_df is None:
+                    continue
+
+                if self.output_file:
+                    try:
+                        if writer is None:
+                            writer, target = self.open_series_writer(symbol, timeframe)
+                            writer = TimedWriter(writer, self.metrics.open_span(self.export_format, symbol, timeframe),
+                                                 target)
+                            if self.pipeline is not None and self.export_format != "xlsx":
+                                # Written on a background thread, which reports the result once closed
+                                writer = self.pipeline.open(writer, on_done=lambda done, t=target: self.series_saved(
+                                    symbol, timeframe, t, done.rows, done.error))
+                        writer.write(export_df)
+                    except Exception as e:
+                        self.log(f"Failed to save file: {e}", "ERROR")
+                        save_failed = True
+                        break
+                    if stage is not None:
+                        try:
+                            stage.write(export_df)
+                        except Exception as e:
+                            self.log(f"Could not checkpoint {symbol} {timeframe}: {e}", "WARNING")
+                            stage.abort()
+                            stage = None
+                            checkpoint = False
+                rows += len(export_df)
+        except Exception:
+            # The chunks failed (a worker lost mid-series), so nothing of the series is kept
+            if writer is not None:
+                writer.abort()
+            if stage is not None:
+                stage.abort()
+            raise
+        convert_span.close()
+
+        if writer is not None:
+            try:
+                # A stopped series is incomplete, so its temporary file never gets the final name
+                if self._is_running:
+                    writer.close()
+                else:
+                    writer.abort()
+            except Exception as e:
+                self.log(f"Failed to save file: {e}", "ERROR")
+                save_failed = True
+        if stage is not None and (save_failed or not self._is_running):
+            stage.abort()
+            stage = None
+
+        if bars == 0:
+            detail = last_error() if last_error is not None else "no bars in range"
+            self.log(f"No data returned for {symbol} {timeframe}: {detail}", "WARNING")
+            self.series_empty(symbol, timeframe)
+            return None
+        if gap_times is not None:
+            self.report_gaps(symbol, timeframe, np.concatenate(gap_times))
+        if panel is not None:
+            self.log(f"Added {symbol} {timeframe} to the {timeframe} panel", "INFO")
+            return self.chart_data(chart_parts, bars)
+
+        if rows == 0 and not save_failed:
+            self.log(f"No valid columns selected for {symbol} {timeframe}", "WARNING")
+            self.series_empty(symbol, timeframe)
+        elif not save_failed and not isinstance(writer, PipelinedWriter):
+            outputs = None if checkpoint else []
+            if stage is not None and self._is_running:
+                try:
+                    outputs = [stage.close()]
+                except Exception as e:
+                    self.log(f"Could not checkpoint {symbol} {timeframe}: {e}", "WARNING")
+                    outputs = []
+            self.series_saved(symbol, timeframe, target, rows, outputs=outputs)
+
+        return self.chart_data(chart_parts, bars)
+
+    @staticmethod
+    def chart_data(chart_parts, bars):
+        """Full OHLC data for charting, or just the bar count when nothing is charted"""
+        if chart_parts is None:
+            return bars
+        return pd.concat(chart_parts, ignore_index=True)
+
+    def panel_builder(self, timeframe):
+        """The panel collecting `timeframe`, or None when the job exports series one by one"""
+        if not self.panel_field or not self.output_file:
+            return None
+        if timeframe not in self.panels:
+            self.panels[timeframe] = PanelBuilder(timeframe, self.panel_field, self.panel_ffill)
+        return self.panels[timeframe]
+
+    def panel_filename(self, timeframe):
+        """``panel_<tf>_<start>_to_<end>.<ext>`` in (or next to) the output, always with the panel's extension"""
+        extension = PANEL_FORMATS[self.panel_format].lstrip('.')
+        return series_filename(self.output_file, 'panel', timeframe, self.start_dt, self.end_dt, extension, False)
+
+    def finish_panels(self):
+        """Write the panel of every timeframe; returns False if one failed"""
+        panels, self.panels = self.panels, {}
+        if not self._is_running:
+            return False
+        saved = True
+        for timeframe, panel in panels.items():
+            if not len(panel):
+                continue
+            try:
+                self.log(f"Aligning {len(panel)} symbols into the {timeframe} panel...", "INFO")
+                with self.metrics.span('panel', timeframe=timeframe) as timing:
+                    times, columns, values = panel.build()
+                    path = self.panel_filename(timeframe)
+                    writer = None
+                    if self.panel_format == 'csv':
+                        digits = [self.float_precision(symbol) for symbol in panel.times]
+                        precision = 0 if self.panel_field == 'Volume' else \
+                            max((d for d in digits if d is not None), default=None)
+                        writer, path = open_csv_writer(path, self.csv_engine, self.csv_compression, precision)
+                    rows = write_panel(path, times, columns, values, self.panel_format, self.time_output, writer)
+                    timing.add(rows=rows, nbytes=path_bytes(path))
+                self.log(f"Saved {timeframe} panel of {len(panel)} symbols x {rows} bars to {path}", "INFO")
+            except Exception as e:
+                error_msg = f"Failed to save {timeframe} panel: {e}"
+                self.log(error_msg, "ERROR")
+                self.error(error_msg)
+                saved = False
+        return saved
+
+    def report_gaps(self, symbol, timeframe, times):
+        """Check a downloaded series for missing, duplicated and out-of-order bars"""
+        try:
+            report = find_gaps(times, timeframe)
+        except Exception as e:
+            self.log(f"Gap check failed for {symbol} {timeframe}: {e}", "WARNING")
+            return
+        self.gap_reports[f"{symbol}_{timeframe}"] = report
+        self.log(f"Gap check {symbol} {timeframe}: {report.describe()}", "INFO" if report.is_complete else "WARNING")
+
+    def series_saved(self, symbol, timeframe, target, rows, error=None, outputs=None):
+        """Log the outcome of writing one series and checkpoint it when it is complete.
+
+        `outputs` are the files that prove the series is saved, `target` by default.
+        """
+        if error is not None:
+            self.log(f"Failed to save file: {error}", "ERROR")
+            return
+        if target:
+            if self._is_running:
+                self.log(f"Successfully saved {rows} rows to {target}", "INFO")
+            else:
+                self.log(f"Stopped; discarded the unfinished {target} after {rows} rows", "WARNING")
+        outputs = outputs if outputs is not None else [target]
+        if self._is_running and self.manifest is not None and any(outputs):
+            self.manifest.mark_done(symbol, timeframe, outputs, rows)
+
+    def series_empty(self, symbol, timeframe):
+        """Checkpoint a series with nothing to save, so a finished job still drops its manifest"""
+        if self._is_running and self.manifest is not None:
+            self.manifest.mark_empty(symbol, timeframe)
+
+    def symbol_missing(self, symbol, timeframes):
+        self.log(f"Symbol {symbol} not found (case mismatch)", "WARNING")
+        for timeframe in timeframes:
+            self.series_empty(symbol, timeframe)
+
+    def tick_target(self):
+        single = len(self.symbols) == 1 and len(self.timeframes) == 1
+        return TickTarget(self.output_file, self.export_format, self.start_dt, self.end_dt, single,
+                          csv_engine=self.csv_engine, csv_compression=self.csv_compression or 'gzip',
+                          time_output=self.time_output,
+                          digits={self.symbol_catalog.resolve(symbol) or symbol: self.float_precision(symbol)
+                                  for symbol in self.symbols})
+
+    def report_ticks(self, symbol, rows, path, last_error=None):
+        if rows == 0:
+            detail = last_error() if last_error is not None else "no ticks in range"
+            self.log(f"No ticks returned for {symbol}: {detail}", "WARNING")
+            self.series_empty(symbol, TICKS)
+        elif self._is_running:
+            self.log(f"Successfully saved {rows} ticks to {path}", "INFO")
+            if self.manifest is not None:
+                self.manifest.mark_done(symbol, TICKS, [path], rows)
+        else:
+            self.log(f"Stopped; discarded the unfinished {path} after {rows} ticks", "WARNING")
+
+    def download_ticks(self, symbol, key=None):
+        """Stream the tick history of one symbol straight to its output file"""
+        if not self.output_file:
+            self.log(f"Skipping {symbol} ticks: tick data is only written to disk, set an output path", "WARNING")
+            return
+        span = (self.end_dt - self.start_dt).total_seconds() or 1
+
+        def advance(rows, last_epoch):
+            if key is not None:
+                self.tracker.advance(key, fraction=(last_epoch - to_epoch(self.start_dt)) / span)
+                self.report_progress()
+
+        with self.metrics.span('ticks', symbol, TICKS) as timing:
+            rows, path = stream_ticks(mt5, symbol, self.tick_target(), window=self.tick_window,
+                                      should_continue=lambda: self._is_running, log=self.log, progress=advance)
+            timing.add(rows=rows, nbytes=path_bytes(path))
+        self.report_ticks(symbol, rows, path, last_error=mt5.last_error)
+
+    def fetch_end(self, derived):
+        """End of the base fetch: far enough to complete the last bar of every derived timeframe"""
+        end = to_epoch(self.end_dt)
+        for timeframe in derived:
+            end = max(end, bucket_end(to_epoch(self.end_dt), timeframe))
+        return from_epoch(end)
+
+    def export_group(self, symbol, timeframe, derived, chunks, result_data, last_error=None):
+        """Export a fetched series and every timeframe derived from it into result_data"""
+        if not derived:
+            data = self.download_series(symbol, timeframe, chunks, last_error=last_error)
+            if data is not None:
+                result_data[f"{symbol}_{timeframe}"] = data
+            return
+        start, end = to_epoch(self.start_dt), to_epoch(self.end_dt)
+        aggregators = {target: RateAggregator(target) for target in derived}
+        spans = {target: self.metrics.open_span('derive', symbol, target) for target in derived}
+        derived_parts = {target: [] for target in derived}
+
+        def aggregate(target, rates):
+            with spans[target].measure():
+                bars = aggregators[target].add(rates) if rates is not None else aggregators[target].flush()
+            if bars is not None and len(bars):
+                derived_parts[target].append(bars)
+                spans[target].add(rows=len(bars))
+
+        def base_chunks():
+            # Each window is aggregated as it passes through to the base export; only derived bars are kept
+            for rates in chunks:
+                for target in derived:
+                    aggregate(target, rates)
+                # Like copy_rates_range, keep bars that open inside the requested range
+                rates = slice_rates(rates, start, end)
+                if len(rates):
+                    yield rates
+
+        base = base_chunks()
+        data = self.download_series(symbol, timeframe, base, last_error=last_error)
+        if data is not None:
+            result_data[f"{symbol}_{timeframe}"] = data
+        for _ in base:
+            pass  # A failed base export stops early; the derived series still need the rest
+        for target in derived:
+            aggregate(target, None)
+            spans[target].close()
+            parts = derived_parts.pop(target)
+            if not self._is_running:
+                continue
+            series = slice_rates(np.concatenate(parts), start, end) if parts else None
+            if series is not None and len(series):
+                self.log(f"Derived {len(series)} {symbol} {target} bars from {timeframe}", "INFO")
+            data = self.download_series(symbol, target, split_rates(series, self.window), last_error=last_error)
+            if data is not None:
+                result_data[f"{symbol}_{target}"] = data
+
+    def start_excel_pool(self):
+        if self.export_format == "xlsx" and self.output_file and self.excel_workers > 1:
+            self._excel_pool = ProcessPoolExecutor(max_workers=self.excel_workers)
+
+    def shared_workbook(self):
+        """True when every series goes into one multi-sheet workbook written at the end"""
+        return self.export_format == "xlsx" and bool(self.output_file) and not os.path.isdir(self.output_file)
+
+    def open_manifest(self):
+        """Load this job's checkpoint manifest; jobs without an output path are not resumable"""
+        self.manifest = None
+        if not self.resume or not self.output_file or self.panel_field:
+            return
+        key = job_key(
+            symbols=self.symbols, timeframes=self.timeframes, start=self.start_dt, end=self.end_dt,
+            output=os.path.abspath(self.output_file), format=self.export_format, columns=self.selected_columns,
+            plan=self.plan, csv=[self.csv_engine, self.csv_compression, self.csv_precision],
+            time=[self.time_output.time_format, self.time_output.timezone, self.time_output.server_timezone],
+        )
+        if self.export_format in DATASET_FORMATS:
+            folder = self.dataset_root()
+        else:
+            folder = self.output_file if os.path.isdir(self.output_file) else os.path.dirname(self.output_file)
+        self.manifest = JobManifest(folder, key)
+        if len(self.manifest):
+            self.log(f"Resuming job: {len(self.manifest)} series already saved by an earlier run", "INFO")
+
+    def skip_saved(self, symbol, timeframe, derived):
+        """True when an earlier run saved `timeframe` and everything derived from it.
+
+        Series of the shared workbook are copied into it from their staged rows.
+        """
+        if self.manifest is None:
+            return False
+        targets = [timeframe] + derived
+        if not all(self.manifest.is_done(symbol, target) for target in targets):
+            return False
+        if self.shared_workbook() and timeframe != TICKS:
+            for target in targets:
+                if not self.manifest.outputs(symbol, target):
+                    continue  # Nothing was saved for it
+                writer, _ = self.open_series_writer(symbol, target)
+                for df in self.manifest.staged(symbol, target):
+                    writer.write(df)
+        self.log(f"Skipping {symbol} {'/'.join(targets)}: already saved by an earlier run", "INFO")
+        return True
+
+    def finish_manifest(self, saved=True):
+        """Drop the checkpoints once every series of the job is saved"""
+        if self.manifest is None:
+            return
+        units = len(self.symbols) * sum(1 + len(derived) for derived in self.plan.values())
+        if saved and self._is_running and len(self.manifest) >= units:
+            self.manifest.remove()
+        elif len(self.manifest):
+            self.log(f"{len(self.manifest)} of {units} series saved; run the same job again to finish the rest",
+                     "INFO")
+
+    def start_pipeline(self):
+        if self.export_workers > 0 and self.output_file:
+            self.pipeline = ExportPipeline(self.export_workers, self.export_queue)
+
+    def finish_pipeline(self):
+        """Wait for the background writers to finish every queued series"""
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+
+    def finish_excel(self):
+        """Finish the multi-symbol/multi-timeframe Excel workbook; returns False if it failed"""
+        if self._excel_writer is None:
+            return True
+        if not self._is_running:
+            # Its sheets may be truncated; staged series are replayed when the job is resumed
+            return False
+        try:
+            self.log("Writing Excel workbook...", "INFO")
+            with self.metrics.span('xlsx') as timing:
+                files = self._excel_writer.close()
+                timing.add(nbytes=sum(path_bytes(path) for path in files))
+            self.log(f"Successfully saved {self._excel_writer.sheet_count} sheets to {', '.join(files)}", "INFO")
+            return True
+        except Exception as e:
+            error_msg = f"Failed to save Excel file: {str(e)}"
+            self.log(error_msg, "ERROR")
+            self.error(error_msg)
+            return False
+
+    def log_finished(self, saved):
+        if saved:
+            self.log("Download completed successfully", "INFO")
+        else:
+            self.log("Download finished, but not every file could be saved", "WARNING")
+
+    def release_excel(self):
+        if self._excel_writer is not None:
+            self._excel_writer.abort()
+        if self._excel_pool is not None:
+            self._excel_pool.shutdown(cancel_futures=True)
+
+    def run(self):
+        self.metrics.start_run(f"{len(self.symbols)} symbols x {','.join(self.timeframes)} to {self.export_format}")
+        self._excel_writer = None  # Shared workbook for multi-sheet Excel export
+        self._excel_pool = None
+        self.pipeline = None
+        self.panels = {}
+        self.open_manifest()
+        if len(self.terminal_paths) > 1:
+            return self.run_parallel()
+        terminal_path = self.terminal_paths[0] if self.terminal_paths else None
+        owns_session = self.session is None
+        session = self.session or MT5Session(terminal_path, log=self.log)
+        session.configure(terminal_path)
+        try:
+            with session.acquire() as mt5:
+                self.log("Getting available symbols...", "INFO")
+                catalog = self.symbol_catalog
+                server = catalog.ensure(mt5)
+                self.log(f"Found {len(catalog)} available symbols", "INFO")
+
+                result_data = self.chart_store if self.chart_store is not None else {}  # OHLC data for charting
+                self.start_excel_pool()
+                self.start_pipeline()
+
+                tf_mapping = timeframe_constants(mt5)
+
+                total_tasks = len(self.symbols) * len(self.timeframes)
+                self.start_progress(self.plan)
+                self.log(f"Starting download of {total_tasks} symbol/timeframe combinations", "INFO")
+
+                for symbol in self.symbols:
+                    if not self._is_running:
+                        break
+
+                    session.ensure()  # Reconnects if the terminal was restarted mid-job
+                    exact_symbol = catalog.resolve(symbol, mt5)
+                    if not exact_symbol:
+                        self.symbol_missing(symbol, [target for timeframe, derived in self.plan.items()
+                                                     for target in [timeframe] + derived])
+                        for timeframe in self.plan:
+                            self.finish_task((symbol, timeframe))
+                        continue
+
+                    for timeframe, derived in self.plan.items():
+                        if not self._is_running:
+                            break
+
+                        key = (symbol, timeframe)
+                        if self.skip_saved(exact_symbol, timeframe, derived):
+                            self.finish_task(key)
+                            continue
+                        try:
+                            self.log(f"Downloading {exact_symbol} {timeframe} data...", "INFO")
+                            if timeframe == TICKS:
+                                self.download_ticks(exact_symbol, key)
+                            else:
+                                chunks = timed_chunks(
+                                    self.iter_rates(exact_symbol, timeframe, tf_mapping[timeframe], server,
+                                                    end_dt=self.fetch_end(derived)),
+                                    self.metrics.open_span('fetch', exact_symbol, timeframe))
+                                self.export_group(exact_symbol, timeframe, derived, self.count_bars(key, chunks),
+                                                  result_data, last_error=mt5.last_error)
+
+                        except Exception as e:
+                            self.log(f"Error processing {exact_symbol} {timeframe}: {str(e)}", "ERROR")
+
+                        self.finish_task(key)
+
+                self.finish_pipeline()
+                panels_saved = self.finish_panels()
+                self.report_progress(force=True)
+                saved = self.finish_excel() and panels_saved
+                self.finish_manifest(saved)
+
+                if self._is_running:
+                    self.log_finished(saved)
+                    self.log(f"Stage times: {self.metrics.summary() or 'none'}", "INFO")
+                    return result_data
+                return None
+
+        except MT5SessionError as e:
+            error_msg = str(e)
+            self.log(error_msg, "ERROR")
+            self.error(error_msg)
+            return None
+
+        except Exception as e:
+            error_msg = f"Error during download: {str(e)}"
+            self.log(error_msg, "ERROR")
+            self.error(error_msg)
+            return None
+
+        finally:
+            self.finish_pipeline()
+            self.release_excel()
+            if owns_session:
+                self.log("Shutting down MT5 connection", "INFO")
+                session.close()
+
+    def run_parallel(self):
+        """Fetch series on one worker process per terminal and export them here"""
+        pool = TerminalPool(self.terminal_paths, self.start_dt, self.end_dt, window=self.window,
+                            use_cache=self.use_cache, cache_dir=self.cache_dir, mt5_module=self.mt5_module,
+                            catalog_path=self.symbol_catalog.path, catalog_ttl=self.symbol_catalog.ttl,
+                            tick_target=self.tick_target(), tick_window=self.tick_window)
+        plan = self.plan
+        total_tasks = len(self.symbols) * len(self.timeframes)
+        completed_tasks = 0
+        self.start_progress(plan)
+        if TICKS in plan and not self.output_file:
+            self.log("Skipping ticks: tick data is only written to disk, set an output path", "WARNING")
+            plan = {timeframe: derived for timeframe, derived in plan.items() if timeframe != TICKS}
+            completed_tasks += len(self.symbols)
+            for symbol in self.symbols:
+                self.tracker.finish((symbol, TICKS))
+        tasks = [(symbol, timeframe, self.fetch_end(derived))
+                 for symbol in self.symbols for timeframe, derived in plan.items()]
+        ready_workers = 0
+        feeds = {}  # Worker id -> export of the series it is fetching
+        result_data = self.chart_store if self.chart_store is not None else {}
+
+        def open_feed(symbol, timeframe):
+            def export(chunks):
+                try:
+                    self.export_group(symbol, timeframe, self.plan[timeframe], chunks, result_data,
+                                      last_error=lambda: feed.error)
+                except Exception as e:
+                    self.log(f"Error processing {symbol} {timeframe}: {str(e)}", "ERROR")
+            feed = _SeriesFeed(export)
+            return feed
+
+        try:
+            self.log(f"Starting {len(pool)} terminal workers for {total_tasks} symbol/timeframe combinations",
+                     "INFO")
+            self.start_excel_pool()
+            self.start_pipeline()
+            pending = []
+            for symbol, timeframe, fetch_end in tasks:
+                if self.skip_saved(self.symbol_catalog.resolve(symbol) or symbol, timeframe, plan[timeframe]):
+                    completed_tasks += 1 + len(plan[timeframe])
+                    self.finish_task((symbol, timeframe))
+                else:
+                    pending.append((symbol, timeframe, fetch_end))
+            if pending:
+                pool.start(pending)
+            for message in pool.messages(should_continue=lambda: self._is_running) if pending else []:
+                kind, worker_id = message[0], message[1]
+                terminal = self.terminal_paths[worker_id]
+                if kind == 'ready':
+                    ready_workers += 1
+                    self.log(f"Terminal {terminal} connected ({message[2]} symbols)", "INFO")
+                elif kind == 'failed':
+                    self.log(f"Terminal {terminal}: {message[2]}", "ERROR")
+                    if worker_id in feeds:
+                        feeds.pop(worker_id).close(message[2])
+                elif kind == 'log':
+                    self.log(message[2], message[3])
+                elif kind == 'window':
+                    _, _, symbol, timeframe, exact_symbol, rates = message
+                    if worker_id not in feeds:
+                        feeds[worker_id] = open_feed(exact_symbol, timeframe)
+                    self.tracker.advance((symbol, timeframe), len(rates))
+                    self.report_progress()
+                    feeds[worker_id].put(rates)
+                elif kind == 'series':
+                    _, _, symbol, timeframe, exact_symbol, bars, error = message
+                    derived = self.plan[timeframe]
+                    if exact_symbol is None:
+                        self.symbol_missing(symbol, [timeframe] + derived)
+                    else:
+                        self.log(f"Downloaded {exact_symbol} {timeframe} on terminal {terminal}", "INFO")
+                        feed = feeds.pop(worker_id, None) or open_feed(exact_symbol, timeframe)
+                        feed.error = error
+                        # Bars followed by an error mean the worker stopped short, so the series is not saved
+                        feed.close(error if error and bars else None)
+                    completed_tasks += 1 + len(derived)
+                    self.finish_task((symbol, timeframe))
+                elif kind == 'ticks':
+                    _, _, symbol, exact_symbol, rows, path, error = message
+                    if exact_symbol is None:
+                        self.symbol_missing(symbol, [TICKS])
+                    else:
+                        self.report_ticks(exact_symbol, rows, path, last_error=lambda: error)
+                    completed_tasks += 1
+                    self.finish_task((symbol, TICKS))
+            while feeds:
+                feeds.popitem()[1].close()  # Stopped mid-series, so the export discards it
+
+            if ready_workers == 0 and pending:
+                error_msg = "Failed to initialize any MT5 terminal"
+                self.log(error_msg, "ERROR")
+                self.error(error_msg)
+                return None
+            if self._is_running and completed_tasks < total_tasks:
+                self.log(f"{total_tasks - completed_tasks} symbol/timeframe combinations were not downloaded",
+                         "WARNING")
+            self.finish_pipeline()
+            panels_saved = self.finish_panels()
+            self.report_progress(force=True)
+
+            saved = self.finish_excel() and panels_saved
+            self.finish_manifest(saved and completed_tasks >= total_tasks)
+            if self._is_running:
+                self.log_finished(saved)
+                self.log(f"Stage times: {self.metrics.summary() or 'none'}", "INFO")
+                return result_data
+            return None
+
+        except Exception as e:
+            error_msg = f"Error during download: {str(e)}"
+            self.log(error_msg, "ERROR")
+            self.error(error_msg)
+            return None
+
+        finally:
+            for feed in feeds.values():
+                feed.close("Download ended before the series was complete")
+            self.finish_pipeline()
+            self.release_excel()
+            self.log("Shutting down terminal workers", "INFO")
+            pool.close()
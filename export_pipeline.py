@@ -0,0 +1,118 @@
+"""Background export writers, so fetching and writing overlap.
+
+Without a pipeline a job alternates between waiting on MT5 and waiting on
+the disk. ``ExportPipeline`` hands every converted chunk to one of
+`workers` writer threads through a bounded queue: the fetching thread only
+blocks when `max_chunks` chunks are already waiting, which caps the memory
+held by unwritten data, and the wall time of a job approaches the slower
+of fetching and writing instead of their sum.
+
+Each series is pinned to one writer thread (its lane), so its chunks are
+written in order by a single thread while different series are written in
+parallel. Writers must not be shared between series. A job with
+``export_workers=0`` (``--export-workers 0`` in batch mode) writes inline.
+"""
+import queue
+import logging
+import threading
+
+DEFAULT_EXPORT_WORKERS = 2
+DEFAULT_QUEUED_CHUNKS = 8
+
+
+class PipelinedWriter:
+    """Stands in for a series writer; ``write``, ``close`` and ``abort`` are queued to its lane.
+
+    A failed write is kept in `error`; later chunks of the series are
+    dropped and `on_done(self)` reports the outcome once the series is
+    closed or aborted (`aborted` is then set).
+    """
+
+    def __init__(self, lane, writer, on_done=None):
+        self.lane = lane
+        self.writer = writer
+        self.on_done = on_done
+        self.rows = 0
+        self.error = None
+        self.aborted = False
+        self.done = threading.Event()
+
+    def write(self, df):
+        self.lane.put((self, df))
+
+    def close(self):
+        self.lane.put((self, None))
+
+    def abort(self):
+        """Discard the series once its queued chunks are drained, instead of finishing it"""
+        self.aborted = True
+        self.lane.put((self, None))
+
+    def _run_write(self, df):
+        if self.error is not None or self.aborted:
+            return
+        try:
+            self.writer.write(df)
+            self.rows += len(df)
+        except Exception as e:
+            self.error = e
+
+    def _run_close(self):
+        try:
+            if self.aborted:
+                self.writer.abort()
+            else:
+                self.writer.close()
+        except Exception as e:
+            self.error = self.error or e
+        self.done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                logging.error(f"Error reporting export result: {e}")
+
+
+class ExportPipeline:
+    """A fixed set of writer threads fed through bounded per-thread queues"""
+
+    def __init__(self, workers=DEFAULT_EXPORT_WORKERS, max_chunks=DEFAULT_QUEUED_CHUNKS):
+        self.workers = max(1, workers)
+        per_lane = max(1, max_chunks // self.workers)
+        self.lanes = [queue.Queue(maxsize=per_lane) for _ in range(self.workers)]
+        self.threads = []
+        self.opened = 0
+
+    def _start(self):
+        for number, lane in enumerate(self.lanes):
+            thread = threading.Thread(target=self._drain, args=(lane,), name=f"export-{number}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    @staticmethod
+    def _drain(lane):
+        while True:
+            item = lane.get()
+            if item is None:
+                return
+            writer, df = item
+            if df is None:
+                writer._run_close()
+            else:
+                writer._run_write(df)
+
+    def open(self, writer, on_done=None):
+        """Wrap a series writer so its chunks are written on the next lane in turn"""
+        if not self.threads:
+            self._start()
+        lane = self.lanes[self.opened % self.workers]
+        self.opened += 1
+        return PipelinedWriter(lane, writer, on_done)
+
+    def close(self):
+        """Wait until every queued chunk is written and every series closed, then stop the threads"""
+        for lane in self.lanes if self.threads else []:
+            lane.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
@@ -0,0 +1,282 @@
+import os
+import gzip
+import logging
+
+# Arrow types for every exportable column; anything else is inferred
+ARROW_COLUMN_TYPES = {
+    'Date': ('timestamp', 's', 'UTC'),
+    'Open': 'float64',
+    'High': 'float64',
+    'Low': 'float64',
+    'Close': 'float64',
+    'Volume': 'uint64',
+    'Spread': 'int32',
+    'RealVolume': 'uint64',
+}
+
+DATASET_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.arrow',
+}
+
+# Files are written under this suffix and renamed once complete
+PART_SUFFIX = '.part'
+
+
+def finish_part(path):
+    """Move a completed ``path + PART_SUFFIX`` file into place"""
+    part = path + PART_SUFFIX
+    if os.path.exists(part):
+        os.replace(part, path)
+
+
+def discard_part(path):
+    """Delete the unfinished ``path + PART_SUFFIX`` file of an aborted export"""
+    part = path + PART_SUFFIX
+    if os.path.exists(part):
+        os.remove(part)
+
+
+def require_pyarrow():
+    """Import pyarrow or raise a readable error when it is not installed"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet/Feather export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def arrow_schema(columns, column_types=None):
+    """Build a typed Arrow schema for the given export columns"""
+    pa = require_pyarrow()
+    column_types = column_types or ARROW_COLUMN_TYPES
+    fields = []
+    for col in columns:
+        spec = column_types.get(col)
+        if spec is None:
+            continue
+        if isinstance(spec, tuple):
+            _, unit, tz = spec
+            fields.append(pa.field(col, pa.timestamp(unit, tz=tz)))
+        else:
+            fields.append(pa.field(col, getattr(pa, spec)()))
+    return pa.schema(fields)
+
+
+class PartitionedDatasetWriter:
+    """Streams one symbol/timeframe series into a Hive-partitioned Arrow dataset.
+
+    Rows land in ``root/symbol=S/timeframe=TF/year=YYYY/data.<ext>``, written
+    as ``data.<ext>.part`` and renamed once the year is complete. A year that
+    already holds data (an earlier range, or ``update_daemon`` update files)
+    is merged into one sorted data file in which the new rows replace stored
+    rows with the same Date; other years are left alone, so a dataset can be
+    grown one date range at a time. Chunks must arrive in time order, which
+    keeps at most one file open per series.
+    """
+
+    def __init__(self, root, symbol, timeframe, export_format='parquet', compression='zstd', column_types=None,
+                 epoch_unit='s'):
+        if export_format not in DATASET_FORMATS:
+            raise ValueError(f"Unsupported dataset format: {export_format}")
+        self.pa = require_pyarrow()
+        self.root = root
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.export_format = export_format
+        self.compression = compression
+        self.column_types = column_types
+        self.epoch_unit = epoch_unit  # Unit of an integer Date column
+        self.schema = None
+        self.files = []
+        self.rows = 0
+        self._year = None
+        self._writer = None
+
+    def series_dir(self):
+        return os.path.join(self.root, f"symbol={self.symbol}", f"timeframe={self.timeframe}")
+
+    def partition_dir(self, year):
+        return os.path.join(self.series_dir(), f"year={year}")
+
+    def _open(self, year):
+        folder = self.partition_dir(year)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "data" + DATASET_FORMATS[self.export_format])
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path + PART_SUFFIX, self.schema, compression=self.compression)
+        else:
+            options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = self.pa.ipc.new_file(path + PART_SUFFIX, self.schema, options=options)
+        self._year = year
+        self.files.append(path)
+
+    def _close_current(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._year = None
+            path = self.files[-1]
+            merged = self._merge_existing(path)
+            finish_part(path)
+            # Only dropped once their rows are in place, so a crash can at worst leave duplicates
+            for other in merged:
+                if other != path:
+                    os.remove(other)
+
+    def _read(self, path):
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_table(path)
+        import pyarrow.feather as feather
+        return feather.read_table(path)
+
+    def _merge_existing(self, path):
+        """Fold the partition's existing files into the finished part; returns the files merged"""
+        folder = os.path.dirname(path)
+        extension = DATASET_FORMATS[self.export_format]
+        existing = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(extension))
+        if not existing:
+            return []
+        part = path + PART_SUFFIX
+        new = self._read(part)
+        try:
+            if 'Date' not in new.column_names:
+                raise ValueError("no Date column to match rows on")
+            tables = [self._read(other).select(new.column_names).cast(new.schema) for other in existing]
+        except Exception as e:
+            logging.warning(f"Replacing {path} without merging the partition's existing rows: {e}")
+            return []
+        import pyarrow.compute as pc
+        dates = new.column('Date')
+        kept = [table.filter(pc.invert(pc.is_in(table.column('Date'), value_set=dates))) for table in tables]
+        merged = self.pa.concat_tables(kept + [new]).sort_by('Date')
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(merged, part, compression=self.compression)
+        else:
+            options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+            with self.pa.ipc.new_file(part, merged.schema, options=options) as writer:
+                writer.write_table(merged)
+        return existing
+
+    def write(self, df):
+        """Append a time-ordered chunk of export rows"""
+        if df.empty:
+            return
+        if self.schema is None:
+            self.schema = arrow_schema(df.columns, self.column_types)
+            if len(self.schema) != len(df.columns):
+                # Keep unknown columns with inferred types rather than dropping them
+                self.schema = self.pa.Schema.from_pandas(df, preserve_index=False)
+        if 'Date' in df.columns and df['Date'].dtype.kind in 'iu':
+            epochs = df['Date'].to_numpy().astype(f'datetime64[{self.epoch_unit}]')
+            years = epochs.astype('datetime64[Y]').astype('int64') + 1970
+        elif 'Date' in df.columns:
+            years = df['Date'].dt.year.to_numpy()
+        else:
+            years = None
+        if years is None or years[0] == years[-1]:
+            self._write_year(df, years[0] if years is not None else 'all')
+            return
+        # Chunks are sorted by time, so each year is one contiguous slice
+        boundaries = (years[1:] != years[:-1]).nonzero()[0] + 1
+        starts = [0] + list(boundaries)
+        ends = list(boundaries) + [len(df)]
+        for lo, hi in zip(starts, ends):
+            self._write_year(df.iloc[lo:hi], years[lo])
+
+    def _write_year(self, df, year):
+        if year != self._year:
+            self._close_current()
+            self._open(year)
+        table = self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False, safe=False)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """Flush and close the open partition file"""
+        self._close_current()
+
+    def abort(self):
+        """Close the open partition file and delete it; finished years are kept"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._year = None
+            path = self.files.pop()
+            discard_part(path)
+            try:
+                os.rmdir(os.path.dirname(path))  # Only succeeds when the year held nothing else
+            except OSError:
+                pass
+
+
+
+def dataset_root(output_file):
+    """Root folder of a partitioned Parquet/Feather dataset"""
+    if os.path.isdir(output_file) or not os.path.splitext(output_file)[1]:
+        return output_file
+    return os.path.dirname(output_file) or "."
+
+
+def series_filename(output_file, symbol, timeframe, start_dt, end_dt, extension, single):
+    """Output file for one symbol/timeframe.
+
+    A single series goes to `output_file` itself unless it is a folder;
+    otherwise each series gets its own file next to (or inside) it.
+    """
+    if single and not os.path.isdir(output_file):
+        return output_file
+    if os.path.isdir(output_file):
+        base_dir = output_file
+    else:
+        base_dir = os.path.dirname(output_file) or "."
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+    return os.path.join(
+        base_dir,
+        f"{symbol}_{timeframe}_{start_dt.strftime('%Y%m%d')}_to_{end_dt.strftime('%Y%m%d')}.{extension}"
+    )
+
+
+class CsvStreamWriter:
+    """Appends chunks of one series to a CSV file, writing the header once.
+
+    With ``compression='gzip'`` the file is kept open as one gzip stream.
+    Rows go to ``filename + PART_SUFFIX``, which replaces `filename` on close
+    and is deleted by ``abort`` when the series is stopped.
+    """
+
+    def __init__(self, filename, compression=None):
+        self.filename = filename
+        self.compression = compression
+        self.rows = 0
+        self.header_written = False
+        self._handle = None
+
+    def write(self, df):
+        part = self.filename + PART_SUFFIX
+        header = not self.header_written
+        if self.compression == 'gzip':
+            if self._handle is None:
+                self._handle = gzip.open(part, 'wt', compresslevel=6, newline='')
+            df.to_csv(self._handle, index=False, header=header)
+        else:
+            df.to_csv(part, index=False, mode='w' if header else 'a', header=header)
+        self.header_written = True
+        self.rows += len(df)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        finish_part(self.filename)
+
+    def abort(self):
+        """Close and delete the unfinished file"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        discard_part(self.filename)
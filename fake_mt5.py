@@ -0,0 +1,369 @@
+"""Synthetic stand-in for the MetaTrader5 package, for benchmarks and dry runs.
+
+It implements the part of the MT5 API this tool uses (``initialize``,
+``copy_rates_range``, ``copy_ticks_range``, ``symbols_get``...) and returns
+structured arrays with MT5's dtypes. Prices are a deterministic multi-scale
+noise walk per symbol, so overlapping requests agree bar for bar and runs
+are repeatable; forex and metals pause over the weekend like a real feed.
+Only M1 bars are generated; every coarser timeframe is aggregated from them,
+so a D1 bar holds exactly the M15 or H1 bars of its day.
+
+    import fake_mt5
+    fake_mt5.install(latency=0.05, failure_rate=0.01)  # before MetaTrader5 is imported
+    fake_mt5.configure(tick_interval_ms=250)
+
+``install`` registers the module as ``MetaTrader5``, so ``MT5Session`` and
+``download_core`` use it without changes. Latency, throughput and failures
+are injectable; a failed call returns None and sets ``last_error()``, like
+the real terminal.
+"""
+import sys
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from collections import namedtuple
+import numpy as np
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+TIMEFRAME_MN1 = 49153
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+RES_S_OK = 1
+RES_E_INTERNAL_FAIL = -10001
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+TICKS_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+# Bar length in seconds; MN1 bars start on the 1st of each month
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800, TIMEFRAME_H1: 3600,
+    TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400, TIMEFRAME_W1: 604800,
+}
+
+# M1 bars aggregated per step when building a coarser timeframe
+MINUTES_PER_BATCH = 500_000
+
+SymbolInfo = namedtuple('SymbolInfo', 'name visible digits point path description spread')
+TerminalInfo = namedtuple('TerminalInfo', 'connected build name path')
+AccountInfo = namedtuple('AccountInfo', 'login server currency')
+
+# name -> (price level, digits, typical spread in points, trades at weekends, path)
+DEFAULT_SYMBOLS = {
+    'EURUSD': (1.10, 5, 12, False, 'Forex\\Majors'),
+    'GBPUSD': (1.27, 5, 15, False, 'Forex\\Majors'),
+    'USDJPY': (150.0, 3, 14, False, 'Forex\\Majors'),
+    'AUDUSD': (0.66, 5, 14, False, 'Forex\\Majors'),
+    'GBPJPY': (190.0, 3, 30, False, 'Forex\\Crosses'),
+    'XAUUSD': (2000.0, 2, 25, False, 'Metals'),
+    'US500': (5000.0, 1, 50, False, 'Indices'),
+    'BTCUSD': (60000.0, 2, 1500, True, 'Crypto'),
+}
+
+_config = {
+    'latency': 0.0,  # Seconds added to every data call
+    'bars_per_second': None,  # Transfer rate cap of the simulated terminal (None: unlimited)
+    'failure_rate': 0.0,  # Probability that a data call fails
+    'connect_failures': 0,  # initialize() calls that fail before one succeeds
+    'tick_interval_ms': 500,  # Mean spacing of ticks
+    'volatility': 1.0,  # Scales every price move
+    'server': 'FakeBroker-Demo',
+    'seed': 0,
+}
+_symbols = dict(DEFAULT_SYMBOLS)
+_state = {'connected': False, 'error': (RES_S_OK, 'Success'), 'connect_failures': 0, 'calls': 0, 'bars': 0}
+_lock = threading.Lock()
+_random = random.Random(0)
+
+
+def configure(symbols=None, **options):
+    """Change the simulation; `options` are keys of ``_config``, `symbols` replaces the symbol table"""
+    unknown = set(options) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown fake MT5 options: {', '.join(sorted(unknown))}")
+    with _lock:
+        _config.update(options)
+        if symbols is not None:
+            _symbols.clear()
+            _symbols.update(symbols)
+        _state['connect_failures'] = _config['connect_failures']
+        _random.seed(_config['seed'])
+
+
+def install(**options):
+    """Register this module as ``MetaTrader5`` (and apply `options`); returns the module"""
+    module = sys.modules[__name__]
+    configure(**options)
+    sys.modules['MetaTrader5'] = module
+    return module
+
+
+def stats():
+    """Data calls served and bars/ticks returned since the last ``reset_stats()``"""
+    return {'calls': _state['calls'], 'bars': _state['bars']}
+
+
+def reset_stats():
+    _state['calls'] = 0
+    _state['bars'] = 0
+
+
+def _epoch(value):
+    """Epoch seconds of a datetime (naive means UTC, as in MT5) or a number"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def _fail(code, message):
+    _state['error'] = (code, message)
+    return None
+
+
+def _serve(count):
+    """Account for one data call: latency, throughput cap and random failure. False when it fails"""
+    with _lock:
+        failed = _random.random() < _config['failure_rate']
+        delay = _config['latency']
+        if _config['bars_per_second']:
+            delay += count / _config['bars_per_second']
+    if delay > 0:
+        time.sleep(delay)
+    if failed:
+        return False
+    _state['calls'] += 1
+    _state['bars'] += count
+    _state['error'] = (RES_S_OK, 'Success')
+    return True
+
+
+def _mix(values):
+    """splitmix64 hash of uint64 values"""
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _uniform(values, salt):
+    """Deterministic uniforms in [-1, 1) for integer inputs"""
+    hashed = _mix(values.astype(np.int64).view(np.uint64) ^ np.uint64(salt))
+    return (hashed >> np.uint64(11)).astype(np.float64) / 2.0 ** 52 - 1.0
+
+
+def _symbol_salt(name):
+    return (sum(ord(c) * 131 ** i for i, c in enumerate(name)) + _config['seed']) % 2 ** 63
+
+
+def _price(name, seconds):
+    """Mid price of a symbol at epoch `seconds` (float array)"""
+    level = _symbols[name][0]
+    salt = _symbol_salt(name)
+    move = np.zeros(len(seconds))
+    # Smoothed noise at scales from minutes to months, larger moves at longer scales
+    for index, scale in enumerate((120.0, 1800.0, 14400.0, 86400.0, 604800.0, 2592000.0)):
+        position = seconds / scale
+        knot = np.floor(position)
+        fraction = position - knot
+        fraction = fraction * fraction * (3 - 2 * fraction)
+        left = _uniform(knot, salt + index)
+        right = _uniform(knot + 1, salt + index)
+        move += (left + (right - left) * fraction) * 0.0002 * np.sqrt(scale / 120.0)
+    return level * np.exp(move * _config['volatility'])
+
+
+def _trading(name, seconds):
+    """Which epochs fall in the symbol's trading week (forex: Sunday 22:00 to Friday 22:00 UTC)"""
+    if _symbols[name][3]:
+        return np.ones(len(seconds), dtype=bool)
+    week = (np.asarray(seconds, dtype=np.int64) + 4 * 86400 - 22 * 3600) % 604800  # 0 = Sunday 22:00
+    return week < 5 * 86400
+
+
+def _bar_starts(timeframe, start, end):
+    """Open times of the bars in [start, end]"""
+    if timeframe == TIMEFRAME_MN1:
+        first = np.datetime64(int(start), 's').astype('datetime64[M]')
+        last = np.datetime64(int(end), 's').astype('datetime64[M]')
+        months = np.arange(first, last + 1).astype('datetime64[s]').astype(np.int64)
+        return months[(months >= start) & (months <= end)]
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    offset = 3 * 86400 if timeframe == TIMEFRAME_W1 else 0  # W1 bars open on Sunday
+    first = -(-(int(start) - offset) // seconds) * seconds + offset
+    return np.arange(first, int(end) + 1, seconds, dtype=np.int64)
+
+
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    with _lock:
+        if _state['connect_failures'] > 0:
+            _state['connect_failures'] -= 1
+            _state['connected'] = False
+            _fail(-10003, 'IPC initialize failed, MetaTrader 5 x64 not found')
+            return False
+    _state['connected'] = True
+    _state['error'] = (RES_S_OK, 'Success')
+    return True
+
+
+def shutdown():
+    _state['connected'] = False
+    return True
+
+
+def last_error():
+    return _state['error']
+
+
+def version():
+    return (500, 4000, '01 Jan 2024')
+
+
+def terminal_info():
+    if not _state['connected']:
+        return None
+    return TerminalInfo(True, 4000, 'Fake MetaTrader 5', 'C:\\Program Files\\Fake MetaTrader 5')
+
+
+def account_info():
+    if not _state['connected']:
+        return None
+    return AccountInfo(1000001, _config['server'], 'USD')
+
+
+def _symbol_info(name):
+    level, digits, spread, _, path = _symbols[name]
+    return SymbolInfo(name, True, digits, 10.0 ** -digits, f"{path}\\{name}", f"{name} (synthetic)", spread)
+
+
+def symbols_get(group=None):
+    if not _state['connected']:
+        return _fail(-10004, 'No IPC connection')
+    return tuple(_symbol_info(name) for name in _symbols)
+
+
+def symbols_total():
+    return len(_symbols)
+
+
+def symbol_info(symbol):
+    return _symbol_info(symbol) if symbol in _symbols else None
+
+
+def symbol_select(symbol, enable=True):
+    return symbol in _symbols
+
+
+def _bar_ends(timeframe, starts):
+    """Open times of the bars following `starts`"""
+    if timeframe == TIMEFRAME_MN1:
+        return (starts.astype('datetime64[s]').astype('datetime64[M]') + 1).astype('datetime64[s]').astype(np.int64)
+    return starts + TIMEFRAME_SECONDS[timeframe]
+
+
+def _minute_bars(symbol, start, end):
+    """The M1 bars of `symbol` opened in [start, end]; every other timeframe is aggregated from them"""
+    starts = _bar_starts(TIMEFRAME_M1, start, end)
+    starts = starts[_trading(symbol, starts)]
+    level, digits, spread, _, _ = _symbols[symbol]
+    salt = _symbol_salt(symbol)
+    rates = np.zeros(len(starts), dtype=RATES_DTYPE)
+    rates['time'] = starts
+    opens = _price(symbol, starts.astype(np.float64))
+    closes = _price(symbol, (starts + 59).astype(np.float64))
+    wick = np.abs(opens - closes) + level * 2e-5 * _config['volatility']
+    rates['open'] = np.round(opens, digits)
+    rates['close'] = np.round(closes, digits)
+    rates['high'] = np.round(np.maximum(opens, closes) + wick * (0.3 + 0.3 * _uniform(starts, salt + 7)), digits)
+    rates['low'] = np.round(np.minimum(opens, closes) - wick * (0.3 + 0.3 * _uniform(starts, salt + 8)), digits)
+    rates['tick_volume'] = (30 * (1.2 + _uniform(starts, salt + 9))).astype(np.uint64) + 1
+    rates['spread'] = spread + (spread * 0.3 * _uniform(starts, salt + 10)).astype(np.int32)
+    return rates
+
+
+def _aggregate(timeframe, symbol, starts):
+    """Bars of `timeframe` opened at `starts`, built from the M1 bars inside each; bars without any are left out"""
+    if not len(starts):
+        return np.zeros(0, dtype=RATES_DTYPE)
+    minutes = _minute_bars(symbol, int(starts[0]), int(_bar_ends(timeframe, starts[-1:])[0]) - 1)
+    if not len(minutes):
+        return np.zeros(0, dtype=RATES_DTYPE)
+    bucket = np.searchsorted(starts, minutes['time'], side='right') - 1
+    first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[first[1:], len(minutes)] - 1
+    rates = np.zeros(len(first), dtype=RATES_DTYPE)
+    rates['time'] = starts[bucket[first]]
+    rates['open'] = minutes['open'][first]
+    rates['close'] = minutes['close'][last]
+    rates['high'] = np.maximum.reduceat(minutes['high'], first)
+    rates['low'] = np.minimum.reduceat(minutes['low'], first)
+    rates['tick_volume'] = np.add.reduceat(minutes['tick_volume'], first)
+    rates['spread'] = np.minimum.reduceat(minutes['spread'], first)
+    return rates
+
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    """Bars of `symbol` opened in [date_from, date_to]"""
+    if not _state['connected']:
+        return _fail(-10004, 'No IPC connection')
+    if symbol not in _symbols:
+        return _fail(-4301, 'Unknown symbol')
+    if timeframe not in TIMEFRAME_SECONDS and timeframe != TIMEFRAME_MN1:
+        return _fail(-2, 'Invalid params')
+    if timeframe == TIMEFRAME_M1:
+        rates = _minute_bars(symbol, _epoch(date_from), _epoch(date_to))
+    else:
+        starts = _bar_starts(timeframe, _epoch(date_from), _epoch(date_to))
+        # A batch of bars at a time, so the minutes behind them stay within a few hundred thousand
+        batch = max(1, MINUTES_PER_BATCH * 60 // TIMEFRAME_SECONDS.get(timeframe, 31 * 86400))
+        parts = [_aggregate(timeframe, symbol, starts[i:i + batch]) for i in range(0, len(starts), batch)]
+        rates = np.concatenate(parts) if parts else np.zeros(0, dtype=RATES_DTYPE)
+    if not _serve(len(rates)):
+        return _fail(RES_E_INTERNAL_FAIL, 'Terminal: Call failed')
+    return rates
+
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    """Ticks of `symbol` with time_msc in [date_from, date_to]"""
+    if not _state['connected']:
+        return _fail(-10004, 'No IPC connection')
+    if symbol not in _symbols:
+        return _fail(-4301, 'Unknown symbol')
+    interval = max(1, int(_config['tick_interval_ms']))
+    start = int(_epoch(date_from) * 1000)
+    end = int(_epoch(date_to) * 1000)
+    slots = np.arange(start // interval * interval, end + 1, interval, dtype=np.int64)
+    salt = _symbol_salt(symbol)
+    # Jitter each tick within its slot and drop some, so the spacing is irregular
+    msc = slots + ((_uniform(slots, salt + 11) + 1) * 0.5 * interval).astype(np.int64) % interval
+    keep = (_uniform(slots, salt + 12) > -0.6) & (msc >= start) & (msc <= end)
+    msc = msc[keep & _trading(symbol, slots // 1000)]
+    if not _serve(len(msc)):
+        return _fail(RES_E_INTERNAL_FAIL, 'Terminal: Call failed')
+    level, digits, spread, _, _ = _symbols[symbol]
+    point = 10.0 ** -digits
+    ticks = np.zeros(len(msc), dtype=TICKS_DTYPE)
+    ticks['time'] = msc // 1000
+    ticks['time_msc'] = msc
+    bid = np.round(_price(symbol, msc / 1000.0) - spread * point / 2, digits)
+    ticks['bid'] = bid
+    ticks['ask'] = np.round(bid + spread * point, digits)
+    ticks['flags'] = 6  # Bid and ask changed
+    return ticks
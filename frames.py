@@ -0,0 +1,144 @@
+"""DataFrames over MT5 record arrays without copying them.
+
+``copy_rates_range`` and ``copy_ticks_range`` return numpy record arrays.
+Instead of ``pd.DataFrame(rates)`` (a copy of every field) followed by a
+rename, a date conversion and column subsets (more copies), the frames here
+hold each requested column as a strided view into the record array. The
+date column reinterprets the int64 epoch values as ``datetime64[s]`` (or
+``[ms]`` for ticks) tagged UTC, which costs one 8-byte-per-row array and no
+arithmetic; fields that were not asked for are never touched.
+``conversion_benchmark.py`` compares time and peak memory with the copying
+conversion.
+
+``TimeOutput`` describes how exported timestamps are written (datetimes
+in a chosen zone, or int64 epoch seconds/milliseconds); the conversion is
+done once per chunk on the whole column. Epoch CSVs write about twice as
+fast as datetime ones and are smaller.
+"""
+import numpy as np
+import pandas as pd
+
+RATE_COLUMN_NAMES = {
+    'time': 'Date', 'open': 'Open', 'high': 'High',
+    'low': 'Low', 'close': 'Close', 'tick_volume': 'Volume',
+    'spread': 'Spread', 'real_volume': 'RealVolume'
+}
+RATE_FIELDS = {name: field for field, name in RATE_COLUMN_NAMES.items()}
+
+
+def utc_dates(epochs, unit='s'):
+    """UTC datetimes over an int64 epoch array in `unit`, without unit conversion"""
+    return pd.DatetimeIndex(np.asarray(epochs).view(f'datetime64[{unit}]'), tz='UTC')
+
+
+TIME_FORMATS = ['datetime', 'epoch_s', 'epoch_ms']
+SERVER_TIME = 'server'
+
+
+def check_timezone(name):
+    """Raise ValueError unless `name` is a time zone pandas knows"""
+    try:
+        pd.Timestamp(0, tz=name)
+    except Exception:
+        raise ValueError(f"Unknown time zone: {name}")
+    return name
+
+
+def zone_name(name):
+    """`name` with 'UTC' and 'server' in their canonical spelling ('UTC' when empty)"""
+    name = (name or 'UTC').strip()
+    return name.upper() if name.upper() == 'UTC' else name.lower() if name.lower() == SERVER_TIME else name
+
+
+class TimeOutput:
+    """How the Date column of an export is written.
+
+    MT5 stamps bars with the trade server's clock; everywhere else those
+    values are treated as UTC. `server_timezone` names the zone of that
+    clock ('UTC', the default, takes the values as they are). `time_format`
+    is 'datetime', or 'epoch_s' / 'epoch_ms' for int64 UTC epoch numbers.
+    Datetimes are written in `timezone`: 'UTC', a named zone such as
+    'Europe/London', or 'server' for the server clock without a zone.
+    """
+
+    def __init__(self, time_format='datetime', timezone='UTC', server_timezone='UTC'):
+        if time_format not in TIME_FORMATS:
+            raise ValueError(f"Invalid time format: {time_format}")
+        self.time_format = time_format
+        self.timezone = zone_name(timezone)
+        if self.timezone != SERVER_TIME:
+            check_timezone(self.timezone)
+        self.server_timezone = check_timezone(zone_name(server_timezone))
+
+    @property
+    def is_default(self):
+        """True when dates are written as they always were (server clock labelled UTC)"""
+        return self.time_format == 'datetime' and self.timezone == 'UTC' and self.server_timezone == 'UTC'
+
+    @property
+    def epoch_unit(self):
+        """'s' or 'ms' for the epoch formats, None for datetimes"""
+        return self.time_format.split('_')[1] if self.time_format != 'datetime' else None
+
+    def utc_epochs(self, epochs, unit='s'):
+        """Epoch values on the server clock shifted to real UTC"""
+        if self.server_timezone == 'UTC':
+            return epochs
+        # A repeated hour when the server clock falls back is taken as the summer-time one
+        local = pd.DatetimeIndex(epochs.view(f'datetime64[{unit}]')).tz_localize(
+            self.server_timezone, ambiguous=np.ones(len(epochs), dtype=bool), nonexistent='shift_forward')
+        return local.as_unit(unit).asi8
+
+    def convert(self, epochs, unit='s', naive=False):
+        """The Date column for an int64 epoch array in `unit`; `naive` drops the zone (for Excel)"""
+        epochs = np.asarray(epochs)
+        target = self.epoch_unit
+        if target is not None:
+            utc = self.utc_epochs(epochs, unit)
+            if target == unit:
+                return utc
+            return utc * 1000 if target == 'ms' else utc // 1000
+        if self.timezone == SERVER_TIME:
+            return pd.DatetimeIndex(epochs.view(f'datetime64[{unit}]'))
+        dates = utc_dates(self.utc_epochs(epochs, unit), unit)
+        if self.timezone != 'UTC':
+            dates = dates.tz_convert(self.timezone)
+        return dates.tz_localize(None) if naive else dates
+
+    def arrow_type(self, unit='s'):
+        """``exporters.ARROW_COLUMN_TYPES`` entry of the Date column"""
+        if self.epoch_unit is not None:
+            return 'int64'
+        return ('timestamp', unit, None if self.timezone == SERVER_TIME else self.timezone)
+
+
+def record_columns(records, names, fields, date_field, date_unit='s', time_output=None):
+    """Map display names to column arrays: views into `records`, dates via ``utc_dates``.
+
+    `fields` maps display names to record field names; names whose field is
+    not in the array are skipped. A `time_output` converts the dates instead.
+    """
+    columns = {}
+    for name in names:
+        field = fields.get(name)
+        if field is None or field not in records.dtype.names:
+            continue
+        if field != date_field:
+            columns[name] = records[field]
+        elif time_output is not None:
+            columns[name] = time_output.convert(records[field], date_unit)
+        else:
+            columns[name] = utc_dates(records[field], date_unit)
+    return columns
+
+
+def rate_columns(rates, names, time_output=None):
+    """Display-name -> column array for the requested columns of an MT5 rates array"""
+    return record_columns(rates, names, RATE_FIELDS, 'time', time_output=time_output)
+
+
+def rates_to_frame(rates, columns=None):
+    """DataFrame of the given display columns (all by default) over an MT5 rates array"""
+    if columns is None:
+        columns = [RATE_COLUMN_NAMES[field] for field in rates.dtype.names if field in RATE_COLUMN_NAMES]
+    return pd.DataFrame(rate_columns(rates, columns), copy=False)
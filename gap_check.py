@@ -0,0 +1,383 @@
+"""Find holes in bar series and fetch only the missing bars from MT5.
+
+``find_gaps`` checks the bar times of one series in a few vectorized numpy
+passes: bars out of time order, duplicated bars, bars not aligned to the
+timeframe, and missing bars. A bar only counts as missing when the market
+is normally open at that time: the weekly session of the series is learned
+from the series itself (slots of the week that hold a bar in at least
+`open_share` of the weeks), so weekends, daily breaks and 24/7 symbols need
+no configuration. Series shorter than `min_weeks` assume Monday to Friday.
+
+``fetch_missing`` then asks MT5 for the missing intervals only, and
+``repair_rates`` merges what came back into the series. From the command
+line this works on the bar cache and on exported files:
+
+    python gap_check.py --cache bar_cache                       # check every cached series
+    python gap_check.py --cache bar_cache --symbols EURUSD --repair
+    python gap_check.py data/EURUSD_M1.csv data/symbol=XAUUSD/timeframe=H1
+
+Results are printed as JSON lines like ``mt5_batch``. Checking files or
+the cache needs no MetaTrader5 package; only ``--repair`` connects to a
+terminal. Holidays and quiet minutes without ticks (MT5 has no bar for
+them) show up as gaps that a repair cannot fill; they are reported as
+still missing.
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+
+from resample import TIMEFRAME_SECONDS, WEEK_OFFSET, bucket_starts
+from bar_cache import BarCache, from_epoch, merge_rates
+from mt5_constants import TIMEFRAMES, TICKS
+
+WEEK_SECONDS = TIMEFRAME_SECONDS['W1']
+OPEN_SHARE = 0.9
+MIN_WEEKS = 4
+JOIN_BARS = 500
+
+
+def session_profile(times, timeframe, open_share=OPEN_SHARE, min_weeks=MIN_WEEKS):
+    """Boolean array over the `timeframe` slots of a week (from Sunday 00:00): True where the market is open"""
+    step = TIMEFRAME_SECONDS[timeframe]
+    slot_count = WEEK_SECONDS // step
+    slot_offsets = np.arange(slot_count, dtype=np.int64) * step
+    if len(times) == 0 or times[-1] - times[0] < min_weeks * WEEK_SECONDS:
+        weekday = slot_offsets // 86400  # 0 = Sunday
+        return (weekday >= 1) & (weekday <= 5)
+    first, last = int(times[0]), int(times[-1])
+    present = np.bincount(((times - WEEK_OFFSET) % WEEK_SECONDS) // step, minlength=slot_count)
+    # How many times each slot occurs between the first and the last bar
+    base = WEEK_OFFSET + slot_offsets
+    occurrences = (np.floor_divide(last - base, WEEK_SECONDS)
+                   - np.floor_divide(first - base + WEEK_SECONDS - 1, WEEK_SECONDS) + 1)
+    return (occurrences > 0) & (present >= open_share * occurrences)
+
+
+def expected_bars(first, last, timeframe):
+    """Every W1 or MN1 bar open time from `first` to `last`"""
+    if timeframe == 'MN1':
+        months = np.arange(np.datetime64(int(first), 's').astype('datetime64[M]'),
+                           np.datetime64(int(last), 's').astype('datetime64[M]') + 1)
+        return months.astype('datetime64[s]').astype(np.int64)
+    return np.arange(first, last + 1, WEEK_SECONDS, dtype=np.int64)
+
+
+def runs(times, step):
+    """(start, end, bars) of each run of consecutive bars in sorted `times`"""
+    if len(times) == 0:
+        return []
+    if step is None:
+        breaks = np.flatnonzero(np.diff(times) > 31 * 86400) + 1  # MN1: one month apart
+    else:
+        breaks = np.flatnonzero(np.diff(times) != step) + 1
+    starts = np.concatenate([[0], breaks])
+    ends = np.concatenate([breaks, [len(times)]])
+    return [(int(times[lo]), int(times[hi - 1]), int(hi - lo)) for lo, hi in zip(starts, ends)]
+
+
+class GapReport:
+    """What ``find_gaps`` found in one series; times are epoch seconds (server time)"""
+
+    def __init__(self, timeframe, bars, first, last, missing, duplicates, out_of_order, misaligned):
+        self.timeframe = timeframe
+        self.bars = bars
+        self.first = first
+        self.last = last
+        self.missing = missing  # Open times of the missing bars
+        self.duplicates = duplicates  # Bar times that occur more than once
+        self.out_of_order = out_of_order  # Number of bars older than the bar before them
+        self.misaligned = misaligned  # Bar times that are not a `timeframe` bar open time
+        self.intervals = runs(missing, TIMEFRAME_SECONDS.get(timeframe))
+
+    @property
+    def is_complete(self):
+        return not (len(self.missing) or len(self.duplicates) or self.out_of_order or len(self.misaligned))
+
+    def summary(self, max_intervals=20):
+        """JSON-friendly description, listing up to `max_intervals` of the largest holes"""
+        largest = sorted(self.intervals, key=lambda interval: interval[2], reverse=True)[:max_intervals]
+        return {
+            'timeframe': self.timeframe,
+            'bars': self.bars,
+            'first': str(from_epoch(self.first)) if self.bars else None,
+            'last': str(from_epoch(self.last)) if self.bars else None,
+            'complete': self.is_complete,
+            'missing_bars': int(len(self.missing)),
+            'gaps': len(self.intervals),
+            'duplicates': int(len(self.duplicates)),
+            'out_of_order': int(self.out_of_order),
+            'misaligned': int(len(self.misaligned)),
+            'largest_gaps': [[str(from_epoch(start)), str(from_epoch(end)), bars] for start, end, bars in largest],
+        }
+
+    def describe(self):
+        """One line for the log"""
+        if self.is_complete:
+            return f"{self.bars} bars, complete"
+        parts = [f"{len(self.missing)} missing bars in {len(self.intervals)} gaps"]
+        if len(self.duplicates):
+            parts.append(f"{len(self.duplicates)} duplicated")
+        if self.out_of_order:
+            parts.append(f"{self.out_of_order} out of order")
+        if len(self.misaligned):
+            parts.append(f"{len(self.misaligned)} misaligned")
+        return f"{self.bars} bars, " + ", ".join(parts)
+
+
+def find_gaps(times, timeframe, open_share=OPEN_SHARE, min_weeks=MIN_WEEKS, profile=None):
+    """Check the bar open times of one series (epoch seconds, in stored order).
+
+    `profile` overrides the learned weekly session (see ``session_profile``).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    out_of_order = int((np.diff(times) < 0).sum())
+    ordered = np.sort(times, kind='stable') if out_of_order else times
+    repeated = ordered[1:] == ordered[:-1]
+    duplicates = np.unique(ordered[1:][repeated]) if repeated.any() else ordered[:0]
+    unique = ordered[np.concatenate([[True], ~repeated])] if len(ordered) else ordered
+    aligned = bucket_starts(unique, timeframe) if len(unique) else unique
+    misaligned = unique[aligned != unique]
+    if len(misaligned):
+        aligned = np.unique(aligned)
+    if len(aligned) == 0:
+        return GapReport(timeframe, 0, None, None, aligned, duplicates, out_of_order, misaligned)
+    first, last = int(aligned[0]), int(aligned[-1])
+
+    if timeframe in ('W1', 'MN1'):
+        missing = np.setdiff1d(expected_bars(first, last, timeframe), aligned, assume_unique=True)
+    else:
+        step = TIMEFRAME_SECONDS[timeframe]
+        diffs = np.diff(aligned)
+        holes = np.flatnonzero(diffs > step)
+        counts = diffs[holes] // step - 1
+        # Open times of every bar between the bars around each hole
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        missing = np.repeat(aligned[holes] + step, counts) + offsets * step
+        if profile is None:
+            profile = session_profile(aligned, timeframe, open_share, min_weeks)
+        missing = missing[profile[((missing - WEEK_OFFSET) % WEEK_SECONDS) // step]]
+    return GapReport(timeframe, int(len(times)), first, last, missing, duplicates, out_of_order, misaligned)
+
+
+def fetch_missing(mt5_module, symbol, tf_value, report, join_bars=JOIN_BARS, log=None):
+    """Request only the missing intervals of `report` from MT5; returns (bars found, calls made).
+
+    Intervals less than `join_bars` bars apart are fetched with one call.
+    """
+    step = TIMEFRAME_SECONDS.get(report.timeframe, 31 * 86400)
+    requests = []
+    for start, end, _ in report.intervals:
+        if requests and start - requests[-1][1] <= join_bars * step:
+            requests[-1][1] = end
+        else:
+            requests.append([start, end])
+    parts = []
+    for start, end in requests:
+        if log:
+            log(f"Fetching {symbol} {report.timeframe} {from_epoch(start)} - {from_epoch(end)}")
+        rates = mt5_module.copy_rates_range(symbol, tf_value, from_epoch(start), from_epoch(end))
+        if rates is not None and len(rates):
+            parts.append(rates)
+    if not parts:
+        return None, len(requests)
+    found = np.concatenate(parts)
+    return found[np.isin(found['time'], report.missing)], len(requests)
+
+
+def repair_rates(mt5_module, symbol, tf_value, rates, report=None, join_bars=JOIN_BARS, log=None):
+    """Return (repaired rates, report before, report after, calls) for an MT5 rates array.
+
+    Duplicated and out-of-order bars are fixed locally; only missing bars are fetched.
+    """
+    report = report or find_gaps(rates['time'], report_timeframe(tf_value, mt5_module))
+    found, calls = fetch_missing(mt5_module, symbol, tf_value, report, join_bars, log) if len(report.missing) \
+        else (None, 0)
+    repaired = merge_rates(rates[:0], rates) if found is None else merge_rates(rates, found)
+    return repaired, report, find_gaps(repaired['time'], report.timeframe), calls
+
+
+def report_timeframe(tf_value, mt5_module):
+    """Timeframe name of an MT5 TIMEFRAME_* constant"""
+    return next(tf for tf in TIMEFRAMES if getattr(mt5_module, f"TIMEFRAME_{tf}") == tf_value)
+
+
+def timeframe_from_name(path):
+    """Timeframe named in an export path (``EURUSD_H1_...csv``, ``timeframe=H1``), or None"""
+    match = re.search(r'(?:^|[_=/\\])(M1|M5|M15|M30|H1|H4|D1|W1|MN1)(?:$|[_./\\])', path)
+    return match.group(1) if match else None
+
+
+def timeframe_from_times(times):
+    """The timeframe whose bar length is the most common spacing of `times`"""
+    diffs = np.diff(np.unique(times))
+    if len(diffs) == 0:
+        return None
+    values, counts = np.unique(diffs, return_counts=True)
+    spacing = values[counts.argmax()]
+    if spacing >= 28 * 86400:
+        return 'MN1'
+    return min(TIMEFRAME_SECONDS, key=lambda tf: abs(TIMEFRAME_SECONDS[tf] - spacing))
+
+
+def read_export_times(path):
+    """Bar times (epoch seconds, file order) of an exported CSV file or Parquet/Feather dataset folder"""
+    import pandas as pd
+    if os.path.isdir(path) or path.endswith(('.parquet', '.arrow', '.feather')):
+        import pyarrow.dataset as ds
+        files = [path] if os.path.isfile(path) else [name for _, _, names in os.walk(path) for name in names]
+        file_format = 'parquet' if any(name.endswith('.parquet') for name in files) else 'feather'
+        dataset = ds.dataset(path, format=file_format, partitioning='hive')
+        dates = dataset.to_table(columns=['Date']).column('Date').to_pandas()
+    else:
+        dates = pd.read_csv(path, usecols=['Date'])['Date']
+    if dates.dtype.kind in 'iu':
+        # Epoch exports (``--time-format``): milliseconds are told apart by their size
+        epochs = dates.to_numpy().astype(np.int64)
+        return epochs // 1000 if len(epochs) and np.abs(epochs).max() > 10 ** 11 else epochs
+    dates = pd.to_datetime(dates, utc=True).dt.tz_localize(None)
+    return dates.to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def export_series(paths):
+    """Expand dataset roots into their ``symbol=.../timeframe=...`` bar series folders"""
+    expanded = []
+    for path in paths:
+        series = sorted(folder for folder, _, _ in os.walk(path)
+                        if os.path.basename(folder).startswith('timeframe=')
+                        and os.path.basename(folder) != f'timeframe={TICKS}') if os.path.isdir(path) else []
+        expanded.extend(series or [path])
+    return expanded
+
+
+def cached_series(cache_dir):
+    """(server, symbol, timeframe) of every series in a bar cache"""
+    found = []
+    for folder, _, names in os.walk(cache_dir):
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(folder, name), 'r') as f:
+                    meta = json.load(f)
+                found.append((meta['server'], meta['symbol'], meta['timeframe']))
+            except Exception as e:
+                logging.warning(f"Skipping unreadable cache entry {name}: {e}")
+    return sorted(found)
+
+
+def check_cache(args, emit):
+    """Check (and with --repair, fill) the series of a bar cache; returns the number still incomplete"""
+    cache = BarCache(args.cache)
+    symbols = {s.lower() for s in split_list(args.symbols)}
+    timeframes = {tf.upper() for tf in split_list(args.timeframes)}
+    series = [(server, symbol, timeframe) for server, symbol, timeframe in cached_series(args.cache)
+              if (not symbols or symbol.lower() in symbols) and (not timeframes or timeframe in timeframes)
+              and (not args.server or server == args.server)]
+    session = mt5_module = server_name = None
+    incomplete = 0
+    try:
+        for server, symbol, timeframe in series:
+            rates, ranges = cache.load(server, symbol, timeframe)
+            if rates is None:
+                continue
+            report = find_gaps(rates['time'], timeframe, args.open_share)
+            emit('gaps', server=server, symbol=symbol, **report.summary())
+            if not args.repair or report.is_complete:
+                incomplete += not report.is_complete
+                continue
+            if session is None:
+                from mt5_session import MT5Session
+                from symbol_catalog import current_server
+                session = MT5Session(args.terminal)
+                mt5_module = session.connect()
+                server_name = current_server(mt5_module)
+            if server != server_name:
+                emit('skipped', server=server, symbol=symbol, timeframe=timeframe,
+                     reason=f"the terminal is connected to {server_name}")
+                incomplete += 1
+                continue
+            tf_value = getattr(mt5_module, f"TIMEFRAME_{timeframe}")
+            repaired, _, after, calls = repair_rates(mt5_module, symbol, tf_value, rates, report)
+            cache.save(server, symbol, timeframe, repaired, ranges)
+            emit('repaired', server=server, symbol=symbol, timeframe=timeframe, calls=calls,
+                 recovered=int(len(repaired) - len(np.unique(rates['time']))), still_missing=int(len(after.missing)),
+                 complete=after.is_complete)
+            incomplete += not after.is_complete
+    finally:
+        if session is not None:
+            session.close()
+    return incomplete
+
+
+def check_files(args, emit):
+    """Check exported files or dataset folders; returns the number that are incomplete"""
+    incomplete = 0
+    for path in export_series(args.paths):
+        try:
+            times = read_export_times(path)
+            timeframe = args.timeframe or timeframe_from_name(path) or timeframe_from_times(times)
+            if timeframe is None:
+                raise ValueError("cannot tell the timeframe, give --timeframe")
+            report = find_gaps(times, timeframe, args.open_share)
+            emit('gaps', path=path, **report.summary())
+            incomplete += not report.is_complete
+        except Exception as e:
+            emit('error', path=path, message=str(e))
+            incomplete += 1
+    return incomplete
+
+
+def emit(event, **fields):
+    """Print one machine-readable record, in the format of ``mt5_batch``"""
+    record = {'event': event, 'ts': round(time.time(), 3), **fields}
+    print(json.dumps(record, default=str), flush=True)
+
+
+def split_list(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find missing, duplicated and out-of-order bars")
+    parser.add_argument('paths', nargs='*', help="Exported CSV files or Parquet/Feather dataset folders")
+    parser.add_argument('--cache', help="Check the series of this bar cache folder instead")
+    parser.add_argument('--server', help="Only cache series of this trade server")
+    parser.add_argument('--symbols', help="Only these cached symbols (comma-separated)")
+    parser.add_argument('--timeframes', help="Only these cached timeframes (comma-separated)")
+    parser.add_argument('--timeframe', choices=TIMEFRAMES, help="Timeframe of the files (default: from the name)")
+    parser.add_argument('--open-share', dest='open_share', type=float, default=OPEN_SHARE,
+                        help="Share of weeks a slot must hold a bar in to count as in session (default 0.9)")
+    parser.add_argument('--repair', action='store_true', help="Fetch the missing bars of cached series from MT5")
+    parser.add_argument('--terminal', help="terminal64.exe path used by --repair")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(
+        filename='mt5_downloader.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    args = parse_args(argv)
+    if not args.cache and not args.paths:
+        emit('error', message="Give exported files or --cache")
+        return 2
+    if args.repair and not args.cache:
+        emit('error', message="--repair works on the bar cache (--cache)")
+        return 2
+    try:
+        incomplete = check_cache(args, emit) if args.cache else check_files(args, emit)
+    except Exception as e:
+        emit('error', message=str(e))
+        return 2
+    return 1 if incomplete else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
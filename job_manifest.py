@@ -0,0 +1,144 @@
+"""Checkpoint manifest that makes download jobs resumable.
+
+A job with an output path keeps ``.mt5_job_<key>.json`` next to its output,
+where `key` is a hash of everything that shapes the result (symbols,
+timeframes, range, format, columns...). Every symbol/timeframe series that
+was fully written is recorded with its output files, and one that turned
+out empty or unknown with none; running the same job again skips those
+series and only downloads the rest. Outputs are written under a temporary
+name and renamed when complete, so a crash never leaves a truncated file
+behind a finished-looking name. Windows fetched before the interruption
+come back from the bar cache rather than MT5.
+
+Series that only exist inside the shared multi-sheet workbook, which is
+written at the very end, are staged chunk by chunk as ``.npz`` files (see
+``chart_store.save_frame``) in ``.mt5_job_<key>/`` and replayed into the
+workbook on resume. The manifest and staging folder are deleted once the
+job completes.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from chart_store import save_frame, load_frame
+
+MANIFEST_PREFIX = '.mt5_job_'
+
+
+def job_key(**params):
+    """Short stable hash of the parameters that define a job's output"""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def unit_key(symbol, timeframe):
+    return f"{symbol}|{timeframe}"
+
+
+class JobManifest:
+    """Finished series of one job, persisted in `folder`"""
+
+    def __init__(self, folder, key):
+        self.folder = folder or "."
+        self.key = key
+        self.path = os.path.join(self.folder, f"{MANIFEST_PREFIX}{key}.json")
+        self.stage_dir = os.path.join(self.folder, f"{MANIFEST_PREFIX}{key}")
+        self.lock = threading.Lock()
+        self.units = {}  # unit key -> {'outputs': [...], 'rows': n, 'finished': epoch}
+        self.load()
+
+    def load(self):
+        """Read the manifest; a missing or unreadable file means nothing is done yet"""
+        with self.lock:
+            self.units = {}
+            if not os.path.exists(self.path):
+                return
+            try:
+                with open(self.path, 'r') as f:
+                    self.units = json.load(f).get('units', {})
+            except Exception as e:
+                logging.warning(f"Discarding unreadable job manifest {self.path}: {e}")
+
+    def save(self):
+        """Atomically write the manifest to disk"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'job': self.key, 'units': self.units}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Error saving job manifest: {e}")
+
+    def is_done(self, symbol, timeframe):
+        """True when the series was finished and all of its outputs still exist"""
+        entry = self.units.get(unit_key(symbol, timeframe))
+        return entry is not None and all(os.path.exists(path) for path in entry['outputs'])
+
+    def outputs(self, symbol, timeframe):
+        entry = self.units.get(unit_key(symbol, timeframe))
+        return entry['outputs'] if entry else []
+
+    def mark_done(self, symbol, timeframe, outputs, rows):
+        with self.lock:
+            self.units[unit_key(symbol, timeframe)] = {
+                'outputs': [path for path in outputs if path], 'rows': rows, 'finished': time.time()
+            }
+            self.save()
+
+    def mark_empty(self, symbol, timeframe):
+        """Record a series that has nothing to save (no bars, unknown symbol), so it counts as done"""
+        self.mark_done(symbol, timeframe, [], 0)
+
+    def __len__(self):
+        return len(self.units)
+
+    def stage_path(self, symbol, timeframe):
+        safe = "".join(c if c.isalnum() or c in '-_.' else '_' for c in f"{symbol}_{timeframe}")
+        return os.path.join(self.stage_dir, safe)
+
+    def open_stage(self, symbol, timeframe):
+        """A ``StagedSeries`` keeping the export rows of a series that is only written at the end of the job"""
+        return StagedSeries(self.stage_path(symbol, timeframe))
+
+    def staged(self, symbol, timeframe):
+        """The staged export rows of a finished series, chunk by chunk"""
+        path = self.stage_path(symbol, timeframe)
+        for name in sorted(os.listdir(path)):
+            yield load_frame(os.path.join(path, name))
+
+    def remove(self):
+        """Forget the job: delete the manifest and any staged series"""
+        with self.lock:
+            self.units = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            shutil.rmtree(self.stage_dir, ignore_errors=True)
+
+
+class StagedSeries:
+    """Export rows of one series, staged one ``.npz`` per chunk in a ``.part`` folder renamed when complete"""
+
+    def __init__(self, path):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.chunks = 0
+
+    def write(self, df):
+        if self.chunks == 0:
+            shutil.rmtree(self.part_path, ignore_errors=True)
+            os.makedirs(self.part_path)
+        save_frame(os.path.join(self.part_path, f"{self.chunks:06d}.npz"), df)
+        self.chunks += 1
+
+    def close(self):
+        """Give the staged chunks their final name; returns the path"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self):
+        shutil.rmtree(self.part_path, ignore_errors=True)
@@ -0,0 +1,269 @@
+"""Structured timing spans for download, export and chart stages.
+
+Each span is one stage of one series (``fetch``, ``convert``, ``derive``,
+the export format such as ``csv`` or ``xlsx``, ``ticks``, ``chart``) with
+its rows, bytes, duration and the change in process RSS. Work that arrives
+in chunks is timed piece by piece and recorded as one span per series:
+
+    span = metrics.open_span('convert', 'EURUSD', 'M1')
+    with span.measure():
+        ...
+    span.add(rows=len(df))
+    span.close()
+
+Spans are appended to a JSON-lines file (``mt5_metrics.jsonl`` by default,
+rotated to ``.1`` when it grows past `max_bytes`), one object per line
+tagged with the run id, and kept in memory for the current run so the
+per-stage totals and the slowest series can be shown in the app (Help >
+Performance).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+METRICS_FILE = 'mt5_metrics.jsonl'
+MAX_METRICS_BYTES = 5 * 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, None when it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def path_bytes(path):
+    """Size of a file, or of every file under a folder; 0 when it does not exist"""
+    if not path or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(folder, name))
+               for folder, _, names in os.walk(path) for name in names)
+
+
+class Span:
+    """One stage of one series, timed in one or more pieces"""
+
+    def __init__(self, recorder, stage, symbol=None, timeframe=None):
+        self.recorder = recorder
+        self.stage = stage
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.rss_start = current_rss()
+        self.closed = False
+
+    @contextmanager
+    def measure(self):
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def add(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.bytes += nbytes
+
+    def close(self, error=None):
+        """Record the span (once)"""
+        if self.closed:
+            return
+        self.closed = True
+        rss_end = current_rss()
+        rss_delta = rss_end - self.rss_start if rss_end is not None and self.rss_start is not None else None
+        self.recorder.record({
+            'stage': self.stage, 'symbol': self.symbol, 'timeframe': self.timeframe, 'rows': self.rows,
+            'bytes': self.bytes, 'seconds': round(self.seconds, 6),
+            'rss_delta_mb': round(rss_delta / 2 ** 20, 2) if rss_delta is not None else None,
+            'error': str(error) if error is not None else None,
+        })
+
+
+class MetricsRecorder:
+    """Collects the spans of the current run and appends them to `path` (None: memory only)"""
+
+    def __init__(self, path=METRICS_FILE, max_bytes=MAX_METRICS_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.run_id = None
+        self.runs = 0
+        self.spans = []
+        self._write_failed = False
+
+    def start_run(self, label=None):
+        """Begin a new run: later spans are tagged with its id and the in-memory spans reset"""
+        with self.lock:
+            self.runs += 1
+            self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.runs}"
+            self.spans = []
+            self._rotate()
+        if label:
+            self.record({'stage': 'run', 'label': label})
+        return self.run_id
+
+    def _rotate(self):
+        if self.path and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            try:
+                os.replace(self.path, self.path + '.1')
+            except OSError as e:
+                logging.warning(f"Could not rotate metrics file {self.path}: {e}")
+
+    def open_span(self, stage, symbol=None, timeframe=None):
+        return Span(self, stage, symbol, timeframe)
+
+    @contextmanager
+    def span(self, stage, symbol=None, timeframe=None):
+        """Time a block as one span; an exception is recorded with it and re-raised"""
+        span = self.open_span(stage, symbol, timeframe)
+        try:
+            with span.measure():
+                yield span
+        except Exception as e:
+            span.close(error=e)
+            raise
+        span.close()
+
+    def record(self, entry):
+        entry = {'ts': round(time.time(), 3), 'run': self.run_id, **entry}
+        with self.lock:
+            if entry['stage'] != 'run':
+                self.spans.append(entry)
+            if not self.path:
+                return
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + "\n")
+            except Exception as e:
+                if not self._write_failed:
+                    logging.error(f"Error writing metrics to {self.path}: {e}")
+                self._write_failed = True
+
+    def last_run(self):
+        """Spans of the current run or, before any run in this process, of the last run in the file"""
+        with self.lock:
+            if self.run_id is not None or not self.path or not os.path.exists(self.path):
+                return list(self.spans)
+        spans = []
+        last_id = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut off by a crash
+                    if entry.get('run') != last_id:
+                        last_id = entry.get('run')
+                        spans = []
+                    if entry.get('stage') != 'run':
+                        spans.append(entry)
+        except Exception as e:
+            logging.error(f"Error reading metrics from {self.path}: {e}")
+        return spans
+
+    def stage_totals(self, spans=None):
+        """{stage: {'spans', 'seconds', 'rows', 'bytes'}} in order of first appearance"""
+        totals = {}
+        for entry in self.last_run() if spans is None else spans:
+            total = totals.setdefault(entry['stage'], {'spans': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+            total['spans'] += 1
+            total['seconds'] += entry.get('seconds') or 0.0
+            total['rows'] += entry.get('rows') or 0
+            total['bytes'] += entry.get('bytes') or 0
+        for total in totals.values():
+            total['seconds'] = round(total['seconds'], 6)
+        return totals
+
+    def slowest_series(self, count=10, spans=None):
+        """The `count` series with the most time over all stages, as (series, seconds, {stage: seconds})"""
+        series = {}
+        for entry in self.last_run() if spans is None else spans:
+            if not entry.get('symbol'):
+                continue
+            key = f"{entry['symbol']} {entry.get('timeframe') or ''}".strip()
+            stages = series.setdefault(key, {})
+            stages[entry['stage']] = stages.get(entry['stage'], 0.0) + (entry.get('seconds') or 0.0)
+        ranked = sorted(series.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [(key, sum(stages.values()), stages) for key, stages in ranked[:count]]
+
+    def summary(self):
+        """One line of per-stage seconds for the log"""
+        totals = self.stage_totals()
+        return ", ".join(f"{stage} {total['seconds']:.2f}s" for stage, total in totals.items())
+
+
+def timed_chunks(chunks, span):
+    """Pass chunks through, timing how long each takes to arrive; the span closes when they end"""
+    iterator = iter(chunks)
+    error = None
+    try:
+        while True:
+            with span.measure():
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            span.add(len(chunk), chunk.nbytes)
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        span.close(error=error)
+
+
+class TimedWriter:
+    """Wraps a series writer so its writes and close are one export span.
+
+    Wrapped before the export pipeline, it is timed on the writer thread.
+    The bytes are the size of `target` once closed.
+    """
+
+    def __init__(self, writer, span, target=None):
+        self.writer = writer
+        self.span = span
+        self.target = target
+        self.error = None
+
+    def write(self, df):
+        try:
+            with self.span.measure():
+                self.writer.write(df)
+        except Exception as e:
+            self.error = e
+            raise
+        self.span.add(rows=len(df))
+
+    def close(self):
+        error = self.error
+        try:
+            with self.span.measure():
+                return self.writer.close()
+        except Exception as e:
+            error = error or e
+            raise
+        finally:
+            self.span.add(nbytes=path_bytes(self.target))
+            self.span.close(error=error)
+
+    def abort(self):
+        """Discard the unfinished output; the span is recorded as stopped"""
+        try:
+            with self.span.measure():
+                self.writer.abort()
+        finally:
+            self.span.close(error=self.error or "stopped")
@@ -0,0 +1,245 @@
+"""Headless batch entry point for the MT5 downloader.
+
+Runs the same fetch/convert/export pipeline as the GUI without importing
+PyQt5 or matplotlib, and prints one JSON object per line on stdout so
+schedulers can follow progress:
+
+    python mt5_batch.py --symbols EURUSD,XAUUSD --timeframes H1,D1 --days 365 \\
+        --format parquet --output data/
+    python mt5_batch.py --job nightly.json
+
+A job file holds one job object, or a list of them, using the long option
+names as keys (``symbols`` and ``timeframes`` may be lists or
+comma-separated strings).
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from download_core import DownloadJob, TIMEFRAMES, TICKS, EXPORT_FORMATS, EXPORT_COLUMNS
+from symbol_catalog import SymbolCatalog
+from mt5_session import MT5Session
+from csv_writer import CSV_ENGINES, CSV_COMPRESSIONS
+from export_pipeline import DEFAULT_EXPORT_WORKERS
+from metrics import MetricsRecorder
+from frames import TimeOutput, TIME_FORMATS
+from panel import PANEL_FIELDS, PANEL_FORMATS
+
+JOB_DEFAULTS = {
+    'symbols': None,
+    'timeframes': 'H1',
+    'start': None,
+    'end': None,
+    'days': 30,
+    'format': 'csv',
+    'columns': ','.join(EXPORT_COLUMNS),
+    'output': '',
+    'window_days': 30,
+    'no_cache': False,
+    'cache_dir': 'bar_cache',
+    'terminals': None,
+    'derive': False,
+    'tick_window_hours': 24,
+    'csv_engine': 'pandas',
+    'csv_compression': None,
+    'csv_precision': None,
+    'export_workers': DEFAULT_EXPORT_WORKERS,
+    'no_resume': False,
+    'metrics': None,
+    'check_gaps': False,
+    'time_format': 'datetime',
+    'timezone': 'UTC',
+    'server_timezone': 'UTC',
+    'panel': None,
+    'panel_ffill': False,
+    'panel_format': 'csv',
+}
+
+_emit_lock = threading.Lock()
+
+
+def emit(event, **fields):
+    """Print one machine-readable progress record.
+
+    The export threads log too, so each record is written whole under a lock.
+    """
+    record = {'event': event, 'ts': round(time.time(), 3), **fields}
+    line = json.dumps(record, default=str) + '\n'
+    with _emit_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def split_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def resolve_range(spec):
+    """Return (start_dt, end_dt) the same way the GUI does"""
+    if spec.get('start'):
+        start = parse_date(spec['start']).date()
+        end = parse_date(spec['end']).date() if spec.get('end') else datetime.now().date()
+    else:
+        end = datetime.now().date()
+        start = end - timedelta(days=int(spec['days']))
+    if start > end:
+        raise ValueError("Start date must be before end date")
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+
+def build_job(spec, symbol_catalog=None, session=None):
+    """Validate a job spec and turn it into a DownloadJob"""
+    spec = {**JOB_DEFAULTS, **{k: v for k, v in spec.items() if v is not None}}
+    symbols = split_list(spec['symbols'])
+    if not symbols:
+        raise ValueError("Please enter at least one valid symbol")
+    timeframes = [TICKS if tf.lower() == TICKS.lower() else tf.upper() for tf in split_list(spec['timeframes'])]
+    unknown = [tf for tf in timeframes if tf not in TIMEFRAMES and tf != TICKS]
+    if unknown or not timeframes:
+        raise ValueError(f"Invalid timeframes: {', '.join(unknown) or 'none given'}")
+    if spec['format'] not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid format: {spec['format']}")
+    columns = split_list(spec['columns'])
+    if not columns:
+        raise ValueError("Please select at least one column to export")
+    if spec['csv_engine'] not in CSV_ENGINES:
+        raise ValueError(f"Invalid CSV engine: {spec['csv_engine']}")
+    if spec['csv_compression'] not in CSV_COMPRESSIONS:
+        raise ValueError(f"Invalid CSV compression: {spec['csv_compression']}")
+    start_dt, end_dt = resolve_range(spec)
+    time_output = TimeOutput(spec['time_format'], spec['timezone'], spec['server_timezone'])
+    if spec['panel'] is not None and spec['panel'] not in PANEL_FIELDS:
+        raise ValueError(f"Invalid panel field: {spec['panel']}")
+    if spec['panel_format'] not in PANEL_FORMATS:
+        raise ValueError(f"Invalid panel format: {spec['panel_format']}")
+
+    def log(message, level):
+        logging.log(logging.getLevelName(level), message)
+        emit('log', level=level, message=message)
+
+    return DownloadJob(
+        symbols, timeframes, start_dt, end_dt, spec['output'], spec['format'], columns,
+        use_cache=not spec['no_cache'], cache_dir=spec['cache_dir'], window_days=int(spec['window_days']),
+        terminal_paths=split_list(spec['terminals']), derive_timeframes=bool(spec['derive']),
+        tick_window_hours=float(spec['tick_window_hours']), symbol_catalog=symbol_catalog,
+        session=session, csv_engine=spec['csv_engine'], csv_compression=spec['csv_compression'],
+        csv_precision=int(spec['csv_precision']) if spec['csv_precision'] is not None else None,
+        export_workers=int(spec['export_workers']), resume=not spec['no_resume'],
+        metrics=MetricsRecorder(spec['metrics']) if spec['metrics'] else None,
+        check_gaps=bool(spec['check_gaps']), time_output=time_output, panel_field=spec['panel'],
+        panel_ffill=bool(spec['panel_ffill']), panel_format=spec['panel_format'], log=log,
+        progress=lambda snapshot: emit('progress', **snapshot), progress_interval=1.0,
+        error=lambda message: emit('error', message=message),
+    )
+
+
+def load_job_file(path):
+    with open(path, 'r') as f:
+        jobs = json.load(f)
+    return jobs if isinstance(jobs, list) else [jobs]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download MT5 history without the GUI")
+    parser.add_argument('--job', help="JSON job file (one job object or a list of them)")
+    parser.add_argument('--symbols', help="Comma-separated symbols, e.g. XAUUSD,EURUSD")
+    parser.add_argument('--timeframes', help=f"Comma-separated timeframes ({','.join(TIMEFRAMES + [TICKS])})")
+    parser.add_argument('--start', help="Start date YYYY-MM-DD")
+    parser.add_argument('--end', help="End date YYYY-MM-DD (default: today)")
+    parser.add_argument('--days', type=int, help="Days back from today when --start is not given")
+    parser.add_argument('--format', choices=EXPORT_FORMATS)
+    parser.add_argument('--columns', help="Comma-separated export columns")
+    parser.add_argument('--output', help="Output file or folder")
+    parser.add_argument('--window-days', dest='window_days', type=int,
+                        help="Fetch window in days (0 = whole range at once)")
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true', default=None,
+                        help="Do not use the local bar cache")
+    parser.add_argument('--cache-dir', dest='cache_dir')
+    parser.add_argument('--tick-window-hours', dest='tick_window_hours', type=float,
+                        help="Tick download chunk size in hours (default 24)")
+    parser.add_argument('--derive', action='store_true', default=None,
+                        help="Fetch the finest timeframe once and build the others locally")
+    parser.add_argument('--csv-engine', dest='csv_engine', choices=CSV_ENGINES,
+                        help="CSV writer: pandas (default) or fast (vectorized, fixed decimals)")
+    parser.add_argument('--csv-compression', dest='csv_compression', choices=[c for c in CSV_COMPRESSIONS if c],
+                        help="Compress CSV output with gzip or zstd")
+    parser.add_argument('--csv-precision', dest='csv_precision', type=int,
+                        help="Decimals written by the fast CSV engine (default: the symbol's digits)")
+    parser.add_argument('--export-workers', dest='export_workers', type=int,
+                        help=f"Threads writing exports while the next series downloads "
+                             f"(default {DEFAULT_EXPORT_WORKERS}, 0 = write inline)")
+    parser.add_argument('--no-resume', dest='no_resume', action='store_true', default=None,
+                        help="Start from scratch instead of skipping series saved by an interrupted run")
+    parser.add_argument('--metrics', help="Append per-stage timing spans to this JSON-lines file")
+    parser.add_argument('--check-gaps', dest='check_gaps', action='store_true', default=None,
+                        help="Report missing, duplicated and out-of-order bars of each series")
+    parser.add_argument('--time-format', dest='time_format', choices=TIME_FORMATS,
+                        help="Dates as datetimes (default) or int64 epoch seconds/milliseconds")
+    parser.add_argument('--timezone', help="Zone of exported datetimes: UTC (default), server, or a name "
+                                           "such as Europe/London")
+    parser.add_argument('--server-timezone', dest='server_timezone',
+                        help="Zone of the trade server's clock, e.g. EET (default UTC: MT5 times as they are)")
+    parser.add_argument('--panel', choices=list(PANEL_FIELDS),
+                        help="Write one time-aligned panel of all symbols per timeframe with this field")
+    parser.add_argument('--panel-ffill', dest='panel_ffill', action='store_true', default=None,
+                        help="Forward-fill panel cells of symbols without a bar at that time")
+    parser.add_argument('--panel-format', dest='panel_format', choices=list(PANEL_FORMATS),
+                        help="Panel file format (default csv)")
+    parser.add_argument('--terminals',
+                        help="Comma-separated terminal64.exe paths; two or more download in parallel")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(
+        filename='mt5_downloader.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    args = parse_args(argv)
+    overrides = {k: v for k, v in vars(args).items() if k != 'job' and v is not None}
+    specs = load_job_file(args.job) if args.job else [{}]
+    symbol_catalog = SymbolCatalog()  # Shared so a job file refreshes the symbol list at most once
+    session = MT5Session()  # Kept connected across the jobs of a job file
+
+    failed = 0
+    try:
+        for index, spec in enumerate(specs):
+            spec = {**spec, **overrides}
+            try:
+                job = build_job(spec, symbol_catalog, session)
+            except Exception as e:
+                emit('error', job=index, message=str(e))
+                failed += 1
+                continue
+            emit('start', job=index, symbols=job.symbols, timeframes=job.timeframes,
+                 start=job.start_dt, end=job.end_dt, format=job.export_format, output=job.output_file)
+            started = time.perf_counter()
+            result = job.run()
+            if result is None:
+                failed += 1
+            extra = {'gaps': {key: report.summary() for key, report in job.gap_reports.items()}} \
+                if job.check_gaps else {}
+            emit('done', job=index, ok=result is not None, seconds=round(time.perf_counter() - started, 3),
+                 series=dict(result or {}), stages=job.metrics.stage_totals(),
+                 **extra)
+    finally:
+        session.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+# Lightweight constants shared by the GUI, the batch CLI and the download
+# pipeline. Keep this module free of heavy imports: the GUI reads it at startup.
+
+TIMEFRAMES = ["M1", "M5", "M15", "M30", "H1", "H4", "D1", "W1", "MN1"]
+# Pseudo-timeframe for tick history; listed after the bar timeframes
+TICKS = "Ticks"
+EXPORT_FORMATS = ["xlsx", "csv", "parquet", "feather"]
+EXPORT_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume", "Spread", "RealVolume"]
+CHART_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+TICK_COLUMNS = ["Date", "Bid", "Ask", "Last", "Volume", "Flags", "VolumeReal"]
@@ -0,0 +1,98 @@
+from datetime import timedelta, timezone
+import numpy as np
+
+
+def iter_windows(start_dt, end_dt, window=None):
+    """Split [start_dt, end_dt] into consecutive, non-overlapping inclusive windows"""
+    if window is None or window <= timedelta(0):
+        yield start_dt, end_dt
+        return
+    step = timedelta(seconds=1)
+    cursor = start_dt
+    while cursor <= end_dt:
+        window_end = min(cursor + window - step, end_dt)
+        yield cursor, window_end
+        cursor = window_end + step
+
+
+def iter_rate_windows(fetch, start_dt, end_dt, window=None, should_continue=None):
+    """Fetch a date range window by window and yield de-duplicated rate arrays.
+
+    `fetch(start, end)` returns an MT5 rates array (or None). Bars at or
+    before the last yielded bar time are dropped, so a window edge that MT5
+    returns twice never produces a duplicate row. Empty windows are skipped.
+    `should_continue()` is checked before each window so a caller can stop
+    between requests.
+    """
+    last_time = None
+    for window_start, window_end in iter_windows(start_dt, end_dt, window):
+        if should_continue is not None and not should_continue():
+            return
+        rates = fetch(window_start, window_end)
+        if rates is None or len(rates) == 0:
+            continue
+        if last_time is not None:
+            rates = rates[rates['time'] > last_time]
+            if len(rates) == 0:
+                continue
+        last_time = rates['time'][-1]
+        yield rates
+
+
+def split_rates(rates, window=None):
+    """Yield views of an in-memory rates array cut at `window` boundaries"""
+    if rates is None or len(rates) == 0:
+        return
+    if window is None or window <= timedelta(0):
+        yield rates
+        return
+    times = rates['time']
+    step = int(window.total_seconds())
+    edges = np.arange(int(times[0]) + step, int(times[-1]) + 1, step)
+    bounds = [0] + list(np.searchsorted(times, edges)) + [len(rates)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi > lo:
+            yield rates[lo:hi]
+
+
+def iter_series_rates(mt5_module, symbol, timeframe, tf_value, start_dt, end_dt, window=None,
+                      bar_cache=None, server=None, should_continue=None, log=None):
+    """Yield one series window by window, straight from MT5 or via a BarCache"""
+    if bar_cache is None:
+        yield from iter_rate_windows(
+            lambda start, end: mt5_module.copy_rates_range(symbol, tf_value, start, end),
+            start_dt, end_dt, window, should_continue=should_continue
+        )
+        return
+    yield from bar_cache.iter_rates(
+        mt5_module, server, symbol, timeframe, tf_value, start_dt, end_dt, window=window, log=log,
+        should_continue=should_continue
+    )
+
+
+def iter_tick_windows(fetch, start_dt, end_dt, window, should_continue=None):
+    """Fetch ticks over [start_dt, end_dt] in half-open windows and yield each chunk.
+
+    `fetch(start, end)` returns an MT5 ticks array (or None). Each tick is
+    kept only by the window whose [start, end) holds its ``time_msc`` (the
+    last window includes its end), so no tick is lost or repeated at a
+    boundary whether or not MT5 treats ``date_to`` as inclusive.
+    """
+    cursor = start_dt
+    while cursor <= end_dt:
+        if should_continue is not None and not should_continue():
+            return
+        window_end = min(cursor + window, end_dt)
+        ticks = fetch(cursor, window_end)
+        if ticks is not None and len(ticks):
+            lo = int(cursor.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            hi = int(window_end.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            msc = ticks['time_msc']
+            keep = (msc >= lo) & ((msc < hi) if window_end < end_dt else (msc <= hi))
+            if not keep.all():
+                ticks = ticks[keep]
+            if len(ticks):
+                yield ticks
+        if window_end >= end_dt:
+            return
+        cursor = window_end
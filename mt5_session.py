@@ -0,0 +1,110 @@
+"""One long-lived MetaTrader 5 connection shared by the whole process.
+
+Every ``mt5.initialize()`` is a terminal handshake that costs hundreds of
+milliseconds to seconds, so the connection is opened once and kept until
+the app exits. ``acquire()`` hands it to one caller at a time (the MT5 API
+is process-wide and not thread-safe), health-checks it with
+``terminal_info()`` and reconnects with exponential backoff when the
+terminal was restarted or closed in the meantime:
+
+    with session.acquire() as mt5:
+        rates = mt5.copy_rates_range(...)
+
+``mt5_batch`` keeps one session open across the jobs of a job file. The
+MT5 API is imported by module name on first connect, so a stand-in module
+placed earlier on ``sys.path`` is picked up as well.
+"""
+import time
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+
+
+class MT5SessionError(Exception):
+    """The MT5 connection could not be opened or is in use"""
+
+
+class MT5Session:
+    """Shared, self-healing MT5 connection handed out under a lock"""
+
+    def __init__(self, terminal_path=None, mt5_module='MetaTrader5', retries=3, backoff=0.5, max_backoff=8.0,
+                 log=None):
+        self.terminal_path = terminal_path or None
+        self.mt5_module = mt5_module
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.log = log or (lambda message, level: logging.log(logging.getLevelName(level), message))
+        self.lock = threading.RLock()
+        self.mt5 = None
+        self.connected = False
+        self.connected_path = None
+        self.last_error = None
+
+    def configure(self, terminal_path):
+        """Switch terminals; the next acquire or ensure reconnects (no need to hold the lock)"""
+        self.terminal_path = terminal_path or None
+
+    def is_healthy(self):
+        """True when the open connection still reaches a running, connected terminal"""
+        if not self.connected or self.connected_path != self.terminal_path:
+            return False
+        try:
+            info = self.mt5.terminal_info()
+        except Exception:
+            return False
+        return info is not None and getattr(info, 'connected', True)
+
+    def connect(self):
+        """Open the connection, retrying with exponential backoff; raises MT5SessionError"""
+        if self.mt5 is None:
+            self.mt5 = importlib.import_module(self.mt5_module)
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            if self.connected:
+                self.mt5.shutdown()
+                self.connected = False
+            target = self.terminal_path or "default terminal"
+            self.log(f"Connecting to MT5 ({target}), attempt {attempt}/{self.retries}...", "INFO")
+            ok = self.mt5.initialize(path=self.terminal_path) if self.terminal_path else self.mt5.initialize()
+            if ok:
+                self.connected = True
+                self.connected_path = self.terminal_path
+                self.last_error = None
+                return self.mt5
+            self.last_error = self.mt5.last_error()
+            if attempt < self.retries:
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        raise MT5SessionError(f"Failed to initialize MT5 connection. Error: {self.last_error}")
+
+    def ensure(self):
+        """Return the MT5 module with a healthy connection, reconnecting if needed"""
+        with self.lock:
+            if not self.is_healthy():
+                if self.connected and self.connected_path == self.terminal_path:
+                    self.log("MT5 connection lost, reconnecting", "WARNING")
+                self.connect()
+            return self.mt5
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Hold the connection exclusively for the duration of the with-block.
+
+        With a `timeout` (seconds), raises MT5SessionError instead of waiting
+        longer for another caller to finish.
+        """
+        if not self.lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise MT5SessionError("MT5 connection is busy")
+        try:
+            yield self.ensure()
+        finally:
+            self.lock.release()
+
+    def close(self):
+        """Shut the connection down (at app exit)"""
+        with self.lock:
+            if self.connected:
+                self.mt5.shutdown()
+                self.connected = False
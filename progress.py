@@ -0,0 +1,64 @@
+"""Bar-weighted download progress with throughput and ETA.
+
+Symbol/timeframe tasks differ in size by orders of magnitude (a year of M1
+is 500x a year of H1), so each task is weighted by the number of bars its
+range should hold and progress advances as bars arrive, not as tasks end.
+Tick tasks have no predictable size; they are weighted like M1 and advance
+by the fraction of the time range written so far. The window polls a
+snapshot at a fixed 10 Hz, so UI work never slows the download.
+"""
+import time
+from resample import TIMEFRAME_SECONDS
+
+MONTH_SECONDS = 30 * 86400
+
+
+def expected_bars(timeframe, start_dt, end_dt):
+    """Upper estimate of the bars `timeframe` has between two datetimes (ticks count as M1)"""
+    seconds = TIMEFRAME_SECONDS.get(timeframe, MONTH_SECONDS if timeframe == 'MN1' else 60)
+    return max(1, int((end_dt - start_dt).total_seconds() // seconds) + 1)
+
+
+class DownloadProgress:
+    """Tracks weighted task progress, bars fetched, throughput and ETA"""
+
+    def __init__(self, start_dt, end_dt, clock=time.perf_counter):
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.clock = clock
+        self.started = clock()
+        self.weights = {}
+        self.done = {}
+        self.bars = 0
+
+    def add(self, key, timeframe):
+        """Register a task; its weight is the bars expected for `timeframe`"""
+        self.weights[key] = expected_bars(timeframe, self.start_dt, self.end_dt)
+        self.done[key] = 0
+
+    def advance(self, key, bars=0, fraction=None):
+        """Count `bars` just fetched for `key`, or set its completed `fraction` directly"""
+        self.bars += bars
+        weight = self.weights[key]
+        done = weight * fraction if fraction is not None else self.done[key] + bars
+        self.done[key] = min(max(done, self.done[key]), weight)
+
+    def finish(self, key):
+        """Mark a task complete, however many bars it actually had"""
+        self.done[key] = self.weights[key]
+
+    def fraction(self):
+        total = sum(self.weights.values())
+        return sum(self.done.values()) / total if total else 1.0
+
+    def snapshot(self):
+        """Current state as a dict: percent, bars, bars_per_second and eta_seconds (None until known)"""
+        elapsed = self.clock() - self.started
+        fraction = self.fraction()
+        eta = elapsed * (1 - fraction) / fraction if 0 < fraction < 1 else (0.0 if fraction >= 1 else None)
+        return {
+            'percent': int(fraction * 100),
+            'bars': self.bars,
+            'bars_per_second': round(self.bars / elapsed, 1) if elapsed > 0 else 0.0,
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+        }
@@ -0,0 +1,129 @@
+"""Build higher-timeframe bars from a finer MT5 rates array.
+
+Buckets follow MT5's bar alignment in server time: intraday and D1 bars open
+on multiples of their length since the epoch, W1 bars open on Sunday 00:00
+and MN1 bars on the first day of the month. Aggregation is vectorized with
+``np.ufunc.reduceat`` over the sorted bar times; ``RateAggregator`` applies
+it to a series one window at a time.
+"""
+import numpy as np
+from mt5_constants import TIMEFRAMES
+
+TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H4': 14400, 'D1': 86400, 'W1': 604800,
+}
+
+# 1970-01-01 was a Thursday; MT5 weeks start three days later, on Sunday
+WEEK_OFFSET = 3 * 86400
+
+
+def can_derive(base, target):
+    """True when every `target` bar is an exact union of `base` bars"""
+    if TIMEFRAMES.index(target) <= TIMEFRAMES.index(base):
+        return False
+    if target in ('W1', 'MN1'):
+        return TIMEFRAME_SECONDS[base] <= TIMEFRAME_SECONDS['D1']
+    return TIMEFRAME_SECONDS[target] % TIMEFRAME_SECONDS[base] == 0
+
+
+def derive_plan(timeframes):
+    """Split the selected timeframes into fetches and local derivations.
+
+    Returns ``{fetch_timeframe: [derived_timeframes]}``. Each timeframe is
+    derived from the finest fetched timeframe that can produce it; those
+    that cannot be derived (MN1 when W1 is the finest, say) are fetched.
+    """
+    plan = {}
+    for timeframe in sorted(set(timeframes), key=TIMEFRAMES.index):
+        base = next((b for b in plan if can_derive(b, timeframe)), None)
+        if base is None:
+            plan[timeframe] = []
+        else:
+            plan[base].append(timeframe)
+    return plan
+
+
+def bucket_starts(times, timeframe):
+    """Open time of the `timeframe` bar containing each epoch second in `times`"""
+    times = np.asarray(times, dtype=np.int64)
+    if timeframe == 'MN1':
+        months = times.astype('datetime64[s]').astype('datetime64[M]')
+        return months.astype('datetime64[s]').astype(np.int64)
+    if timeframe == 'W1':
+        return (times - WEEK_OFFSET) // TIMEFRAME_SECONDS['W1'] * TIMEFRAME_SECONDS['W1'] + WEEK_OFFSET
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    return times // seconds * seconds
+
+
+def bucket_end(epoch, timeframe):
+    """Last second of the `timeframe` bar containing `epoch`"""
+    start = int(bucket_starts([epoch], timeframe)[0])
+    if timeframe == 'MN1':
+        month = np.datetime64(start, 's').astype('datetime64[M]') + 1
+        return int(month.astype('datetime64[s]').astype(np.int64)) - 1
+    return start + TIMEFRAME_SECONDS[timeframe] - 1
+
+
+def aggregate_rates(rates, timeframe):
+    """Aggregate a time-sorted MT5 rates array into `timeframe` bars.
+
+    Open/close come from the first/last source bar, high/low are the
+    extremes, volumes are summed and spread is the bucket minimum, which is
+    what MT5 stores for a bar.
+    """
+    if rates is None or len(rates) == 0:
+        return rates
+    starts = bucket_starts(rates['time'], timeframe)
+    edges = np.flatnonzero(starts[1:] != starts[:-1]) + 1
+    first = np.concatenate(([0], edges))
+    last = np.concatenate((edges - 1, [len(rates) - 1]))
+
+    out = np.empty(len(first), dtype=rates.dtype)
+    out['time'] = starts[first]
+    out['open'] = rates['open'][first]
+    out['high'] = np.maximum.reduceat(rates['high'], first)
+    out['low'] = np.minimum.reduceat(rates['low'], first)
+    out['close'] = rates['close'][last]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], first)
+    out['spread'] = np.minimum.reduceat(rates['spread'], first)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], first)
+    return out
+
+
+class RateAggregator:
+    """Aggregates a series into `timeframe` bars as its windows arrive.
+
+    The source bars of the last bucket of a window may continue in the next
+    one, so they are carried forward until a later bucket starts or the
+    series ends (``flush``). Only that partial bucket is held between windows.
+    """
+
+    def __init__(self, timeframe):
+        self.timeframe = timeframe
+        self.pending = None
+
+    def add(self, rates):
+        """Return the bars completed by a time-sorted chunk of source rates"""
+        if rates is None or len(rates) == 0:
+            return None
+        if self.pending is not None:
+            rates = np.concatenate([self.pending, rates])
+        last_start = bucket_starts(rates['time'][-1:], self.timeframe)[0]
+        cut = np.searchsorted(rates['time'], last_start)
+        # A copy, so the window it came from can be released
+        self.pending = rates[cut:].copy()
+        return aggregate_rates(rates[:cut], self.timeframe)
+
+    def flush(self):
+        """Return the last bar of the series, or None"""
+        pending, self.pending = self.pending, None
+        return aggregate_rates(pending, self.timeframe)
+
+
+def slice_rates(rates, start, end):
+    """Bars with open time in the inclusive epoch range [start, end]"""
+    if rates is None or len(rates) == 0:
+        return rates
+    lo, hi = np.searchsorted(rates['time'], [start, end + 1])
+    return rates[lo:hi]
@@ -0,0 +1,97 @@
+"""Startup-time measurement for the MT5 downloader GUI.
+
+The GUI creates a ``StartupTimer`` before its other imports, records a few
+phases (imports, QApplication, window built, first window shown) and logs
+the time-to-first-window on every start. Running this module re-launches the GUI under
+``python -X importtime`` and prints which top-level packages cost the most:
+
+    python startup_timing.py
+    python startup_timing.py --top 25
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+
+# Target for time-to-first-window on a typical desktop; reported, not enforced
+STARTUP_BUDGET_SECONDS = 1.5
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class StartupTimer:
+    """Records named startup phases relative to the timer's creation"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def elapsed(self, name=None):
+        """Seconds from start to the named mark (or to the last one)"""
+        for mark_name, at in reversed(self.marks):
+            if name is None or mark_name == name:
+                return at - self.started
+        return None
+
+    def report(self):
+        lines = []
+        previous = self.started
+        for name, at in self.marks:
+            lines.append(f"{name:<14} {at - self.started:7.3f}s  (+{at - previous:.3f}s)")
+            previous = at
+        total = self.elapsed()
+        if total is not None:
+            status = "within" if total <= STARTUP_BUDGET_SECONDS else "over"
+            lines.append(f"Time to first window: {total:.3f}s ({status} {STARTUP_BUDGET_SECONDS:.1f}s budget)")
+        return "\n".join(lines)
+
+
+def summarize_importtime(stderr_text, top=15):
+    """Aggregate `-X importtime` output by top-level package.
+
+    Returns [(package, cumulative_seconds)] sorted slowest first. Only
+    imports made directly by the application (not nested inside another
+    package's import) are counted, so times do not add up twice.
+    """
+    totals = {}
+    for line in stderr_text.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        if len(indent) > 1:
+            continue
+        package = module.split('.')[0]
+        totals[package] = totals.get(package, 0) + int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure MT5 Downloader startup time")
+    parser.add_argument('--top', type=int, default=15, help="Number of packages to list")
+    args = parser.parse_args(argv)
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MT5_Downloader.py')
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', script, '--startup-report', '--quit-after-show'],
+        capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+
+    print("Startup phases:")
+    print(proc.stdout.strip() or "  (no report; did the window fail to open?)")
+    print(f"\nProcess wall time including shutdown: {wall:.3f}s")
+    print("\nSlowest top-level imports (cumulative):")
+    for package, seconds in summarize_importtime(proc.stderr, args.top):
+        print(f"  {package:<24} {seconds:7.3f}s")
+    return proc.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
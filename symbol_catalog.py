@@ -0,0 +1,146 @@
+"""Persistent, indexed catalog of the symbols each broker server offers.
+
+``symbols_get()`` returns the whole universe (10k+ symbols on some brokers)
+and is slow, so the catalog keeps the last result per server on disk with a
+lowercase -> exact-name index and the SymbolInfo fields the app uses. A
+catalog older than `ttl` seconds counts as stale and is refreshed from MT5
+the next time a connection is open; lookups in between never touch MT5.
+
+A symbol missing from a catalog that was loaded from disk triggers one
+refresh per server and session, so newly listed symbols are still found.
+The app keeps the catalog in ``symbol_catalog.json``, refreshes a stale one
+in the background and rebuilds it from Settings > Refresh Symbol List.
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+CATALOG_FILE = 'symbol_catalog.json'
+CATALOG_TTL_SECONDS = 6 * 3600
+SYMBOL_FIELDS = ('digits', 'point', 'path', 'visible', 'description')
+
+
+def current_server(mt5_module):
+    """Trade server of the open MT5 connection, "default" when unknown"""
+    account = mt5_module.account_info()
+    return account.server if account is not None else "default"
+
+
+class SymbolCatalog:
+    """Symbol names and metadata per server, indexed by lowercase name"""
+
+    def __init__(self, path=CATALOG_FILE, ttl=CATALOG_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self.servers = None  # server -> {'updated': epoch, 'symbols': {name: info}}; loaded on first use
+        self.server = None
+        self.index = {}
+        self.refreshed = set()  # Servers refreshed from MT5 in this session
+
+    def load(self):
+        """Read the catalog file; a missing or unreadable file means an empty catalog"""
+        with self.lock:
+            self.servers = {}
+            last_server = None
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        data = json.load(f)
+                    self.servers = data.get('servers', {})
+                    last_server = data.get('server')
+                except Exception as e:
+                    logging.warning(f"Discarding unreadable symbol catalog {self.path}: {e}")
+            self.use(last_server)
+
+    def save(self):
+        """Atomically write the catalog to disk"""
+        with self.lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'server': self.server, 'servers': self.servers}, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.error(f"Error saving symbol catalog: {e}")
+
+    def _entries(self):
+        if self.servers is None:
+            self.load()
+        return self.servers
+
+    def use(self, server):
+        """Make `server` the catalog that lookups resolve against"""
+        with self.lock:
+            entry = self._entries().get(server, {})
+            self.server = server
+            self.index = {name.lower(): name for name in entry.get('symbols', {})}
+
+    def updated(self, server=None):
+        """Epoch seconds of the last refresh of `server` (the current one by default), or None"""
+        entry = self._entries().get(server if server is not None else self.server)
+        return entry['updated'] if entry else None
+
+    def is_stale(self, server=None):
+        updated = self.updated(server)
+        return updated is None or time.time() - updated > self.ttl
+
+    def refresh(self, mt5_module, server=None):
+        """Reload every symbol of the connected server from MT5; returns the symbol count"""
+        server = server or current_server(mt5_module)
+        symbols = mt5_module.symbols_get() or []
+        entry = {
+            'updated': time.time(),
+            'symbols': {s.name: {field: getattr(s, field, None) for field in SYMBOL_FIELDS} for s in symbols},
+        }
+        with self.lock:
+            self._entries()[server] = entry
+            self.refreshed.add(server)
+            self.use(server)
+            self.save()
+        logging.info(f"Symbol catalog for {server} refreshed: {len(symbols)} symbols")
+        return len(symbols)
+
+    def ensure(self, mt5_module, server=None):
+        """Select the connected server's catalog, refreshing it first when stale"""
+        server = server or current_server(mt5_module)
+        if self.is_stale(server):
+            self.refresh(mt5_module, server)
+        else:
+            self.use(server)
+        return server
+
+    def resolve(self, symbol, mt5_module=None):
+        """Exact broker name for `symbol` (any case), or None.
+
+        With `mt5_module` given, a miss in a catalog that has not been
+        refreshed in this session refreshes it once and looks again.
+        """
+        if self.servers is None:
+            self.load()
+        exact = self.index.get(symbol.lower())
+        if exact is None and mt5_module is not None and self.server not in self.refreshed:
+            self.refresh(mt5_module, self.server)
+            exact = self.index.get(symbol.lower())
+        return exact
+
+    def info(self, symbol):
+        """Cached SymbolInfo fields of `symbol` as a dict, or None"""
+        exact = self.resolve(symbol)
+        if exact is None:
+            return None
+        return self._entries()[self.server]['symbols'][exact]
+
+    def invalid(self, symbols, mt5_module=None):
+        """The subset of `symbols` the current server does not offer"""
+        return [s for s in symbols if self.resolve(s, mt5_module) is None]
+
+    def watchlist(self):
+        """Sorted names of the symbols shown in Market Watch"""
+        symbols = self._entries().get(self.server, {}).get('symbols', {})
+        return sorted(name for name, info in symbols.items() if info.get('visible'))
+
+    def __len__(self):
+        return len(self.index)
@@ -0,0 +1,178 @@
+"""Parallel downloads across several MetaTrader 5 terminal installations.
+
+The MetaTrader5 package talks to one terminal per process, so each worker is
+a separate process bound to its own terminal through an ``MT5Session`` (which
+reconnects if that terminal restarts mid-job). Workers take
+``(symbol, timeframe, end_dt)`` tasks from a shared queue and send the
+fetched bars back to the parent one window per message, so a worker only
+holds one window; the parent does all conversion and export. A worker whose
+terminal fails to start simply leaves its share of the queue to the others.
+
+Tick tasks (``timeframe == 'Ticks'``) are streamed to disk by the worker
+itself, so tick volumes never cross the process boundary.
+
+Workers import the MT5 API by module name (``MetaTrader5`` by default), so a
+stand-in module placed earlier on ``sys.path`` is used in every worker too.
+"""
+import queue
+import multiprocessing
+from bar_cache import BarCache
+from mt5_constants import TICKS
+from mt5_fetch import iter_series_rates
+from symbol_catalog import CATALOG_FILE, CATALOG_TTL_SECONDS, SymbolCatalog
+from mt5_session import MT5Session, MT5SessionError
+
+
+def terminal_worker(worker_id, terminal_path, tasks, results, stop_event, options):
+    """Process entry point: serve tasks from one terminal until the queue is drained"""
+    def log(message, level="INFO"):
+        results.put(('log', worker_id, message, level))
+
+    session = MT5Session(terminal_path, mt5_module=options['mt5_module'], log=log)
+    try:
+        try:
+            mt5 = session.connect()
+        except MT5SessionError as e:
+            results.put(('failed', worker_id, str(e)))
+            return
+        catalog = SymbolCatalog(options['catalog_path'], options['catalog_ttl'])
+        server = catalog.ensure(mt5)
+        bar_cache = BarCache(options['cache_dir']) if options['use_cache'] else None
+        results.put(('ready', worker_id, len(catalog)))
+
+        while not stop_event.is_set():
+            task = tasks.get()
+            if task is None:
+                break
+            symbol, timeframe, end_dt = task
+            session.ensure()
+            exact_symbol = catalog.resolve(symbol, mt5)
+            if timeframe == TICKS:
+                rows, path, error = 0, None, None
+                if exact_symbol is not None:
+                    try:
+                        from tick_data import stream_ticks
+                        rows, path = stream_ticks(
+                            mt5, exact_symbol, options['tick_target'], window=options['tick_window'],
+                            should_continue=lambda: not stop_event.is_set(), log=log
+                        )
+                        if rows == 0:
+                            error = str(mt5.last_error())
+                    except Exception as e:
+                        error = str(e)
+                results.put(('ticks', worker_id, symbol, exact_symbol, rows, path, error))
+                continue
+            bars = 0
+            error = None
+            if exact_symbol is not None:
+                try:
+                    tf_value = getattr(mt5, f"TIMEFRAME_{timeframe}")
+                    for rates in iter_series_rates(
+                        mt5, exact_symbol, timeframe, tf_value, options['start_dt'], end_dt or options['end_dt'],
+                        options['window'], bar_cache=bar_cache, server=server,
+                        should_continue=lambda: not stop_event.is_set(), log=log
+                    ):
+                        results.put(('window', worker_id, symbol, timeframe, exact_symbol, rates))
+                        bars += len(rates)
+                    if bars == 0:
+                        error = str(mt5.last_error())
+                except Exception as e:
+                    error = str(e)
+            if stop_event.is_set():
+                break
+            results.put(('series', worker_id, symbol, timeframe, exact_symbol, bars, error))
+    except Exception as e:
+        results.put(('failed', worker_id, f"Worker error: {e}"))
+    finally:
+        session.close()
+        results.put(('exit', worker_id))
+
+
+class TerminalPool:
+    """One download worker process per configured terminal"""
+
+    def __init__(self, terminal_paths, start_dt, end_dt, window=None, use_cache=False,
+                 cache_dir='bar_cache', mt5_module='MetaTrader5', poll_interval=0.2,
+                 tick_target=None, tick_window=None, catalog_path=CATALOG_FILE,
+                 catalog_ttl=CATALOG_TTL_SECONDS):
+        self.terminal_paths = list(terminal_paths)
+        self.options = {
+            'start_dt': start_dt, 'end_dt': end_dt, 'window': window,
+            'use_cache': use_cache, 'cache_dir': cache_dir, 'mt5_module': mt5_module,
+            'tick_target': tick_target, 'tick_window': tick_window,
+            'catalog_path': catalog_path, 'catalog_ttl': catalog_ttl,
+        }
+        self.poll_interval = poll_interval
+        # MetaTrader5 only exists on Windows, where spawn is the only start method
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = []
+        self.tasks = None
+        self.results = None
+        self.stop_event = None
+
+    def __len__(self):
+        return len(self.terminal_paths)
+
+    def start(self, tasks):
+        """Queue every task, then start one worker per terminal"""
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.stop_event = self.context.Event()
+        for task in tasks:
+            self.tasks.put(task)
+        for _ in self.terminal_paths:
+            self.tasks.put(None)
+        for worker_id, path in enumerate(self.terminal_paths):
+            process = self.context.Process(
+                target=terminal_worker,
+                args=(worker_id, path, self.tasks, self.results, self.stop_event, self.options),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def messages(self, should_continue=None):
+        """Yield worker messages until every worker has exited.
+
+        Messages are tuples starting with a kind and the worker id:
+        ``('ready', id, symbol_count)``, ``('failed', id, message)``,
+        ``('log', id, message, level)``,
+        ``('window', id, symbol, timeframe, exact_symbol, rates)``,
+        ``('series', id, symbol, timeframe, exact_symbol, bars, error)``,
+        ``('ticks', id, symbol, exact_symbol, rows, path, error)`` and
+        ``('exit', id)``. The ``window`` messages of a worker carry the bars
+        of the series its next ``series`` message completes, in time order.
+        ``exact_symbol`` is None when the terminal does not offer the symbol.
+        When `should_continue()` turns false the workers are told to stop and
+        the remaining messages are drained.
+        """
+        running = set(range(len(self.processes)))
+        while running:
+            if should_continue is not None and not should_continue():
+                self.stop()
+            try:
+                message = self.results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                # A worker that died without saying goodbye (crash, kill) is gone for good
+                for worker_id in list(running):
+                    if not self.processes[worker_id].is_alive() and self.results.empty():
+                        running.discard(worker_id)
+                        yield ('failed', worker_id, "Worker process exited unexpectedly")
+                continue
+            if message[0] == 'exit':
+                running.discard(message[1])
+                continue
+            yield message
+
+    def close(self, timeout=5):
+        """Stop and reap the worker processes"""
+        self.stop()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
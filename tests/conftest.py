@@ -0,0 +1,19 @@
+"""Shared test setup: the repository modules on sys.path and fake_mt5 standing in for MetaTrader5"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_mt5  # noqa: E402
+
+fake_mt5.install()
+
+
+@pytest.fixture
+def mt5(tmp_path, monkeypatch):
+    """The initialized fake MT5 module; the test runs in `tmp_path`, where the symbol catalog is kept"""
+    monkeypatch.chdir(tmp_path)
+    fake_mt5.initialize()
+    yield fake_mt5
+    fake_mt5.shutdown()
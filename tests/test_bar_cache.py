@@ -0,0 +1,119 @@
+import os
+import json
+from datetime import datetime, timedelta
+import numpy as np
+from bar_cache import BarCache, to_epoch
+
+WEEK = timedelta(days=7)
+
+
+def cached(mt5, cache, start, end, window=timedelta(days=3), **options):
+    """The series as iter_rates yields it, and the MT5 calls it took"""
+    mt5.reset_stats()
+    parts = list(cache.iter_rates(mt5, 'Server', 'EURUSD', 'H1', mt5.TIMEFRAME_H1, start, end,
+                                  window=window, **options))
+    rates = np.concatenate(parts) if parts else np.zeros(0, dtype=mt5.RATES_DTYPE)
+    return rates, mt5.stats()['calls']
+
+
+def direct(mt5, start, end):
+    return mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, start, end)
+
+
+def test_overlapping_requests_match_mt5(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'), segment_limit=4)
+    base = datetime(2023, 1, 2)
+    for offset, weeks in ((2, 2), (0, 3), (5, 2), (1, 7), (0, 8)):
+        start, end = base + offset * WEEK, base + (offset + weeks) * WEEK
+        rates, _ = cached(mt5, cache, start, end)
+        assert np.array_equal(rates, direct(mt5, start, end)), (offset, weeks)
+
+
+def test_only_gaps_are_fetched_and_ranges_merge(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'))
+    january, february, march = datetime(2023, 1, 2), datetime(2023, 2, 1), datetime(2023, 3, 1)
+    cached(mt5, cache, january, february - timedelta(hours=1))
+    cached(mt5, cache, march, datetime(2023, 3, 31))
+    assert len(cache.load('Server', 'EURUSD', 'H1')[1]) == 2
+
+    rates, calls = cached(mt5, cache, january, datetime(2023, 3, 31), window=timedelta(days=60))
+    assert calls == 2  # February, and the still-open end of March
+    assert np.array_equal(rates, direct(mt5, january, datetime(2023, 3, 31)))
+    ranges = cache.load('Server', 'EURUSD', 'H1')[1]
+    assert ranges[0][0] == to_epoch(january) and len(ranges) == 1
+
+
+def test_last_bar_is_fetched_again(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'))
+    start, end = datetime(2023, 1, 2), datetime(2023, 1, 5, 12)
+    first, _ = cached(mt5, cache, start, end)
+    covered = cache.load('Server', 'EURUSD', 'H1')[1]
+    assert covered[-1][1] < first['time'][-1]
+
+    again, calls = cached(mt5, cache, start, end)
+    assert calls == 1
+    assert np.array_equal(again, first)
+
+
+def test_empty_weekend_is_covered_once_later_bars_exist(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'))
+    friday, tuesday = datetime(2023, 1, 6), datetime(2023, 1, 10)
+    cached(mt5, cache, friday, tuesday, window=timedelta(days=1))
+    assert len(cache.load('Server', 'EURUSD', 'H1')[1]) == 1
+
+    _, calls = cached(mt5, cache, friday, datetime(2023, 1, 9), window=timedelta(days=1))
+    assert calls == 0
+
+
+def test_weekend_at_the_end_stays_open_until_later_bars(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'))
+    friday, sunday = datetime(2023, 1, 6), datetime(2023, 1, 8, 12)
+    cached(mt5, cache, friday, sunday, window=timedelta(days=1))
+    _, calls = cached(mt5, cache, friday, sunday, window=timedelta(days=1))
+    assert calls > 0
+
+    cached(mt5, cache, datetime(2023, 1, 9), datetime(2023, 1, 10))
+    cached(mt5, cache, friday, sunday, window=timedelta(days=1))
+    _, calls = cached(mt5, cache, friday, sunday, window=timedelta(days=1))
+    assert calls == 0
+
+
+def test_stopped_walk_keeps_the_fetched_windows(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'))
+    start, end = datetime(2023, 1, 2), datetime(2023, 2, 27)
+    windows = []
+    rates, calls = cached(mt5, cache, start, end, window=WEEK,
+                          should_continue=lambda: windows.append(1) or len(windows) <= 2)
+    assert calls == 2
+    assert np.array_equal(rates, direct(mt5, start, start + 2 * WEEK - timedelta(seconds=1)))
+
+    rates, calls = cached(mt5, cache, start, end, window=WEEK)
+    assert calls == 7
+    assert np.array_equal(rates, direct(mt5, start, end))
+
+
+def test_segments_are_merged_down_to_the_limit(mt5, tmp_path):
+    cache = BarCache(str(tmp_path / 'cache'), segment_limit=3)
+    start, end = datetime(2023, 1, 2), datetime(2023, 3, 27)
+    cached(mt5, cache, start, end, window=WEEK)
+    folder = tmp_path / 'cache' / 'Server' / 'EURUSD'
+    with open(folder / 'H1.json') as f:
+        segments = json.load(f)['segments']
+    assert len(segments) == 3
+    assert sorted(name for name in os.listdir(folder) if name.endswith('.npy')) == \
+        sorted(segment[0] for segment in segments)
+    assert np.array_equal(cache.load('Server', 'EURUSD', 'H1')[0], direct(mt5, start, end))
+
+
+def test_single_file_layout_is_read_and_extended(mt5, tmp_path):
+    folder = tmp_path / 'cache' / 'Server' / 'EURUSD'
+    folder.mkdir(parents=True)
+    start, middle, end = datetime(2023, 1, 2), datetime(2023, 1, 16), datetime(2023, 1, 29, 23)
+    np.save(folder / 'H1.npy', direct(mt5, start, middle - timedelta(seconds=1)))
+    with open(folder / 'H1.json', 'w') as f:
+        json.dump({'ranges': [[to_epoch(start), to_epoch(middle) - 1]]}, f)
+
+    cache = BarCache(str(tmp_path / 'cache'))
+    rates, calls = cached(mt5, cache, start, end, window=WEEK)
+    assert calls == 2
+    assert np.array_equal(rates, direct(mt5, start, end))
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import subprocess
+import pandas as pd
+import pytest
+from mt5_batch import build_job
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_BATCH = """
+import sys
+import json
+import fake_mt5
+fake_mt5.install()
+import mt5_batch
+code = mt5_batch.main(sys.argv[1:])
+heavy = [name for name in ('PyQt5', 'matplotlib', 'mplfinance') if name in sys.modules]
+print(json.dumps({'event': 'modules', 'heavy': heavy}))
+sys.exit(code)
+"""
+
+
+def run_batch(cwd, *args):
+    """Run the batch entry point in a fresh interpreter and return its exit code and JSON records"""
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    done = subprocess.run([sys.executable, '-c', RUN_BATCH, *args], cwd=str(cwd), env=env,
+                          capture_output=True, text=True, timeout=300)
+    records = [json.loads(line) for line in done.stdout.splitlines()]
+    return done.returncode, records
+
+
+def test_batch_run_writes_the_series_without_gui_modules(tmp_path):
+    (tmp_path / 'out').mkdir()
+    code, records = run_batch(tmp_path, '--symbols', 'EURUSD,GBPUSD', '--timeframes', 'H1,d1',
+                              '--start', '2023-01-02', '--end', '2023-02-01', '--output', 'out',
+                              '--no-cache')
+    assert code == 0
+    events = [record['event'] for record in records]
+    assert events[0] == 'start' and 'progress' in events
+    assert events[-2:] == ['done', 'modules']
+    assert records[-1]['heavy'] == []
+    assert records[-2]['ok'] and len(records[-2]['series']) == 4
+    frame = pd.read_csv(tmp_path / 'out' / 'EURUSD_H1_20230102_to_20230201.csv')
+    assert len(frame) == records[-2]['series']['EURUSD_H1']
+
+
+def test_job_file_runs_every_job_and_reports_bad_ones(tmp_path):
+    jobs = [
+        {'symbols': ['EURUSD'], 'timeframes': 'H4', 'start': '2023-01-02', 'end': '2023-01-20',
+         'output': 'first.csv', 'no_cache': True},
+        {'symbols': 'EURUSD', 'timeframes': 'H7', 'output': 'second'},
+    ]
+    with open(tmp_path / 'jobs.json', 'w') as f:
+        json.dump(jobs, f)
+    code, records = run_batch(tmp_path, '--job', 'jobs.json')
+    assert code == 1
+    assert [r['job'] for r in records if r['event'] == 'done'] == [0]
+    errors = [r for r in records if r['event'] == 'error']
+    assert errors[0]['job'] == 1 and 'H7' in errors[0]['message']
+    done = [r for r in records if r['event'] == 'done'][0]
+    assert len(pd.read_csv(tmp_path / 'first.csv')) == done['series']['EURUSD_H4']
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({}, 'at least one valid symbol'),
+    ({'symbols': 'EURUSD', 'format': 'dbf'}, 'Invalid format'),
+    ({'symbols': 'EURUSD', 'columns': ' , '}, 'at least one column'),
+    ({'symbols': 'EURUSD', 'start': '2023-02-01', 'end': '2023-01-01'}, 'before end date'),
+])
+def test_invalid_specs_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        build_job(spec)
+
+
+def test_spec_defaults_and_ticks():
+    job = build_job({'symbols': 'EURUSD, XAUUSD', 'timeframes': 'ticks,m15', 'start': '2023-01-02',
+                     'end': '2023-01-09'})
+    assert job.symbols == ['EURUSD', 'XAUUSD']
+    assert job.timeframes == ['Ticks', 'M15']
+    assert (job.end_dt - job.start_dt).days == 7
+    assert job.export_format == 'csv'
@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pandas as pd
+from chart_store import ChartStore, load_frame, save_frame
+
+
+def frame(rows, offset=0.0):
+    return pd.DataFrame({
+        'Date': pd.date_range('2023-01-02', periods=rows, freq='h', tz='UTC'),
+        'Close': np.arange(rows) + offset,
+        'Volume': np.arange(rows, dtype=np.uint64),
+    })
+
+
+def test_frames_survive_a_round_trip(tmp_path):
+    df = frame(50, 0.5)
+    path = str(tmp_path / 'series.npz')
+    save_frame(path, df)
+    pd.testing.assert_frame_equal(load_frame(path), df, check_dtype=False, check_freq=False)
+
+
+def test_old_series_are_spilled_to_stay_within_budget(tmp_path):
+    one = int(frame(1000).memory_usage(index=True).sum())
+    store = ChartStore(budget_bytes=2 * one, spill_dir=str(tmp_path / 'spill'))
+    for number in range(5):
+        store[f"S{number}"] = frame(1000, number)
+    assert list(store.memory) == ['S3', 'S4']
+    assert store.memory_bytes() <= 2 * one
+    assert len(os.listdir(tmp_path / 'spill')) == 3
+    assert store.row_counts() == {f"S{number}": 1000 for number in range(5)}
+
+    assert store['S0']['Close'][0] == 0  # Reloaded, and the least recently used one goes out
+    assert list(store.memory) == ['S4', 'S0']
+    assert store.files_written == 4
+
+
+def test_reloaded_series_are_not_written_again(tmp_path):
+    one = int(frame(1000).memory_usage(index=True).sum())
+    store = ChartStore(budget_bytes=one, spill_dir=str(tmp_path))
+    store['A'] = frame(1000)
+    store['B'] = frame(1000, 1)
+    for _ in range(3):
+        store['A'], store['B']
+    assert store.files_written == 2
+
+
+def test_replaced_series_drop_their_spill_file(tmp_path):
+    store = ChartStore(budget_bytes=1, spill_dir=str(tmp_path))
+    store['A'] = frame(10)
+    store['B'] = frame(10)
+    store['A'] = frame(20, 7)
+    assert len(os.listdir(tmp_path)) == 1
+    assert store['A']['Close'][0] == 7 and len(store) == 2
+
+
+def test_clear_removes_the_spill_folder(tmp_path):
+    store = ChartStore(budget_bytes=1, spill_dir=str(tmp_path / 'spill'))
+    store['A'] = frame(10)
+    store['B'] = frame(10)
+    store.clear()
+    assert len(store) == 0 and store.get('A') is None
+    assert not os.path.exists(tmp_path / 'spill')
@@ -0,0 +1,82 @@
+import os
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from csv_writer import CsvStreamWriter, FastCsvWriter, format_frame, open_csv_writer
+
+
+def frame(rows=1000, tz='UTC'):
+    dates = pd.date_range('1969-12-25', periods=rows, freq='37min', tz=tz)
+    rng = np.random.default_rng(7)
+    close = np.round(rng.normal(0, 2000, rows), 5)
+    close[::97] = np.nan
+    return pd.DataFrame({
+        'Date': dates, 'Close': close, 'Volume': rng.integers(0, 2 ** 40, rows).astype(np.uint64),
+        'Spread': rng.integers(-50, 50, rows).astype(np.int32),
+    })
+
+
+def pandas_rows(df, precision):
+    return df.to_csv(index=False, header=False, float_format=f'%.{precision}f', lineterminator='\n')
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'Asia/Tehran', None])
+def test_rows_match_pandas(tz):
+    df = frame(tz=tz)
+    assert format_frame(df, 5).decode() == pandas_rows(df, 5)
+
+
+@pytest.mark.parametrize('unit', ['s', 'ms', 'us'])
+def test_sub_second_dates_match_pandas(unit):
+    dates = pd.Series(pd.to_datetime([0, 1500, 86_400_250, 2_000_000], unit='ms').as_unit(unit))
+    for series in (dates, dates.dt.tz_localize('UTC')):
+        df = pd.DataFrame({'Date': series, 'Bid': [1.0, 2.0, 3.5, -0.25]})
+        assert format_frame(df, 2).decode() == pandas_rows(df, 2)
+
+
+def test_other_columns_fall_back_to_pandas():
+    df = pd.DataFrame({'Symbol': ['EURUSD', 'GBPUSD'], 'Close': [1.1, 1.2]})
+    assert format_frame(df, 3).decode() == pandas_rows(df, 3)
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_blocks_are_written_in_order(tmp_path, compression):
+    df = frame(5000)
+    writer, path = open_csv_writer(str(tmp_path / 'series.csv'), 'fast', compression, precision=5)
+    assert isinstance(writer, FastCsvWriter)
+    writer.block_rows = 700
+    writer.write(df[:2500])
+    writer.write(df[2500:])
+    writer.close()
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    expected = pd.read_csv(io.StringIO('Date,Close,Volume,Spread\n' + pandas_rows(df, 5)))
+    pd.testing.assert_frame_equal(pd.read_csv(path), expected)
+
+
+def test_zstd_output_is_one_readable_stream(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    df = frame(3000)
+    writer, path = open_csv_writer(str(tmp_path / 'series.csv'), 'pandas', 'zstd', precision=5)
+    assert path.endswith('.csv.zst') and isinstance(writer, FastCsvWriter)
+    writer.block_rows = 1000
+    writer.write(df)
+    writer.close()
+    with pa.input_stream(path, compression='zstd') as f:
+        text = f.read().decode()
+    assert text == 'Date,Close,Volume,Spread\n' + pandas_rows(df, 5)
+
+
+def test_pandas_engine_keeps_full_precision(tmp_path):
+    writer, path = open_csv_writer(str(tmp_path / 'series.csv'), compression='gzip')
+    assert path.endswith('.csv.gz') and isinstance(writer, CsvStreamWriter)
+    writer.write(pd.DataFrame({'Close': [1.123456789]}))
+    writer.close()
+    assert pd.read_csv(path)['Close'][0] == 1.123456789
+
+
+def test_abort_deletes_the_unfinished_file(tmp_path):
+    writer = FastCsvWriter(str(tmp_path / 'series.csv'), 'gzip', block_rows=100)
+    writer.write(frame(1000))
+    writer.abort()
+    assert os.listdir(tmp_path) == []
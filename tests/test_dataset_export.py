@@ -0,0 +1,57 @@
+import os
+from datetime import datetime
+import pytest
+from download_core import DownloadJob
+from exporters import PART_SUFFIX, PartitionedDatasetWriter
+from frames import rates_to_frame
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.dataset as ds  # noqa: E402
+
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def export(output, export_format, start, end):
+    """Run a job, which shuts the terminal down, so fetch any expected bars first"""
+    job = DownloadJob(['EURUSD', 'GBPUSD'], ['H1'], start, end, str(output), export_format, COLUMNS,
+                      window_days=10, export_workers=0)
+    assert job.run() is not None
+
+
+def read_series(output, export_format, symbol='EURUSD'):
+    dataset = ds.dataset(str(output / f"symbol={symbol}" / 'timeframe=H1'),
+                         format='ipc' if export_format == 'feather' else 'parquet', partitioning='hive')
+    return dataset.to_table().sort_by('Date')
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'feather'])
+def test_series_are_partitioned_by_year(mt5, tmp_path, export_format):
+    start, end = datetime(2022, 12, 1), datetime(2023, 1, 31)
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, start, end)
+    export(tmp_path, export_format, start, end)
+    folder = tmp_path / 'symbol=EURUSD' / 'timeframe=H1'
+    assert sorted(os.listdir(folder)) == ['year=2022', 'year=2023']
+    table = read_series(tmp_path, export_format)
+    assert table.schema.field('Date').type.tz == 'UTC'  # Parquet has no second unit and stores milliseconds
+    assert table.schema.field('Volume').type == pa.uint64()
+    assert table.column('Close').to_pylist() == list(rates['close'])
+
+
+def test_a_later_range_is_merged_into_the_partition(mt5, tmp_path):
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, datetime(2023, 1, 2), datetime(2023, 3, 1))
+    export(tmp_path, 'parquet', datetime(2023, 1, 2), datetime(2023, 2, 1))
+    export(tmp_path, 'parquet', datetime(2023, 1, 20), datetime(2023, 3, 1))
+    assert os.listdir(tmp_path / 'symbol=EURUSD' / 'timeframe=H1' / 'year=2023') == ['data.parquet']
+    table = read_series(tmp_path, 'parquet')
+    assert table.num_rows == len(rates)
+    assert table.column('Open').to_pylist() == list(rates['open'])
+
+
+def test_aborted_series_leaves_no_partition(mt5, tmp_path):
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, datetime(2022, 12, 20), datetime(2023, 1, 10))
+    writer = PartitionedDatasetWriter(str(tmp_path), 'EURUSD', 'H1')
+    writer.write(rates_to_frame(rates, COLUMNS))
+    writer.abort()
+    folder = tmp_path / 'symbol=EURUSD' / 'timeframe=H1'
+    assert os.listdir(folder) == ['year=2022']  # The finished year stays, the open one is gone
+    assert not any(name.endswith(PART_SUFFIX) for name in os.listdir(folder / 'year=2022'))
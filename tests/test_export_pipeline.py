@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime
+import pandas as pd
+from download_core import DownloadJob
+from export_pipeline import ExportPipeline
+
+
+class RecordingWriter:
+    """Series writer that keeps its chunks and the thread each was written on"""
+
+    def __init__(self, fail_at=None, gate=None):
+        self.chunks = []
+        self.threads = set()
+        self.fail_at = fail_at
+        self.gate = gate
+        self.closed = self.aborted = False
+
+    def write(self, df):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if len(self.chunks) == self.fail_at:
+            raise OSError('disk full')
+        self.chunks.append(int(df['n'].iloc[0]))
+        self.threads.add(threading.current_thread().name)
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+
+def chunk(number):
+    return pd.DataFrame({'n': [number]})
+
+
+def test_series_are_written_in_order_on_their_own_lane():
+    pipeline = ExportPipeline(workers=3, max_chunks=6)
+    writers = [RecordingWriter() for _ in range(4)]
+    done = []
+    wrapped = [pipeline.open(writer, on_done=done.append) for writer in writers]
+    for number in range(50):
+        for series in wrapped:
+            series.write(chunk(number))
+    for series in wrapped:
+        series.close()
+    pipeline.close()
+    assert all(writer.chunks == list(range(50)) and writer.closed for writer in writers)
+    assert all(len(writer.threads) == 1 for writer in writers)
+    assert writers[0].threads == writers[3].threads != writers[1].threads
+    assert sorted(map(id, done)) == sorted(map(id, wrapped))
+    assert [series.rows for series in wrapped] == [50] * 4
+
+
+def test_queue_is_bounded():
+    gate = threading.Event()
+    pipeline = ExportPipeline(workers=1, max_chunks=2)
+    series = pipeline.open(RecordingWriter(gate=gate))
+    queued = []
+
+    def produce():
+        for number in range(10):
+            series.write(chunk(number))
+            queued.append(number)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(0.3)
+    assert len(queued) <= 3  # One chunk being written and two waiting
+    gate.set()
+    producer.join(5)
+    series.close()
+    pipeline.close()
+    assert series.writer.chunks == list(range(10))
+
+
+def test_failed_write_drops_the_rest_and_is_reported():
+    pipeline = ExportPipeline(workers=2)
+    series = pipeline.open(RecordingWriter(fail_at=3))
+    for number in range(10):
+        series.write(chunk(number))
+    series.close()
+    pipeline.close()
+    assert isinstance(series.error, OSError)
+    assert series.writer.chunks == [0, 1, 2] and series.rows == 3
+
+
+def test_aborted_series_is_discarded():
+    pipeline = ExportPipeline(workers=1)
+    series = pipeline.open(RecordingWriter())
+    series.write(chunk(0))
+    series.abort()
+    pipeline.close()
+    assert series.writer.aborted and not series.writer.closed
+    assert series.done.is_set()
+
+
+def test_pipelined_job_writes_what_an_inline_job_writes(mt5, tmp_path):
+    start, end = datetime(2023, 1, 2), datetime(2023, 3, 1)
+    outputs = {}
+    for workers in (0, 3):
+        folder = tmp_path / f"workers{workers}"
+        folder.mkdir()
+        job = DownloadJob(['EURUSD', 'GBPUSD', 'XAUUSD'], ['H1', 'M30'], start, end, str(folder), 'csv',
+                          ['Date', 'Open', 'Close'], window_days=7, export_workers=workers)
+        outputs[workers] = job.run()
+        mt5.initialize()
+    assert outputs[0] == outputs[3] and len(outputs[3]) == 6
+    for name in sorted(p.name for p in (tmp_path / 'workers0').iterdir()):
+        assert (tmp_path / 'workers0' / name).read_bytes() == (tmp_path / 'workers3' / name).read_bytes()
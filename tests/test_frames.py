@@ -0,0 +1,76 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from download_core import DownloadJob
+from frames import TimeOutput, rate_columns, rates_to_frame, utc_dates
+
+
+@pytest.fixture
+def rates(mt5):
+    return mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, datetime(2023, 1, 2), datetime(2023, 1, 9))
+
+
+def test_columns_are_views_into_the_rates(rates):
+    df = rates_to_frame(rates, ['Date', 'Close', 'Volume'])
+    assert list(df.columns) == ['Date', 'Close', 'Volume']
+    assert np.shares_memory(df['Close'].values, rates)
+    assert np.shares_memory(df['Volume'].values, rates)
+    assert str(df['Date'].dtype) == 'datetime64[s, UTC]'
+
+
+def test_frame_matches_the_copying_conversion(rates):
+    expected = pd.DataFrame(rates).rename(columns={'time': 'Date', 'open': 'Open', 'high': 'High', 'low': 'Low',
+                                                   'close': 'Close', 'tick_volume': 'Volume',
+                                                   'spread': 'Spread', 'real_volume': 'RealVolume'})
+    expected['Date'] = pd.to_datetime(expected['Date'], unit='s', utc=True)
+    pd.testing.assert_frame_equal(rates_to_frame(rates), expected, check_dtype=False)
+
+
+def test_unknown_columns_are_skipped(rates):
+    assert list(rate_columns(rates, ['Close', 'Nope', 'Spread'])) == ['Close', 'Spread']
+
+
+def test_millisecond_dates():
+    dates = utc_dates(np.array([1672531200123], dtype=np.int64), 'ms')
+    assert dates[0] == pd.Timestamp('2023-01-01 00:00:00.123', tz='UTC')
+
+
+# 2023-01-16 12:00 and 2023-07-17 12:00 on the server clock
+SERVER_EPOCHS = np.array([1673870400, 1689595200], dtype=np.int64)
+
+
+def test_epoch_formats_are_shifted_to_real_utc():
+    assert list(TimeOutput('epoch_s').convert(SERVER_EPOCHS)) == list(SERVER_EPOCHS)
+    eet = TimeOutput('epoch_ms', server_timezone='EET')
+    assert list(eet.convert(SERVER_EPOCHS)) == [(1673870400 - 7200) * 1000, (1689595200 - 10800) * 1000]
+    assert eet.epoch_unit == 'ms' and eet.arrow_type() == 'int64'
+    assert list(TimeOutput('epoch_s').convert(SERVER_EPOCHS * 1000 + 999, unit='ms')) == list(SERVER_EPOCHS)
+
+
+def test_datetimes_in_a_named_zone_or_on_the_server_clock():
+    london = TimeOutput(timezone='Europe/London', server_timezone='EET').convert(SERVER_EPOCHS)
+    assert [str(date) for date in london] == ['2023-01-16 10:00:00+00:00', '2023-07-17 10:00:00+01:00']
+    assert TimeOutput(timezone='Europe/London').arrow_type('ms') == ('timestamp', 'ms', 'Europe/London')
+
+    server = TimeOutput(timezone='SERVER', server_timezone='EET')
+    assert server.timezone == 'server' and server.arrow_type() == ('timestamp', 's', None)
+    assert [str(date) for date in server.convert(SERVER_EPOCHS)] == ['2023-01-16 12:00:00', '2023-07-17 12:00:00']
+    assert TimeOutput().convert(SERVER_EPOCHS, naive=True).tz is None
+    assert TimeOutput(timezone=' utc ').is_default
+
+
+@pytest.mark.parametrize('options', [{'time_format': 'epoch_us'}, {'timezone': 'Mars/Olympus'},
+                                     {'server_timezone': 'server'}])
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        TimeOutput(**options)
+
+
+def test_csv_export_writes_epoch_milliseconds(mt5, tmp_path):
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, datetime(2023, 1, 2), datetime(2023, 1, 9))
+    path = str(tmp_path / 'EURUSD.csv')
+    job = DownloadJob(['EURUSD'], ['H1'], datetime(2023, 1, 2), datetime(2023, 1, 9), path, 'csv',
+                      ['Date', 'Close'], export_workers=0, time_output=TimeOutput('epoch_ms', server_timezone='EET'))
+    job.run()
+    assert list(pd.read_csv(path)['Date']) == list((rates['time'] - 7200) * 1000)
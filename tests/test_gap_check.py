@@ -0,0 +1,58 @@
+from datetime import datetime
+import numpy as np
+from gap_check import find_gaps, repair_rates
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 3, 31)
+
+
+def fetch(mt5, timeframe, start=START, end=END):
+    return mt5.copy_rates_range('EURUSD', getattr(mt5, f"TIMEFRAME_{timeframe}"), start, end)
+
+
+def test_complete_series_has_no_gaps(mt5):
+    for timeframe in ('M15', 'H1', 'W1', 'MN1'):
+        rates = fetch(mt5, timeframe)
+        report = find_gaps(rates['time'], timeframe)
+        assert report.is_complete, (timeframe, report.describe())
+        assert report.bars == len(rates)
+
+
+def test_missing_bars_are_found_but_weekends_are_not(mt5):
+    times = fetch(mt5, 'H1')['time']
+    holes = [slice(200, 230), slice(900, 901)]
+    kept = np.delete(times, np.r_[holes[0], holes[1]])
+    report = find_gaps(kept, 'H1')
+    assert list(report.missing) == list(times[holes[0]]) + list(times[holes[1]])
+    assert [(start, end, bars) for start, end, bars in report.intervals] == [
+        (int(times[200]), int(times[229]), 30), (int(times[900]), int(times[900]), 1)]
+
+
+def test_duplicated_out_of_order_and_misaligned_bars(mt5):
+    times = fetch(mt5, 'H1')['time'].copy()
+    times[[10, 11]] = times[[11, 10]]
+    times = np.insert(times, 50, times[50])
+    times = np.append(times, times[-1] + 3600 + 60)
+    report = find_gaps(times, 'H1')
+    assert report.out_of_order == 1
+    assert list(report.duplicates) == [times[50]]
+    assert list(report.misaligned) == [times[-1]]
+    assert len(report.missing) == 0
+
+
+def test_missing_weeks_and_months(mt5):
+    weeks = fetch(mt5, 'W1')['time']
+    assert list(find_gaps(np.delete(weeks, [3, 4]), 'W1').missing) == list(weeks[[3, 4]])
+    months = fetch(mt5, 'MN1', datetime(2022, 1, 1), datetime(2023, 12, 31))['time']
+    assert list(find_gaps(np.delete(months, [5, 11]), 'MN1').missing) == list(months[[5, 11]])
+
+
+def test_repair_fetches_only_the_missing_bars(mt5):
+    rates = fetch(mt5, 'H1')
+    # Holes in different hours of the week, so neither looks like a regular closing time
+    broken = np.delete(rates, np.r_[100:140, 760:765])
+    repaired, before, after, calls = repair_rates(mt5, 'EURUSD', mt5.TIMEFRAME_H1, broken)
+    assert len(before.missing) == 45
+    assert after.is_complete
+    assert calls == 2
+    np.testing.assert_array_equal(repaired, rates)
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+from download_core import DownloadJob
+from metrics import MetricsRecorder, TimedWriter, timed_chunks
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spans_are_appended_per_run(tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    recorder = MetricsRecorder(path)
+    first = recorder.start_run('first')
+    with recorder.span('fetch', 'EURUSD', 'H1') as span:
+        span.add(rows=10, nbytes=600)
+    second = recorder.start_run()
+    span = recorder.open_span('csv', 'EURUSD', 'H1')
+    span.add(rows=4)
+    span.close()
+    span.close()
+    assert [entry['stage'] for entry in recorder.spans] == ['csv']
+
+    entries = read_lines(path)
+    assert [(entry['run'], entry['stage']) for entry in entries] == [(first, 'run'), (first, 'fetch'),
+                                                                    (second, 'csv')]
+    assert entries[1]['rows'] == 10 and entries[1]['bytes'] == 600 and entries[1]['error'] is None
+    assert [entry['stage'] for entry in MetricsRecorder(path).last_run()] == ['csv']
+
+
+def test_failed_block_is_recorded_and_raised(tmp_path):
+    recorder = MetricsRecorder(None)
+    recorder.start_run()
+    with pytest.raises(ValueError):
+        with recorder.span('convert', 'EURUSD', 'M1'):
+            raise ValueError('bad chunk')
+    assert recorder.spans[0]['error'] == 'bad chunk'
+
+
+def test_totals_and_slowest_series():
+    spans = [
+        {'stage': 'fetch', 'symbol': 'EURUSD', 'timeframe': 'H1', 'seconds': 2.0, 'rows': 100, 'bytes': 10},
+        {'stage': 'csv', 'symbol': 'EURUSD', 'timeframe': 'H1', 'seconds': 1.0, 'rows': 100, 'bytes': 50},
+        {'stage': 'fetch', 'symbol': 'GBPUSD', 'timeframe': 'H1', 'seconds': 2.5, 'rows': 80, 'bytes': 8},
+    ]
+    recorder = MetricsRecorder(None)
+    assert recorder.stage_totals(spans) == {
+        'fetch': {'spans': 2, 'seconds': 4.5, 'rows': 180, 'bytes': 18},
+        'csv': {'spans': 1, 'seconds': 1.0, 'rows': 100, 'bytes': 50},
+    }
+    assert recorder.slowest_series(1, spans) == [('EURUSD H1', 3.0, {'fetch': 2.0, 'csv': 1.0})]
+
+
+def test_large_file_is_rotated(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    path.write_text('x' * 100)
+    MetricsRecorder(str(path), max_bytes=50).start_run('next')
+    assert (tmp_path / 'metrics.jsonl.1').read_text() == 'x' * 100
+    assert len(read_lines(path)) == 1
+
+
+def test_timed_chunks_and_writer_make_one_span_each(tmp_path):
+    recorder = MetricsRecorder(None)
+    recorder.start_run()
+    chunks = [np.zeros(5, dtype=[('time', 'i8')]), np.zeros(3, dtype=[('time', 'i8')])]
+    assert len(list(timed_chunks(chunks, recorder.open_span('fetch', 'EURUSD', 'H1')))) == 2
+
+    class Writer:
+        def write(self, df):
+            pass
+
+        def close(self):
+            (tmp_path / 'out.csv').write_text('12345')
+
+    writer = TimedWriter(Writer(), recorder.open_span('csv', 'EURUSD', 'H1'), str(tmp_path / 'out.csv'))
+    writer.write([1, 2, 3])
+    writer.close()
+    fetch, csv = recorder.spans
+    assert (fetch['rows'], fetch['bytes']) == (8, 64)
+    assert (csv['rows'], csv['bytes']) == (3, 5)
+
+
+def test_job_records_fetch_and_export_spans(mt5, tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    job = DownloadJob(['EURUSD', 'GBPUSD'], ['H1'], datetime(2023, 1, 2), datetime(2023, 2, 1), str(tmp_path),
+                      'csv', ['Date', 'Close'], window_days=7, export_workers=2, metrics=MetricsRecorder(path))
+    result = job.run()
+    totals = job.metrics.stage_totals()
+    assert totals['fetch']['spans'] == 2 and totals['csv']['spans'] == 2
+    assert totals['fetch']['rows'] == totals['csv']['rows'] == sum(result.values())
+    assert totals['csv']['bytes'] > 0
+    assert {entry['run'] for entry in read_lines(path)} == {job.metrics.run_id}
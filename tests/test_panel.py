@@ -0,0 +1,104 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from download_core import DownloadJob
+from frames import TimeOutput
+from panel import PanelBuilder, forward_fill, write_panel
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 1, 20)
+
+
+def panel_job(output, **options):
+    messages = []
+    job = DownloadJob(['EURUSD', 'BTCUSD'], ['H1'], START, END, str(output), 'csv', ['Date', 'Close'],
+                      window_days=7, export_workers=0, panel_field='Close', **options)
+    job.log = lambda message, level="INFO": messages.append((level, message))
+    job.error = lambda message: messages.append(('ERROR', message))
+    return job, messages
+
+
+def test_panel_without_a_csv_writer(tmp_path):
+    path = str(tmp_path / 'panel.csv')
+    values = np.array([[1.0, np.nan], [2.0, 3.0]])
+    assert write_panel(path, np.array([0, 3600]), ['A', 'B'], values) == 2
+    frame = pd.read_csv(path)
+    assert list(frame.columns) == ['Date', 'A', 'B']
+    assert frame['B'].isna().tolist() == [True, False]
+
+
+def test_panel_aligns_symbols_on_the_union_of_bar_times(mt5):
+    panel = PanelBuilder('H1')
+    for symbol in ('EURUSD', 'BTCUSD'):
+        panel.add(symbol, mt5.copy_rates_range(symbol, mt5.TIMEFRAME_H1, START, END))
+    times, columns, values = panel.build()
+    btc = mt5.copy_rates_range('BTCUSD', mt5.TIMEFRAME_H1, START, END)
+    assert np.array_equal(times, btc['time'])  # Crypto also trades over the weekend
+    assert columns == ['EURUSD', 'BTCUSD']
+    weekend = np.isnan(values[:, 0])
+    assert weekend.any() and not np.isnan(values[:, 1]).any()
+
+
+def test_forward_fill_keeps_leading_gaps():
+    values = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 5.0]])
+    filled = forward_fill(values)
+    assert np.array_equal(filled, [[np.nan, 1.0], [2.0, 1.0], [2.0, 1.0], [4.0, 5.0]], equal_nan=True)
+    assert np.isnan(values[2]).all()
+
+
+def test_ohlc_panel_has_a_column_per_symbol_and_price(mt5):
+    panel = PanelBuilder('H1', 'OHLC', ffill=True)
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, START, END)
+    panel.add('EURUSD', rates[:100])
+    panel.add('EURUSD', rates[100:])
+    panel.add('BTCUSD', mt5.copy_rates_range('BTCUSD', mt5.TIMEFRAME_H1, START, END))
+    times, columns, values = panel.build()
+    assert columns[:4] == ['EURUSD_Open', 'EURUSD_High', 'EURUSD_Low', 'EURUSD_Close']
+    assert len(columns) == 8 and not np.isnan(values[:, 4:]).any()
+    rows = np.searchsorted(times, rates['time'])
+    assert np.array_equal(values[rows, 3], rates['close'])
+    weekend = np.setdiff1d(np.arange(len(times)), rows)
+    assert np.array_equal(values[weekend, 3], values[weekend - 1, 3])
+
+
+@pytest.mark.parametrize('panel_format', ['npz', 'parquet'])
+def test_panel_formats(tmp_path, panel_format):
+    if panel_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    path = str(tmp_path / f"panel.{panel_format}")
+    times = np.array([1672653600, 1672657200])
+    values = np.array([[1.5, np.nan], [2.5, 3.5]])
+    assert write_panel(path, times, ['A', 'B'], values, panel_format, TimeOutput('epoch_ms')) == 2
+    if panel_format == 'npz':
+        with np.load(path) as data:
+            assert list(data['time']) == list(times * 1000)
+            assert list(data['columns']) == ['A', 'B']
+            assert np.array_equal(data['values'], values, equal_nan=True)
+    else:
+        frame = pd.read_parquet(path)
+        assert list(frame['Date']) == list(times * 1000)
+        assert frame['B'].isna().tolist() == [True, False]
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_job_writes_one_panel_per_timeframe(mt5, tmp_path):
+    euro = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, START, END)
+    job, messages = panel_job(tmp_path)
+    assert job.run() is not None
+    names = [name for name in os.listdir(tmp_path) if name.startswith('panel_')]
+    assert names == ['panel_H1_20230102_to_20230120.csv']
+    panel = pd.read_csv(tmp_path / names[0])
+    assert names == [name for name in os.listdir(tmp_path) if name.endswith('.csv')]  # Instead of series files
+    assert list(panel.columns) == ['Date', 'EURUSD', 'BTCUSD']
+    assert list(panel.dropna(subset=['EURUSD'])['EURUSD']) == list(euro['close'])
+    assert ('INFO', "Download completed successfully") in messages
+
+
+def test_failed_panel_is_not_reported_as_success(mt5, tmp_path):
+    job, messages = panel_job(tmp_path)
+    os.mkdir(job.panel_filename('H1'))  # A folder in the way of the panel file
+    job.run()
+    assert any(level == 'ERROR' and 'H1 panel' in message for level, message in messages)
+    assert ('INFO', "Download completed successfully") not in messages
@@ -0,0 +1,31 @@
+import os
+from datetime import datetime
+from download_core import DownloadJob
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 2, 15)
+
+
+def run_job(output, **options):
+    output.mkdir()
+    job = DownloadJob(['EURUSD', 'GBPUSD', 'XAUUSD', 'NOPE'], ['M15', 'H1', 'D1'], START, END, str(output), 'csv',
+                      ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'], window_days=5, export_workers=0,
+                      mt5_module='fake_mt5', **options)
+    return job.run()
+
+
+def test_parallel_output_matches_sequential(mt5, tmp_path):
+    for options in ({}, {'derive_timeframes': True}):
+        name = 'derived' if options else 'fetched'
+        sequential = run_job(tmp_path / f"{name}_sequential", **options)
+        parallel = run_job(tmp_path / f"{name}_parallel", terminal_paths=['a', 'b'], **options)
+        assert sequential is not None and parallel is not None
+        assert sorted(sequential) == sorted(parallel)
+        names = sorted(os.listdir(tmp_path / f"{name}_sequential"))
+        assert len(names) == 9
+        assert names == sorted(os.listdir(tmp_path / f"{name}_parallel"))
+        for file_name in names:
+            with open(tmp_path / f"{name}_sequential" / file_name, 'rb') as f:
+                expected = f.read()
+            with open(tmp_path / f"{name}_parallel" / file_name, 'rb') as f:
+                assert f.read() == expected, file_name
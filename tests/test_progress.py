@@ -0,0 +1,63 @@
+from datetime import datetime
+from download_core import DownloadJob
+from progress import DownloadProgress, expected_bars
+
+START, END = datetime(2023, 1, 1), datetime(2023, 1, 31)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_expected_bars_scale_with_the_timeframe():
+    assert expected_bars('D1', START, END) == 31
+    assert expected_bars('H1', START, END) == 30 * 24 + 1
+    assert expected_bars('Ticks', START, END) == expected_bars('M1', START, END)
+    assert expected_bars('MN1', START, END) == 2
+
+
+def test_progress_is_weighted_by_bars():
+    clock = Clock()
+    progress = DownloadProgress(START, END, clock)
+    progress.add('daily', 'D1')
+    progress.add('hourly', 'H1')
+    progress.finish('daily')
+    assert progress.snapshot()['percent'] == 4  # 31 of 752 expected bars
+
+    clock.now = 10.0
+    progress.advance('hourly', bars=330)
+    snapshot = progress.snapshot()
+    assert snapshot['percent'] == 48
+    assert snapshot['bars'] == 330 and snapshot['bars_per_second'] == 33.0
+    assert 10 < snapshot['eta_seconds'] < 11
+
+
+def test_tasks_never_go_backwards_or_past_their_weight():
+    progress = DownloadProgress(START, END, Clock())
+    progress.add('ticks', 'Ticks')
+    progress.advance('ticks', fraction=0.5)
+    progress.advance('ticks', fraction=0.25)
+    assert progress.fraction() == 0.5
+    progress.advance('ticks', bars=10 ** 9)
+    assert progress.fraction() == 1.0
+    assert progress.snapshot()['eta_seconds'] == 0.0
+
+
+def test_eta_is_unknown_before_anything_arrives():
+    progress = DownloadProgress(START, END, Clock())
+    progress.add('hourly', 'H1')
+    assert progress.snapshot() == {'percent': 0, 'bars': 0, 'bars_per_second': 0.0, 'eta_seconds': None}
+
+
+def test_job_reports_rising_progress_up_to_done(mt5, tmp_path):
+    snapshots = []
+    job = DownloadJob(['EURUSD', 'GBPUSD'], ['H1', 'M15'], START, END, str(tmp_path), 'csv', ['Date', 'Close'],
+                      window_days=5, export_workers=0, progress=snapshots.append, progress_interval=0)
+    result = job.run()
+    percents = [snapshot['percent'] for snapshot in snapshots]
+    assert percents == sorted(percents) and percents[-1] == 100
+    assert snapshots[-1]['bars'] == sum(result.values())
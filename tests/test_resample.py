@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from bar_cache import to_epoch
+from mt5_fetch import split_rates
+from resample import RateAggregator, aggregate_rates, bucket_starts, derive_plan
+
+
+def fetch(mt5, timeframe, start=datetime(2022, 11, 14), end=datetime(2023, 4, 10)):
+    return mt5.copy_rates_range('EURUSD', getattr(mt5, f"TIMEFRAME_{timeframe}"), start, end)
+
+
+def test_week_buckets_open_on_sunday():
+    times = [to_epoch(datetime(2023, 1, day, hour)) for day, hour in [(1, 0), (4, 12), (7, 23), (8, 0)]]
+    starts = bucket_starts(times, 'W1')
+    expected = [datetime(2023, 1, 1), datetime(2023, 1, 1), datetime(2023, 1, 1), datetime(2023, 1, 8)]
+    assert list(starts) == [to_epoch(day) for day in expected]
+
+
+def test_month_buckets_open_on_the_first():
+    times = [to_epoch(datetime(2023, 1, 31, 23, 59)), to_epoch(datetime(2023, 2, 1)), to_epoch(datetime(2024, 2, 29))]
+    starts = bucket_starts(times, 'MN1')
+    assert list(starts) == [to_epoch(datetime(2023, 1, 1)), to_epoch(datetime(2023, 2, 1)),
+                            to_epoch(datetime(2024, 2, 1))]
+
+
+def test_bars_combine_open_high_low_close_and_volume(mt5):
+    rates = np.zeros(6, dtype=mt5.RATES_DTYPE)
+    rates['time'] = to_epoch(datetime(2023, 1, 2)) + np.arange(6) * 900 + np.array([0, 0, 0, 0, 3600, 3600])
+    rates['open'] = [1, 2, 3, 4, 5, 6]
+    rates['high'] = [5, 9, 4, 6, 7, 8]
+    rates['low'] = [0.5, 1, 2, 0.1, 4, 3]
+    rates['close'] = [2, 3, 4, 5, 6, 7]
+    rates['tick_volume'] = [10, 20, 30, 40, 50, 60]
+    rates['spread'] = [3, 1, 2, 5, 4, 6]
+    bars = aggregate_rates(rates, 'H1')
+    assert list(bars['time']) == [to_epoch(datetime(2023, 1, 2)), to_epoch(datetime(2023, 1, 2, 2))]
+    assert list(bars['open']) == [1, 5]
+    assert list(bars['high']) == [9, 8]
+    assert list(bars['low']) == [0.1, 3]
+    assert list(bars['close']) == [5, 7]
+    assert list(bars['tick_volume']) == [100, 110]
+    assert list(bars['spread']) == [1, 4]
+
+
+@pytest.mark.parametrize('target', ['H1', 'H4', 'D1', 'W1', 'MN1'])
+def test_derived_bars_match_the_terminal(mt5, target):
+    start, end = datetime(2023, 1, 1), datetime(2023, 3, 31, 23, 59)
+    derived = aggregate_rates(fetch(mt5, 'M15', start, end), target)
+    np.testing.assert_array_equal(derived, fetch(mt5, target, start, end))
+
+
+@pytest.mark.parametrize('target', ['W1', 'MN1'])
+def test_week_and_month_bars_are_aligned(mt5, target):
+    derived = aggregate_rates(fetch(mt5, 'H1'), target)
+    opens = derived['time'].astype('datetime64[s]')
+    if target == 'W1':
+        # 1970-01-01 was a Thursday, so Sunday is weekday 3 counted from it
+        assert (((opens.astype('datetime64[D]').astype(np.int64)) - 3) % 7 == 0).all()
+    else:
+        assert (opens == opens.astype('datetime64[M]')).all()
+    assert (np.diff(derived['time']) > 0).all()
+
+
+@pytest.mark.parametrize('target', ['H4', 'D1', 'W1', 'MN1'])
+@pytest.mark.parametrize('days', [1, 3, 10])
+def test_windowed_aggregation_matches_whole_series(mt5, target, days):
+    rates = fetch(mt5, 'M15')
+    aggregator = RateAggregator(target)
+    parts = [aggregator.add(window) for window in split_rates(rates, timedelta(days=days))]
+    parts.append(aggregator.flush())
+    windowed = np.concatenate([part for part in parts if part is not None])
+    np.testing.assert_array_equal(windowed, aggregate_rates(rates, target))
+
+
+def test_derive_plan_uses_the_finest_timeframe():
+    assert derive_plan(['D1', 'M15', 'MN1', 'H1']) == {'M15': ['H1', 'D1', 'MN1']}
+    assert derive_plan(['W1', 'MN1']) == {'W1': [], 'MN1': []}
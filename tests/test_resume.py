@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+import pandas as pd
+from download_core import DownloadJob
+from exporters import PART_SUFFIX
+from frames import TimeOutput
+from job_manifest import MANIFEST_PREFIX
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 3, 1)
+
+
+def make_job(output, **options):
+    return DownloadJob(['EURUSD'], ['H1'], START, END, str(output), 'csv', ['Date', 'Open', 'Close'],
+                       window_days=7, export_workers=0, **options)
+
+
+def manifest_key(output, **options):
+    job = make_job(output, **options)
+    job.open_manifest()
+    return job.manifest.key
+
+
+def test_manifest_key_is_stable(mt5, tmp_path):
+    assert manifest_key(tmp_path) == manifest_key(tmp_path)
+
+
+def test_manifest_key_follows_time_output(mt5, tmp_path):
+    keys = {
+        manifest_key(tmp_path),
+        manifest_key(tmp_path, time_output=TimeOutput('epoch_ms')),
+        manifest_key(tmp_path, time_output=TimeOutput(timezone='Europe/London')),
+        manifest_key(tmp_path, time_output=TimeOutput(server_timezone='EET')),
+    }
+    assert len(keys) == 4
+
+
+def test_stopped_series_leaves_no_file(mt5, tmp_path):
+    output = tmp_path / 'out'
+    output.mkdir()
+    job = make_job(output, progress_interval=0)
+    job.progress = lambda snapshot: job.stop() if snapshot['bars'] else None
+    assert job.run() is None
+    assert [name for name in os.listdir(output) if not name.startswith(MANIFEST_PREFIX)] == []
+    assert not any(name.endswith(PART_SUFFIX) for name in os.listdir(output))
+
+
+def test_stopped_job_resumes_to_the_full_series(mt5, tmp_path):
+    stopped = tmp_path / 'stopped'
+    complete = tmp_path / 'complete'
+    stopped.mkdir()
+    complete.mkdir()
+    job = make_job(stopped, progress_interval=0)
+    job.progress = lambda snapshot: job.stop() if snapshot['bars'] else None
+    job.run()
+    assert make_job(stopped).run() is not None
+    assert make_job(complete).run() is not None
+
+    names = os.listdir(complete)
+    assert sorted(os.listdir(stopped)) == sorted(names)
+    resumed = pd.read_csv(stopped / names[0])
+    assert len(resumed) > 0
+    assert resumed.equals(pd.read_csv(complete / names[0]))
+
+
+def test_unknown_symbol_does_not_keep_the_manifest(mt5, tmp_path):
+    for terminals in ([], ['a', 'b']):
+        output = tmp_path / f"out{len(terminals)}"
+        output.mkdir()
+        job = DownloadJob(['EURUSD', 'NOPE'], ['H1', 'H4'], START, END, str(output), 'csv', ['Date', 'Close'],
+                          window_days=7, export_workers=0, terminal_paths=terminals, mt5_module='fake_mt5')
+        assert job.run() is not None
+        names = os.listdir(output)
+        assert not any(name.startswith(MANIFEST_PREFIX) for name in names), terminals
+        assert len(names) == 2
+
+
+def test_workbook_series_are_replayed_from_their_staged_chunks(mt5, tmp_path):
+    stopped = tmp_path / 'stopped.xlsx'
+    complete = tmp_path / 'complete.xlsx'
+    job = DownloadJob(['EURUSD', 'GBPUSD'], ['H1'], START, END, str(stopped), 'xlsx', ['Date', 'Close'],
+                      window_days=7, export_workers=0, progress_interval=0)
+    job.progress = lambda snapshot: job.stop() if snapshot['bars'] > 1500 else None
+    job.run()
+    assert not stopped.exists()
+    stages = [name for name in os.listdir(tmp_path) if name.startswith(MANIFEST_PREFIX) and not name.endswith('.json')]
+    assert len(stages) == 1
+    assert len(os.listdir(tmp_path / stages[0] / 'EURUSD_H1')) > 1
+
+    for path in (stopped, complete):
+        DownloadJob(['EURUSD', 'GBPUSD'], ['H1'], START, END, str(path), 'xlsx', ['Date', 'Close'],
+                    window_days=7, export_workers=0).run()
+    resumed = pd.read_excel(stopped, sheet_name=None)
+    assert resumed.keys() == pd.read_excel(complete, sheet_name=None).keys()
+    for name, sheet in pd.read_excel(complete, sheet_name=None).items():
+        assert resumed[name].equals(sheet), name
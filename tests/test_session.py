@@ -0,0 +1,75 @@
+import threading
+import pytest
+import fake_mt5
+from mt5_session import MT5Session, MT5SessionError
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """A session on the fake terminal that counts initialize() calls and does not sleep between retries"""
+    initialize = fake_mt5.initialize
+    calls = []
+    monkeypatch.setattr(fake_mt5, 'initialize', lambda **kwargs: calls.append(kwargs) or initialize(**kwargs))
+    session = MT5Session(mt5_module='fake_mt5', backoff=0, log=lambda message, level: None)
+    session.initialize_calls = calls
+    yield session
+    session.close()
+    fake_mt5.configure(connect_failures=0)
+
+
+def test_connection_is_opened_once(session):
+    for _ in range(3):
+        with session.acquire() as mt5:
+            assert mt5.account_info().server == 'FakeBroker-Demo'
+    assert len(session.initialize_calls) == 1
+
+
+def test_lost_terminal_is_reconnected(session):
+    with session.acquire():
+        pass
+    fake_mt5.shutdown()  # The terminal was closed behind the session's back
+    with session.acquire() as mt5:
+        assert mt5.terminal_info() is not None
+    assert len(session.initialize_calls) == 2
+
+
+def test_failed_attempts_are_retried(session):
+    fake_mt5.configure(connect_failures=2)
+    with session.acquire() as mt5:
+        assert mt5.terminal_info() is not None
+    assert len(session.initialize_calls) == 3
+
+
+def test_giving_up_reports_the_last_error(session):
+    fake_mt5.configure(connect_failures=5)
+    with pytest.raises(MT5SessionError, match='MetaTrader 5 x64 not found'):
+        session.ensure()
+    assert len(session.initialize_calls) == session.retries
+
+
+def test_switching_terminals_reconnects(session):
+    session.ensure()
+    session.configure('C:\\Other\\terminal64.exe')
+    session.ensure()
+    assert session.initialize_calls[-1] == {'path': 'C:\\Other\\terminal64.exe'}
+    assert session.connected_path == 'C:\\Other\\terminal64.exe'
+
+
+def test_busy_connection_times_out(session):
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with session.acquire():
+            held.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    held.wait(5)
+    try:
+        with pytest.raises(MT5SessionError, match='busy'):
+            with session.acquire(timeout=0.05):
+                pass
+    finally:
+        release.set()
+        worker.join()
@@ -0,0 +1,68 @@
+import json
+import pytest
+from symbol_catalog import SymbolCatalog
+
+
+@pytest.fixture
+def counted(mt5, monkeypatch):
+    """The fake module with ``symbols_get`` calls counted in ``mt5.symbol_loads``"""
+    symbols_get = mt5.symbols_get
+    calls = []
+    monkeypatch.setattr(mt5, 'symbols_get', lambda group=None: calls.append(group) or symbols_get(group))
+    monkeypatch.setattr(mt5, 'symbol_loads', calls, raising=False)
+    return mt5
+
+
+def test_names_resolve_in_any_case_with_cached_fields(counted, tmp_path):
+    catalog = SymbolCatalog(str(tmp_path / 'catalog.json'))
+    assert catalog.ensure(counted) == 'FakeBroker-Demo'
+    assert catalog.resolve('eurusd') == 'EURUSD'
+    assert catalog.resolve('EurUsd', counted) == 'EURUSD'
+    assert catalog.info('xauusd')['digits'] == 2
+    assert catalog.info('xauusd')['path'] == 'Metals\\XAUUSD'
+    assert catalog.invalid(['usdjpy', 'NOPE']) == ['NOPE']
+    assert len(catalog) == 8 and 'BTCUSD' in catalog.watchlist()
+    assert len(counted.symbol_loads) == 1
+
+
+def test_fresh_catalog_on_disk_is_used_without_mt5(counted, tmp_path):
+    path = str(tmp_path / 'catalog.json')
+    SymbolCatalog(path).ensure(counted)
+    catalog = SymbolCatalog(path)
+    catalog.ensure(counted)
+    assert catalog.resolve('gbpjpy') == 'GBPJPY'
+    assert len(counted.symbol_loads) == 1
+
+
+def test_stale_catalog_is_refreshed(counted, tmp_path):
+    path = str(tmp_path / 'catalog.json')
+    SymbolCatalog(path).ensure(counted)
+    with open(path) as f:
+        data = json.load(f)
+    data['servers']['FakeBroker-Demo']['updated'] -= 7 * 3600
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    catalog = SymbolCatalog(path)
+    assert catalog.is_stale('FakeBroker-Demo')
+    catalog.ensure(counted)
+    assert not catalog.is_stale() and len(counted.symbol_loads) == 2
+
+
+def test_new_symbol_refreshes_a_loaded_catalog_once(counted, tmp_path, monkeypatch):
+    path = str(tmp_path / 'catalog.json')
+    SymbolCatalog(path).ensure(counted)
+    monkeypatch.setitem(counted._symbols, 'NEW50', (100.0, 2, 10, False, 'Indices'))
+    catalog = SymbolCatalog(path)
+    catalog.ensure(counted)
+    assert catalog.resolve('new50') is None
+    assert catalog.resolve('new50', counted) == 'NEW50'
+    assert catalog.resolve('gone', counted) is None
+    assert len(counted.symbol_loads) == 2
+
+
+def test_unreadable_file_means_an_empty_catalog(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text('{"servers": ')
+    catalog = SymbolCatalog(str(path))
+    assert catalog.resolve('EURUSD') is None
+    assert catalog.is_stale('FakeBroker-Demo')
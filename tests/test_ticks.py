@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from tick_data import TickTarget, stream_ticks
+
+START, END = datetime(2023, 1, 3, 9), datetime(2023, 1, 3, 15)
+
+
+def target(tmp_path, export_format='csv', **options):
+    return TickTarget(str(tmp_path / 'EURUSD_ticks.csv'), export_format, START, END, True, **options)
+
+
+def test_windows_are_written_as_one_gzip_stream(mt5, tmp_path):
+    ticks = mt5.copy_ticks_range('EURUSD', START, END, mt5.COPY_TICKS_ALL)
+    seen = []
+    mt5.reset_stats()
+    rows, path = stream_ticks(mt5, 'EURUSD', target(tmp_path), window=timedelta(hours=1),
+                              progress=lambda written, last: seen.append(written))
+    assert mt5.stats()['calls'] == 6
+    assert rows == len(ticks) and seen[-1] == rows and len(seen) == 6
+    assert path.endswith('.csv.gz')
+    stored = pd.read_csv(path)
+    assert list(stored['Bid']) == list(ticks['bid'])
+    dates = pd.to_datetime(stored['Date'], format='ISO8601')
+    assert (dates == pd.to_datetime(ticks['time_msc'], unit='ms', utc=True)).all()
+
+
+def test_fast_engine_writes_the_symbol_digits(mt5, tmp_path):
+    ticks = mt5.copy_ticks_range('EURUSD', START, START + timedelta(minutes=30), mt5.COPY_TICKS_ALL)
+    tick_target = TickTarget(str(tmp_path / 'ticks.csv'), 'csv', START, START + timedelta(minutes=30), True,
+                             csv_engine='fast', csv_compression=None, digits={'EURUSD': 5})
+    rows, path = stream_ticks(mt5, 'EURUSD', tick_target, window=timedelta(minutes=10))
+    with open(path) as f:
+        f.readline()
+        assert len(f.readline().split(',')[1].split('.')[1]) == 5
+    assert np.allclose(pd.read_csv(path)['Ask'], ticks['ask'])
+
+
+def test_stopped_download_leaves_no_file(mt5, tmp_path):
+    windows = []
+    rows, _ = stream_ticks(mt5, 'EURUSD', target(tmp_path), window=timedelta(hours=1),
+                           should_continue=lambda: windows.append(1) or len(windows) <= 2)
+    assert rows > 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_no_ticks_writes_nothing(mt5, tmp_path):
+    saturday = datetime(2023, 1, 7, 10)
+    tick_target = TickTarget(str(tmp_path / 'ticks.csv'), 'csv', saturday, saturday + timedelta(hours=3), True)
+    assert stream_ticks(mt5, 'EURUSD', tick_target) == (0, None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_dataset_keeps_millisecond_times(mt5, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+    ticks = mt5.copy_ticks_range('EURUSD', START, END, mt5.COPY_TICKS_ALL)
+    rows, path = stream_ticks(mt5, 'EURUSD', target(tmp_path, 'parquet'), window=timedelta(hours=2))
+    table = ds.dataset(path, format='parquet', partitioning='hive').to_table().sort_by('Date')
+    assert table.schema.field('Date').type == pa.timestamp('ms', tz='UTC')
+    assert table.num_rows == rows == len(ticks)
+    assert table.column('Ask').to_pylist() == list(ticks['ask'])
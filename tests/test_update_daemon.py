@@ -0,0 +1,109 @@
+import os
+from datetime import datetime
+import pandas as pd
+import pytest
+from frames import rates_to_frame
+from exporters import PartitionedDatasetWriter
+from update_daemon import CsvSeriesStore, DatasetSeriesStore, UpdateDaemon
+
+COLUMNS = ['Date', 'Open', 'Close', 'Volume']
+
+
+@pytest.fixture
+def bars(mt5):
+    rates = mt5.copy_rates_range('EURUSD', mt5.TIMEFRAME_H1, datetime(2023, 1, 2), datetime(2023, 3, 31))
+    return rates, rates_to_frame(rates, COLUMNS)
+
+
+def epoch(rates, index):
+    return int(rates['time'][index])
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'fast'])
+def test_csv_is_truncated_at_the_first_replaced_row(bars, tmp_path, engine):
+    rates, frame = bars
+    store = CsvSeriesStore(str(tmp_path / 'EURUSD_H1.csv'), engine, precision=5)
+    store.replace_from(epoch(rates, 0), frame[:300])
+    assert store.tail(3) == [epoch(rates, i) for i in (297, 298, 299)]
+
+    store.replace_from(epoch(rates, 297), frame[297:500])
+    stored = pd.read_csv(store.path)
+    assert len(stored) == 500
+    assert list(stored['Close']) == list(frame['Close'][:500])
+    assert store.tail(1) == [epoch(rates, 499)]
+
+
+def test_csv_drops_an_interrupted_last_line(bars, tmp_path):
+    rates, frame = bars
+    store = CsvSeriesStore(str(tmp_path / 'EURUSD_H1.csv'))
+    store.replace_from(epoch(rates, 0), frame[:200])
+    with open(store.path, 'ab') as f:
+        f.write(b'2023-01-0')
+    assert store.tail(1) == [epoch(rates, 199)]
+
+    store.replace_from(epoch(rates, 200), frame[200:250])
+    stored = pd.read_csv(store.path)
+    assert len(stored) == 250
+    assert list(stored['Open']) == list(frame['Open'][:250])
+
+
+def dataset_rows(store):
+    files = [path for year in sorted(store.year_dirs().values()) for path in store.files(year)]
+    frame = pd.concat([store.read(path).to_pandas() for path in files], ignore_index=True)
+    return frame.sort_values('Date', ignore_index=True)
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'feather'])
+def test_dataset_updates_go_to_a_small_update_file(bars, tmp_path, export_format):
+    pytest.importorskip('pyarrow')
+    rates, frame = bars
+    writer = PartitionedDatasetWriter(str(tmp_path), 'EURUSD', 'H1', export_format)
+    writer.write(frame[:400])
+    writer.close()
+    store = DatasetSeriesStore(str(tmp_path), 'EURUSD', 'H1', export_format, compact_rows=100)
+
+    for start in (398, 440, 490, 545):
+        store.replace_from(epoch(rates, start), frame[start:start + 60])
+    stored = dataset_rows(store)
+    assert len(stored) == 605
+    assert list(stored['Close']) == list(frame['Close'][:605])
+    year = store.year_dirs()[2023]
+    updates = [os.path.basename(path) for path in store.files(year) if 'update-' in path]
+    assert len(updates) == 2  # The first reached compact_rows, so a second one was started
+
+
+def test_dataset_files_before_the_cut_are_not_read_in_full(bars, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    rates, frame = bars
+    writer = PartitionedDatasetWriter(str(tmp_path), 'EURUSD', 'H1', 'parquet')
+    writer.write(frame[:400])
+    writer.close()
+    store = DatasetSeriesStore(str(tmp_path), 'EURUSD', 'H1', 'parquet')
+    store.replace_from(epoch(rates, 400), frame[400:420])
+
+    full_reads = []
+    read = store.read
+
+    def counted_read(path, columns=None):
+        if columns is None:
+            full_reads.append(os.path.basename(path))
+        return read(path, columns)
+
+    monkeypatch.setattr(store, 'read', counted_read)
+    store.replace_from(epoch(rates, 418), frame[418:440])
+    assert all(name.startswith('update-') for name in full_reads)
+    assert len(dataset_rows(store)) == 440
+
+
+def test_top_up_only_adds_new_bars(mt5, tmp_path):
+    daemon = UpdateDaemon(['EURUSD'], ['H4'], str(tmp_path), columns=COLUMNS, bootstrap_days=20,
+                          session=object())
+    store = daemon.store('EURUSD', 'H4')
+    fetched, new = daemon.top_up(mt5, 'EURUSD', 'H4', mt5.TIMEFRAME_H4)
+    assert fetched == new > 0
+    first = pd.read_csv(store.path)
+
+    fetched, new = daemon.top_up(mt5, 'EURUSD', 'H4', mt5.TIMEFRAME_H4)
+    assert fetched == daemon.overlap and new == 0
+    again = pd.read_csv(store.path)
+    assert again.equals(first)
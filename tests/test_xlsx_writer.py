@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+from xlsx_writer import XlsxStreamWriter, sheet_title
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def frame(rows, start=0):
+    dates = pd.date_range('2023-01-02', periods=rows + start, freq='h', tz='UTC')[start:]
+    return pd.DataFrame({'Date': dates, 'Close': np.arange(start, start + rows) / 8, 'Volume': np.arange(start, start + rows),
+                         'Note': ['a<b&c'] * rows})
+
+
+def sheets(path):
+    return pd.read_excel(path, sheet_name=None)
+
+
+def test_chunks_are_written_as_whole_rows(tmp_path):
+    path = str(tmp_path / 'book.xlsx')
+    writer = XlsxStreamWriter(path)
+    writer.write('EURUSD_H1', frame(30))
+    writer.write('EURUSD_H1', frame(20, start=30))
+    writer.write('GBPUSD_H1', frame(5))
+    assert writer.close() == [path]
+
+    book = sheets(path)
+    assert list(book) == ['EURUSD_H1', 'GBPUSD_H1']
+    expected = frame(50)
+    expected['Date'] = expected['Date'].dt.tz_localize(None)
+    pd.testing.assert_frame_equal(book['EURUSD_H1'], expected, check_dtype=False)
+    assert not [name for name in os.listdir(tmp_path) if name != 'book.xlsx']
+
+
+def test_long_series_continue_on_numbered_sheets(tmp_path):
+    path = str(tmp_path / 'book.xlsx')
+    writer = XlsxStreamWriter(path, max_rows=11)
+    writer.write('EURUSD_H1', frame(15))
+    writer.write('EURUSD_H1', frame(10, start=15))
+    writer.close()
+    book = sheets(path)
+    assert list(book) == ['EURUSD_H1', 'EURUSD_H1_2', 'EURUSD_H1_3']
+    assert [len(sheet) for sheet in book.values()] == [10, 10, 5]
+    assert list(pd.concat(book.values())['Volume']) == list(range(25))
+
+
+def test_rollover_to_numbered_workbooks(tmp_path):
+    path = str(tmp_path / 'series.xlsx')
+    writer = XlsxStreamWriter(path, rollover='workbooks', max_rows=11)
+    writer.write('EURUSD_H1', frame(25))
+    files = writer.close()
+    assert [os.path.basename(name) for name in files] == ['series.xlsx', 'series_2.xlsx', 'series_3.xlsx']
+    books = [sheets(name) for name in files]
+    assert [list(book) for book in books] == [['EURUSD_H1'], ['EURUSD_H1_2'], ['EURUSD_H1_3']]
+    assert [len(sheet) for book in books for sheet in book.values()] == [10, 10, 5]
+
+
+def test_rendering_on_an_executor_keeps_the_row_order(tmp_path):
+    path = str(tmp_path / 'book.xlsx')
+    with ThreadPoolExecutor(4) as executor:
+        writer = XlsxStreamWriter(path, executor=executor, max_pending=2)
+        for start in range(0, 200, 10):
+            writer.write('EURUSD_H1', frame(10, start=start))
+        writer.close()
+    assert list(sheets(path)['EURUSD_H1']['Close']) == list(np.arange(200) / 8)
+
+
+def test_abort_leaves_nothing(tmp_path):
+    writer = XlsxStreamWriter(str(tmp_path / 'book.xlsx'))
+    writer.write('EURUSD_H1', frame(10))
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_sheet_titles_fit_excel():
+    assert sheet_title('A' * 40, 12) == 'A' * 28 + '_12'
+    assert sheet_title('EUR/USD:[x]') == 'EUR_USD__x_'
+
+
+def test_missing_values_are_left_empty(tmp_path):
+    path = str(tmp_path / 'book.xlsx')
+    data = frame(3)
+    data.loc[1, 'Close'] = np.nan
+    writer = XlsxStreamWriter(path)
+    writer.write('EURUSD_H1', data)
+    writer.close()
+    sheet = openpyxl.load_workbook(path)['EURUSD_H1']
+    assert sheet['B3'].value is None
+    assert sheet['A2'].value == datetime(2023, 1, 2)
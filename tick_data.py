@@ -0,0 +1,112 @@
+"""Streaming tick-history download.
+
+Ticks are 100-1000x more numerous than M1 bars, so they never go through the
+DataFrame-then-export flow used for bars: each ``copy_ticks_range`` window is
+converted and written to disk as soon as it arrives, and nothing is kept for
+the chart. Parquet/Feather exports write a zstd-compressed dataset; CSV and
+Excel exports write a gzip- (or zstd-) compressed CSV (Excel cannot hold
+tick volumes).
+"""
+import logging
+from datetime import timedelta
+import pandas as pd
+from mt5_constants import TICKS
+from mt5_fetch import iter_tick_windows
+from frames import TimeOutput, record_columns
+from exporters import DATASET_FORMATS, ARROW_COLUMN_TYPES, PartitionedDatasetWriter, dataset_root, series_filename
+from csv_writer import open_csv_writer
+
+# Ticks keep millisecond timestamps; the bar schema stores whole seconds
+TICK_ARROW_COLUMN_TYPES = {
+    **ARROW_COLUMN_TYPES,
+    'Date': ('timestamp', 'ms', 'UTC'),
+    'Bid': 'float64',
+    'Ask': 'float64',
+    'Last': 'float64',
+    'Flags': 'uint32',
+    'VolumeReal': 'float64',
+}
+
+TICK_FIELD_NAMES = {
+    'bid': 'Bid', 'ask': 'Ask', 'last': 'Last', 'volume': 'Volume',
+    'flags': 'Flags', 'volume_real': 'VolumeReal',
+}
+
+DEFAULT_TICK_WINDOW = timedelta(days=1)
+
+
+def ticks_to_frame(ticks, time_output=None):
+    """DataFrame over an MT5 ticks array with display column names (columns are views, see ``frames``)"""
+    names = ['Date'] + list(TICK_FIELD_NAMES.values())
+    fields = {'Date': 'time_msc', **{name: field for field, name in TICK_FIELD_NAMES.items()}}
+    return pd.DataFrame(record_columns(ticks, names, fields, 'time_msc', date_unit='ms', time_output=time_output),
+                        copy=False)
+
+
+class TickTarget:
+    """Where and how the ticks of one symbol are written.
+
+    Plain data only, so it can be handed to a terminal worker process.
+    """
+
+    def __init__(self, output_file, export_format, start_dt, end_dt, single, csv_engine='pandas',
+                 csv_compression='gzip', csv_precision=None, digits=None, time_output=None):
+        self.output_file = output_file
+        self.export_format = export_format
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.single = single
+        self.csv_engine = csv_engine
+        self.csv_compression = csv_compression
+        self.csv_precision = csv_precision
+        self.digits = digits or {}  # Symbol -> price digits, the default fast-engine precision
+        self.time_output = time_output or TimeOutput()
+
+    def open(self, symbol):
+        """Return (writer, target) for the ticks of `symbol`"""
+        if self.export_format in DATASET_FORMATS:
+            column_types = {**TICK_ARROW_COLUMN_TYPES, 'Date': self.time_output.arrow_type('ms')}
+            writer = PartitionedDatasetWriter(dataset_root(self.output_file), symbol, TICKS, self.export_format,
+                                              column_types=column_types, epoch_unit=self.time_output.epoch_unit)
+            return writer, writer.series_dir()
+        filename = series_filename(self.output_file, symbol, TICKS, self.start_dt, self.end_dt, 'csv',
+                                   self.single)
+        precision = self.csv_precision if self.csv_precision is not None else self.digits.get(symbol)
+        return open_csv_writer(filename, self.csv_engine, self.csv_compression, precision)
+
+
+def stream_ticks(mt5_module, symbol, target, window=None, should_continue=None, log=None, progress=None):
+    """Download the ticks of `symbol` window by window straight into `target`.
+
+    `progress(rows, last_epoch)` is called after every written window.
+    Returns (rows, path); path is None when no ticks were returned. A
+    stopped or failed download deletes its unfinished file.
+    """
+    log = log or (lambda message, level: logging.log(logging.getLevelName(level), message))
+    flags = getattr(mt5_module, 'COPY_TICKS_ALL', -1)
+    writer = None
+    path = None
+    rows = 0
+    finished = False
+    try:
+        chunks = iter_tick_windows(
+            lambda start, end: mt5_module.copy_ticks_range(symbol, start, end, flags),
+            target.start_dt, target.end_dt, window or DEFAULT_TICK_WINDOW, should_continue=should_continue
+        )
+        for ticks in chunks:
+            if writer is None:
+                writer, path = target.open(symbol)
+            writer.write(ticks_to_frame(ticks, target.time_output))
+            rows += len(ticks)
+            if progress is not None:
+                progress(rows, int(ticks['time_msc'][-1]) / 1000)
+            log(f"{symbol} ticks: {rows} written, up to {pd.to_datetime(int(ticks['time_msc'][-1]), unit='ms')}",
+                "INFO")
+        finished = should_continue is None or should_continue()
+    finally:
+        if writer is not None:
+            if finished:
+                writer.close()
+            else:
+                writer.abort()
+    return rows, path
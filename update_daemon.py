@@ -0,0 +1,463 @@
+"""Scheduled incremental updates that keep a local dataset current.
+
+Instead of re-downloading a preset by hand every day, run:
+
+    python update_daemon.py --preset Majors --timeframes M1,H1 --format parquet --output data/ --every 15
+    python update_daemon.py --config dataset.json --once
+
+Every `every` minutes each symbol/timeframe series is topped up. MT5 is
+only asked for bars from the `overlap`-th last stored bar onwards, because
+the broker may still revise the latest bars and the last one is usually
+still forming. Those bars are replaced and new ones appended without
+rewriting the rest of the output:
+
+* CSV (``<output>/<SYMBOL>_<TF>.csv``): the file is truncated at the first
+  replaced row and the new rows are appended.
+* Parquet/Feather (the Hive layout of ``exporters.PartitionedDatasetWriter``):
+  new rows go to a small ``update-<epoch>`` file per year partition that is
+  rewritten on each top-up until it holds `compact_rows` rows, then a new
+  one is started. Only files holding replaced bars are trimmed, normally
+  just that small file.
+
+A series with no output yet is bootstrapped with `days` of history. Events
+are printed as JSON lines like ``mt5_batch``. A config file holds one
+object with the long option names as keys; ``preset`` names an entry of
+``symbol_presets.json``.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from download_core import timeframe_constants, TIMEFRAMES
+from mt5_batch import emit, split_list
+from mt5_fetch import iter_series_rates
+from mt5_session import MT5Session, MT5SessionError
+from symbol_catalog import SymbolCatalog
+from exporters import DATASET_FORMATS, PART_SUFFIX, arrow_schema, require_pyarrow
+from csv_writer import CSV_ENGINES, open_csv_writer, format_frame
+from frames import rates_to_frame
+from bar_cache import from_epoch
+from mt5_constants import EXPORT_COLUMNS
+
+PRESETS_FILE = 'symbol_presets.json'
+UPDATE_FORMATS = ['csv'] + list(DATASET_FORMATS)
+COMPACT_ROWS = 50_000
+TAIL_BLOCK = 64 * 1024
+
+DAEMON_DEFAULTS = {
+    'preset': None,
+    'presets_file': PRESETS_FILE,
+    'symbols': None,
+    'timeframes': 'H1',
+    'format': 'csv',
+    'columns': ','.join(EXPORT_COLUMNS),
+    'output': None,
+    'every': 15,
+    'overlap': 3,
+    'days': 30,
+    'csv_engine': 'pandas',
+    'csv_precision': None,
+    'terminal': None,
+}
+
+
+def load_preset(name, path=PRESETS_FILE):
+    """Symbols of a preset saved from the GUI"""
+    with open(path, 'r') as f:
+        presets = json.load(f)
+    if name not in presets:
+        raise ValueError(f"Preset '{name}' not found in {path}")
+    return split_list(presets[name])
+
+
+def csv_epoch(text):
+    """Epoch seconds of a Date field written by either CSV engine"""
+    stamp = pd.Timestamp(text)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return int(stamp.timestamp())
+
+
+class CsvSeriesStore:
+    """One series kept as a single CSV file that grows at the end"""
+
+    def __init__(self, path, engine='pandas', precision=None):
+        self.path = path
+        self.engine = engine
+        self.precision = precision
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def columns(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.readline().strip().split(',')
+
+    def tail_rows(self, count):
+        """(byte offset, epoch) of the last `count` complete rows, oldest first"""
+        date_index = self.columns().index('Date')
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = size
+            data = b''
+            while start > 0 and data.count(b'\n') <= count + 1:
+                step = min(TAIL_BLOCK, start)
+                start -= step
+                f.seek(start)
+                data = f.read(step) + data
+        rows = []
+        offset = start
+        for line in data.split(b'\n'):
+            line_start = offset
+            offset += len(line) + 1
+            if line_start == start and start > 0:
+                continue  # Possibly cut off by the block boundary
+            if line_start == 0 or offset > size:
+                continue  # Header, or an unterminated line left by an interrupted write
+            rows.append((line_start, csv_epoch(line.decode('utf-8').split(',')[date_index])))
+        return rows[-count:]
+
+    def tail(self, count):
+        return [epoch for _, epoch in self.tail_rows(count)] if self.exists() else []
+
+    def replace_from(self, cut, df):
+        """Drop stored rows at or after epoch `cut` and append `df` in their place"""
+        if not self.exists():
+            writer, _ = open_csv_writer(self.path, self.engine, None, self.precision)
+            writer.write(df)
+            writer.close()
+            return
+        df = df[self.columns()]
+        if self.engine == 'fast':
+            data = format_frame(df, 6 if self.precision is None else self.precision)
+        else:
+            data = df.to_csv(index=False, header=False, lineterminator='\n').encode('utf-8')
+        count = len(df) + 1
+        rows = self.tail_rows(count)
+        while len(rows) == count and rows[0][1] >= cut:
+            count *= 2
+            rows = self.tail_rows(count)
+        with open(self.path, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            # An unterminated last line (interrupted write) is dropped as well
+            keep = next((offset for offset, epoch in rows if epoch >= cut), None)
+            if keep is None:
+                keep = rows[-1][0] + len(self._line_at(f, rows[-1][0])) if rows else end
+            f.truncate(keep)
+            f.seek(keep)
+            f.write(data)
+
+    @staticmethod
+    def _line_at(f, offset):
+        f.seek(offset)
+        return f.readline()
+
+
+class DatasetSeriesStore:
+    """One series in a Hive-partitioned Parquet/Feather dataset, appended through small update files"""
+
+    def __init__(self, root, symbol, timeframe, export_format='parquet', compact_rows=COMPACT_ROWS):
+        self.pa = require_pyarrow()
+        self.series_dir = os.path.join(root, f"symbol={symbol}", f"timeframe={timeframe}")
+        self.export_format = export_format
+        self.extension = DATASET_FORMATS[export_format]
+        self.compact_rows = compact_rows
+
+    def year_dirs(self):
+        """{year: folder} of the existing partitions"""
+        if not os.path.isdir(self.series_dir):
+            return {}
+        years = {}
+        for name in os.listdir(self.series_dir):
+            if name.startswith('year=') and name[5:].isdigit():
+                years[int(name[5:])] = os.path.join(self.series_dir, name)
+        return years
+
+    def files(self, folder):
+        if not os.path.isdir(folder):
+            return []
+        return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(self.extension))
+
+    def read(self, path, columns=None):
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_table(path, columns=columns)
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns)
+
+    def write(self, path, table):
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path + PART_SUFFIX, compression='zstd')
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path + PART_SUFFIX, compression='zstd')
+        os.replace(path + PART_SUFFIX, path)
+
+    def epochs(self, table):
+        return self.date_epochs(table.column('Date'))
+
+    def date_epochs(self, dates):
+        return dates.cast(self.pa.timestamp('s', tz='UTC')).cast(self.pa.int64()).to_numpy()
+
+    def last_epoch(self, path):
+        """Epoch of the newest bar in a file, or None when it is empty.
+
+        Parquet files answer from their row-group statistics; otherwise only
+        the Date column is read.
+        """
+        if self.export_format == 'parquet':
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(path).metadata
+            field = metadata.schema.to_arrow_schema().field('Date')
+            column = metadata.schema.names.index('Date')
+            maxima = []
+            for group in range(metadata.num_row_groups):
+                stats = metadata.row_group(group).column(column).statistics
+                if stats is None or not stats.has_min_max:
+                    break
+                maxima.append(stats.max)
+            else:
+                return int(self.date_epochs(self.pa.array(maxima, type=field.type)).max()) if maxima else None
+        epochs = self.epochs(self.read(path, columns=['Date']))
+        return int(epochs.max()) if len(epochs) else None
+
+    def tail(self, count):
+        """Epochs of the last `count` stored bars, oldest first"""
+        stored = []
+        years = self.year_dirs()
+        for year in sorted(years, reverse=True):
+            for path in self.files(years[year]):
+                stored.append(self.epochs(self.read(path, columns=['Date'])))
+            if sum(len(e) for e in stored) >= count:
+                break
+        if not stored:
+            return []
+        return [int(e) for e in np.sort(np.concatenate(stored))[-count:]]
+
+    def replace_from(self, cut, df):
+        """Drop stored bars at or after epoch `cut` and add `df`"""
+        years = df['Date'].dt.year.to_numpy()
+        touched = sorted(set(int(y) for y in years) | {from_epoch(cut).year})
+        for year in touched:
+            folder = os.path.join(self.series_dir, f"year={year}")
+            files = self.files(folder)
+            updates = [path for path in files if os.path.basename(path).startswith('update-')]
+            tail = None
+            if updates and self.read(updates[-1], columns=['Date']).num_rows < self.compact_rows:
+                tail = updates[-1]
+            for path in files:
+                if path == tail:
+                    continue
+                last = self.last_epoch(path)
+                if last is None or last < cut:
+                    continue
+                # Only a file holding replaced bars is read in full
+                table = self.read(path)
+                epochs = self.epochs(table)
+                if len(epochs) and epochs.max() >= cut:
+                    kept = table.filter(self.pa.array(epochs < cut))
+                    if kept.num_rows:
+                        self.write(path, kept)
+                    else:
+                        os.remove(path)
+            part = df[years == year]
+            new = None
+            if len(part):
+                schema = arrow_schema(part.columns)
+                if len(schema) != len(part.columns):
+                    schema = None
+                new = self.pa.Table.from_pandas(part, schema=schema, preserve_index=False, safe=False)
+            if tail is not None:
+                table = self.read(tail)
+                table = table.filter(self.pa.array(self.epochs(table) < cut))
+                if new is not None:
+                    table = self.pa.concat_tables([table, new.cast(table.schema)])
+                self.write(tail, table)
+            elif new is not None:
+                os.makedirs(folder, exist_ok=True)
+                first = int(part['Date'].iloc[0].timestamp())
+                self.write(os.path.join(folder, f"update-{first}{self.extension}"), new)
+
+
+class UpdateDaemon:
+    """Tops up every configured series on a schedule over one long-lived MT5 session"""
+
+    def __init__(self, symbols, timeframes, output, export_format='csv', columns=None, every_minutes=15,
+                 overlap=3, bootstrap_days=30, csv_engine='pandas', csv_precision=None, terminal_path=None,
+                 session=None, symbol_catalog=None, log=None):
+        if export_format not in UPDATE_FORMATS:
+            raise ValueError(f"Unsupported update format: {export_format} (use {', '.join(UPDATE_FORMATS)})")
+        self.symbols = symbols
+        self.timeframes = timeframes
+        self.output = output
+        self.export_format = export_format
+        self.columns = columns or list(EXPORT_COLUMNS)
+        if 'Date' not in self.columns:
+            self.columns = ['Date'] + self.columns
+        self.every = timedelta(minutes=every_minutes)
+        self.overlap = max(1, overlap)
+        self.bootstrap = timedelta(days=bootstrap_days)
+        self.csv_engine = csv_engine
+        self.csv_precision = csv_precision
+        self.session = session or MT5Session(terminal_path)
+        self.symbol_catalog = symbol_catalog if symbol_catalog is not None else SymbolCatalog()
+        self.log = log or (lambda message, level: logging.log(logging.getLevelName(level), message))
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def store(self, symbol, timeframe):
+        if self.export_format == 'csv':
+            precision = self.csv_precision
+            if precision is None:
+                info = self.symbol_catalog.info(symbol)
+                precision = info.get('digits') if info else None
+            return CsvSeriesStore(os.path.join(self.output, f"{symbol}_{timeframe}.csv"), self.csv_engine, precision)
+        return DatasetSeriesStore(self.output, symbol, timeframe, self.export_format)
+
+    def top_up(self, mt5_module, symbol, timeframe, tf_value):
+        """Fetch the bars from the `overlap`-th last stored one to now; returns (bars fetched, new bars)"""
+        store = self.store(symbol, timeframe)
+        tail = store.tail(self.overlap)
+        now = datetime.now()
+        start = from_epoch(tail[0]) if tail else now - self.bootstrap
+        # MT5 bar times are server time, which may be ahead of the local clock
+        chunks = list(iter_series_rates(mt5_module, symbol, timeframe, tf_value, start, now + timedelta(days=1),
+                                        window=timedelta(days=30)))
+        if not chunks:
+            return 0, 0
+        rates = np.concatenate(chunks)
+        if not len(rates):
+            return 0, 0
+        cut = int(rates['time'][0])
+        store.replace_from(cut, rates_to_frame(rates, self.columns))
+        new_bars = int((rates['time'] > tail[-1]).sum()) if tail else len(rates)
+        return len(rates), new_bars
+
+    def run_once(self):
+        """Top up every series once; returns {series key: new bars}"""
+        updated = {}
+        os.makedirs(self.output, exist_ok=True)
+        with self.session.acquire() as mt5_module:
+            self.session.ensure()
+            self.symbol_catalog.ensure(mt5_module)
+            tf_mapping = timeframe_constants(mt5_module)
+            for symbol in self.symbols:
+                exact_symbol = self.symbol_catalog.resolve(symbol, mt5_module)
+                if not exact_symbol:
+                    self.log(f"Symbol {symbol} not found (case mismatch)", "WARNING")
+                    continue
+                for timeframe in self.timeframes:
+                    if not self._is_running:
+                        return updated
+                    try:
+                        fetched, new_bars = self.top_up(mt5_module, exact_symbol, timeframe, tf_mapping[timeframe])
+                        updated[f"{exact_symbol}_{timeframe}"] = new_bars
+                        self.log(f"{exact_symbol} {timeframe}: {fetched} bars fetched, {new_bars} new", "INFO")
+                    except Exception as e:
+                        self.log(f"Error updating {exact_symbol} {timeframe}: {e}", "ERROR")
+        return updated
+
+    def run_forever(self, passes=None):
+        """Run a pass every `every` minutes until stopped (or `passes` passes are done)"""
+        done = 0
+        while self._is_running and (passes is None or done < passes):
+            started = time.monotonic()
+            try:
+                updated = self.run_once()
+                emit('update', ok=True, seconds=round(time.monotonic() - started, 3), series=updated)
+            except MT5SessionError as e:
+                self.log(str(e), "ERROR")
+                emit('update', ok=False, error=str(e))
+            done += 1
+            if passes is not None and done >= passes:
+                break
+            wait = self.every.total_seconds() - (time.monotonic() - started)
+            while self._is_running and wait > 0:
+                time.sleep(min(wait, 1.0))
+                wait -= 1.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a local MT5 dataset current with small scheduled top-ups")
+    parser.add_argument('--config', help="JSON file with the options below as keys")
+    parser.add_argument('--preset', help=f"Symbol preset name from {PRESETS_FILE}")
+    parser.add_argument('--presets-file', dest='presets_file')
+    parser.add_argument('--symbols', help="Comma-separated symbols (instead of --preset)")
+    parser.add_argument('--timeframes', help=f"Comma-separated timeframes ({','.join(TIMEFRAMES)})")
+    parser.add_argument('--format', choices=UPDATE_FORMATS)
+    parser.add_argument('--columns', help="Comma-separated export columns (Date is always kept)")
+    parser.add_argument('--output', help="Dataset folder")
+    parser.add_argument('--every', type=float, help="Minutes between top-ups (default 15)")
+    parser.add_argument('--overlap', type=int, help="Latest stored bars to fetch again, as the broker may revise them")
+    parser.add_argument('--days', type=int, help="History downloaded for a series that has no output yet")
+    parser.add_argument('--csv-engine', dest='csv_engine', choices=CSV_ENGINES)
+    parser.add_argument('--csv-precision', dest='csv_precision', type=int)
+    parser.add_argument('--terminal', help="terminal64.exe path")
+    parser.add_argument('--once', action='store_true', help="Run a single top-up pass and exit")
+    return parser.parse_args(argv)
+
+
+def build_daemon(spec):
+    """Validate a daemon spec and turn it into an UpdateDaemon"""
+    spec = {**DAEMON_DEFAULTS, **{k: v for k, v in spec.items() if v is not None}}
+    symbols = load_preset(spec['preset'], spec['presets_file']) if spec['preset'] else split_list(spec['symbols'])
+    if not symbols:
+        raise ValueError("Give --symbols or a --preset with at least one symbol")
+    timeframes = [tf.upper() for tf in split_list(spec['timeframes'])]
+    unknown = [tf for tf in timeframes if tf not in TIMEFRAMES]
+    if unknown or not timeframes:
+        raise ValueError(f"Invalid timeframes: {', '.join(unknown) or 'none given'}")
+    if not spec['output']:
+        raise ValueError("Please give an --output folder")
+
+    def log(message, level):
+        logging.log(logging.getLevelName(level), message)
+        emit('log', level=level, message=message)
+
+    return UpdateDaemon(
+        symbols, timeframes, spec['output'], export_format=spec['format'], columns=split_list(spec['columns']),
+        every_minutes=float(spec['every']), overlap=int(spec['overlap']), bootstrap_days=int(spec['days']),
+        csv_engine=spec['csv_engine'], csv_precision=spec['csv_precision'], terminal_path=spec['terminal'], log=log,
+    )
+
+
+def main(argv=None):
+    logging.basicConfig(
+        filename='mt5_downloader.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    args = parse_args(argv)
+    spec = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            spec = json.load(f)
+    spec.update({k: v for k, v in vars(args).items() if k not in ('config', 'once') and v is not None})
+    try:
+        daemon = build_daemon(spec)
+    except Exception as e:
+        emit('error', message=str(e))
+        return 1
+    emit('start', symbols=daemon.symbols, timeframes=daemon.timeframes, format=daemon.export_format,
+         output=daemon.output, every_minutes=daemon.every.total_seconds() / 60)
+    try:
+        daemon.run_forever(passes=1 if args.once else None)
+    except KeyboardInterrupt:
+        emit('stopped')
+    finally:
+        daemon.session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
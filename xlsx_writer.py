@@ -0,0 +1,277 @@
+import os
+import shutil
+import zipfile
+import tempfile
+from collections import deque
+from xml.sax.saxutils import escape
+import numpy as np
+
+# Excel's hard limit per worksheet, header row included
+EXCEL_MAX_ROWS = 1048576
+
+# Days between Excel's epoch (1899-12-30) and the Unix epoch
+EXCEL_EPOCH_OFFSET = 25569.0
+
+SHEET_HEADER = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+                'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>\n')
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                 '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                 '<Default Extension="xml" ContentType="application/xml"/>'
+                 '<Override PartName="/xl/workbook.xml" '
+                 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                 '<Override PartName="/xl/styles.xml" '
+                 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                 '{sheets}</Types>')
+SHEET_CONTENT_TYPE = ('<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+
+ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+             '<Relationship Id="rId1" '
+             'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+             'Target="xl/workbook.xml"/></Relationships>')
+
+WORKBOOK = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets>{sheets}</sheets></workbook>')
+WORKBOOK_SHEET = '<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>'
+
+WORKBOOK_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                 '{sheets}<Relationship Id="rId{styles}" '
+                 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+                 'Target="styles.xml"/></Relationships>')
+WORKBOOK_SHEET_REL = ('<Relationship Id="rId{n}" '
+                      'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                      'Target="worksheets/sheet{n}.xml"/>')
+
+# Style 0 is the default, style 1 formats date serials as timestamps
+STYLES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+          '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+          '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+          '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+          '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+          '<fill><patternFill patternType="gray125"/></fill></fills>'
+          '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+          '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+          '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+          '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+          '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+          '</styleSheet>')
+
+
+def sheet_title(base, part=1):
+    """Sheet title for the `part`-th sheet of a series, within Excel's 31-char limit"""
+    suffix = f"_{part}" if part > 1 else ""
+    base = ''.join('_' if ch in '[]:*?/\\' else ch for ch in base)
+    return base[:31 - len(suffix)] + suffix
+
+
+def part_filename(filename, part=1):
+    """File name for the `part`-th workbook of a rolled-over export"""
+    if part == 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{part}{ext or '.xlsx'}"
+
+
+def _cell_strings(values, style):
+    """Render one column with missing values as individual cell strings"""
+    open_tag = f'<c s="{style}"><v>' if style else '<c><v>'
+    return [open_tag + repr(v) + '</v></c>' if v == v and v is not None else '<c/>' for v in values]
+
+
+def prepare_columns(df):
+    """Turn a DataFrame chunk into plain column lists plus a row template.
+
+    Dates become Excel serial numbers with the timestamp style, numbers are
+    written with ``repr`` and text as inline strings. The result is cheap to
+    pickle, so rendering can happen in another process.
+    """
+    columns = []
+    cells = []
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        if kind == 'M':
+            if series.dt.tz is not None:
+                # Excel has no notion of time zones
+                series = series.dt.tz_localize(None)
+            nat = series.isna().to_numpy()
+            serial = series.to_numpy().astype('datetime64[ns]').astype(np.int64) / 86400e9 + EXCEL_EPOCH_OFFSET
+            if nat.any():
+                values = serial.tolist()
+                columns.append(_cell_strings([None if n else v for v, n in zip(values, nat)], 1))
+                cells.append('%s')
+            else:
+                columns.append(serial.tolist())
+                cells.append('<c s="1"><v>%r</v></c>')
+        elif kind in 'iub':
+            columns.append(series.to_numpy().astype(np.int64 if kind != 'u' else np.uint64).tolist())
+            cells.append('<c><v>%d</v></c>')
+        elif kind == 'f':
+            values = series.tolist()
+            if series.isna().any():
+                columns.append(_cell_strings(values, 0))
+                cells.append('%s')
+            else:
+                columns.append(values)
+                cells.append('<c><v>%r</v></c>')
+        else:
+            columns.append(['<c/>' if v is None or v != v else
+                            '<c t="inlineStr"><is><t>' + escape(str(v)) + '</t></is></c>' for v in series.tolist()])
+            cells.append('%s')
+    return columns, '<row>' + ''.join(cells) + '</row>\n'
+
+
+def render_rows(columns, template):
+    """Render prepared columns as worksheet <row> elements"""
+    return ''.join([template % row for row in zip(*columns)])
+
+
+def render_frame(df):
+    """Render a DataFrame chunk (without header) as worksheet XML rows"""
+    return render_rows(*prepare_columns(df))
+
+
+def header_row(columns):
+    cells = ''.join('<c t="inlineStr"><is><t>' + escape(str(c)) + '</t></is></c>' for c in columns)
+    return '<row>' + cells + '</row>\n'
+
+
+class XlsxStreamWriter:
+    """Streaming, write-only xlsx engine that appends whole rows.
+
+    Each worksheet is streamed to a temporary file as chunks arrive and the
+    workbook is zipped together on ``close()``, so memory stays flat however
+    many rows are written. A series longer than Excel's row limit continues on
+    ``NAME_2``, ``NAME_3``... sheets, or, with ``rollover='workbooks'``, in
+    ``file_2.xlsx``, ``file_3.xlsx``... Given an `executor` (e.g. a
+    ``ProcessPoolExecutor``) the row XML of each chunk is rendered there, so
+    several sheets are built in parallel while the caller keeps fetching; at
+    most `max_pending` rendered chunks are held before they are written out.
+    """
+
+    def __init__(self, filename, rollover='sheets', max_rows=EXCEL_MAX_ROWS, executor=None, max_pending=8):
+        if rollover not in ('sheets', 'workbooks'):
+            raise ValueError(f"Unknown rollover mode: {rollover}")
+        self.filename = filename
+        self.rollover = rollover
+        self.max_rows = max_rows
+        self.executor = executor
+        self.max_pending = max_pending
+        self.files = []
+        self.sheet_count = 0
+        self._pending = deque()  # (sheet file, future) in submission order
+        self._tmpdir = None
+        self._workbook_part = 0
+        self._sheets = []  # [title, temp path, file handle] for the open workbook
+        self._series = {}  # series name -> [sheet index, part, rows in sheet, header]
+
+    def _start_workbook(self):
+        if self._tmpdir is not None:
+            self._finish_workbook()
+        folder = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(folder, exist_ok=True)
+        self._tmpdir = tempfile.mkdtemp(prefix='.xlsx_', dir=folder)
+        self._workbook_part += 1
+        self._sheets = []
+        self._series = {}
+
+    def _new_sheet(self, name, part, header):
+        index = len(self._sheets)
+        path = os.path.join(self._tmpdir, f"sheet{index + 1}.xml")
+        handle = open(path, 'w', encoding='utf-8')
+        handle.write(SHEET_HEADER)
+        handle.write(header_row(header))
+        self._sheets.append([sheet_title(name, part), path, handle])
+        self._series[name] = [index, part, 1, header]
+        self.sheet_count += 1
+
+    def _emit(self, handle, df):
+        if self.executor is not None:
+            self._pending.append((handle, self.executor.submit(render_rows, *prepare_columns(df))))
+            # Bound the number of rendered chunks held in memory
+            while len(self._pending) > self.max_pending:
+                self._drain_one()
+        else:
+            handle.write(render_frame(df))
+
+    def _drain_one(self):
+        handle, future = self._pending.popleft()
+        handle.write(future.result())
+
+    def write(self, name, df):
+        """Append a chunk of rows to the sheet(s) of series `name`"""
+        if self._tmpdir is None:
+            self._start_workbook()
+        header = list(df.columns)
+        if name not in self._series:
+            self._new_sheet(name, 1, header)
+        offset = 0
+        while offset < len(df):
+            state = self._series[name]
+            room = self.max_rows - state[2]
+            if room <= 0:
+                part = state[1] + 1
+                if self.rollover == 'workbooks':
+                    self._start_workbook()
+                self._new_sheet(name, part, header)
+                continue
+            take = min(room, len(df) - offset)
+            self._emit(self._sheets[state[0]][2], df.iloc[offset:offset + take])
+            state[2] += take
+            offset += take
+
+    def _finish_workbook(self):
+        while self._pending:
+            self._drain_one()
+        path = part_filename(self.filename, self._workbook_part)
+        tmp_path = os.path.join(self._tmpdir, 'workbook.xlsx')
+        try:
+            for sheet in self._sheets:
+                sheet[2].write(SHEET_FOOTER)
+                sheet[2].close()
+            count = len(self._sheets)
+            numbers = range(1, count + 1)
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=1) as zf:
+                zf.writestr('[Content_Types].xml', CONTENT_TYPES.format(
+                    sheets=''.join(SHEET_CONTENT_TYPE.format(n=n) for n in numbers)))
+                zf.writestr('_rels/.rels', ROOT_RELS)
+                zf.writestr('xl/workbook.xml', WORKBOOK.format(sheets=''.join(
+                    WORKBOOK_SHEET.format(name=escape(sheet[0], {'"': '&quot;'}), n=n)
+                    for n, sheet in zip(numbers, self._sheets))))
+                zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS.format(
+                    sheets=''.join(WORKBOOK_SHEET_REL.format(n=n) for n in numbers), styles=count + 1))
+                zf.writestr('xl/styles.xml', STYLES)
+                for n, sheet in zip(numbers, self._sheets):
+                    zf.write(sheet[1], f'xl/worksheets/sheet{n}.xml')
+            os.replace(tmp_path, path)
+            self.files.append(path)
+        finally:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def close(self):
+        """Write the open workbook to disk; returns the list of files written"""
+        if self._tmpdir is not None:
+            self._finish_workbook()
+        return self.files
+
+    def abort(self):
+        """Discard everything written since the last finished workbook"""
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        for sheet in self._sheets:
+            if not sheet[2].closed:
+                sheet[2].close()
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None